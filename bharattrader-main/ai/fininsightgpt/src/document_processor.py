@@ -7,11 +7,14 @@ Supported formats: txt, pdf, docx, pptx, xlsx, images
 
 import os
 import re
+import sys
 import logging
 import base64
 import json
+import hashlib
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Any
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import datetime
 
 # Load environment variables from .env file
@@ -36,6 +39,21 @@ OPENAI_TEXT_MODEL = os.environ.get("OPENAI_TEXT_MODEL", "gpt-4-turbo")
 # Flag to enable/disable LLM prompt logging (default: enabled)
 ENABLE_LOGGING = os.environ.get("ENABLE_LLM_LOGGING", "true").lower() == "true"
 
+# Bump when an extractor changes its output, so cached markdown is regenerated
+EXTRACTOR_VERSION = "1"
+# Manifest of processed inputs, kept in the processed/ folder
+MANIFEST_NAME = ".manifest.json"
+IMAGE_EXTENSIONS = ["jpg", "jpeg", "png", "gif", "bmp"]
+# Extensions extracted in the process pool, they are CPU-bound
+CPU_EXTENSIONS = ["pdf", "docx", "pptx", "xlsx", "xls"]
+
+# Worker processes for CPU-bound extraction (DOC_EXTRACTION_WORKERS, default: CPU count)
+EXTRACTION_WORKERS = int(os.environ.get("DOC_EXTRACTION_WORKERS", str(os.cpu_count() or 1)))
+# Concurrent vision-LLM calls for images (DOC_VISION_WORKERS)
+VISION_WORKERS = int(os.environ.get("DOC_VISION_WORKERS", "4"))
+# PDFs longer than this are split into page ranges of this size across workers
+PDF_PAGES_PER_TASK = int(os.environ.get("DOC_PDF_PAGES_PER_TASK", "50"))
+
 # Try to import optional dependencies, with graceful fallbacks
 try:
     import fitz  # PyMuPDF
@@ -80,6 +98,10 @@ except ImportError:
     OPENAI_AVAILABLE = False
     logger.warning("OpenAI library not found. Advanced image analysis will be unavailable.")
 
+# Shared LLM response cache lives in bharattrader-main/ai
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from llm_cache import get_cache
+
 
 def extract_from_txt(file_path: str) -> str:
     """Extract text from a plain text file.
@@ -128,6 +150,36 @@ def extract_from_pdf(file_path: str) -> str:
         return "ERROR: PDF extraction requires PyMuPDF. Please install with: pip install pymupdf"
 
 
+def pdf_page_count(file_path: str) -> int:
+    """Number of pages in a PDF, 0 if it cannot be opened."""
+    if PDF_EXTRACTOR != "pymupdf":
+        return 0
+    try:
+        with fitz.open(file_path) as doc:
+            return doc.page_count
+    except Exception:
+        return 0
+
+
+def extract_pdf_pages(file_path: str, start: int, end: int) -> str:
+    """Extract text from pages [start, end) of a PDF, formatted like extract_from_pdf.
+
+    Args:
+        file_path: Path to the PDF file
+        start: First page index
+        end: Page index after the last page
+
+    Returns:
+        Extracted text content
+    """
+    text_content = []
+    with fitz.open(file_path) as doc:
+        for page_num in range(start, min(end, doc.page_count)):
+            text = doc[page_num].get_text()
+            text_content.append(f"# Page {page_num + 1}\n\n{text}\n\n")
+    return "\n".join(text_content)
+
+
 def extract_from_docx(file_path: str) -> str:
     """Extract text from a DOCX file.
 
@@ -346,13 +398,14 @@ def extract_from_image(file_path: str, run_timestamp: Optional[str] = None) -> s
                     run_timestamp=run_timestamp
                 )
                 
-                response = client.chat.completions.create(
-                    model=OPENAI_VISION_MODEL,  # Use global variable
-                    messages=messages,
+                # Identical image bytes and prompt are answered from the response cache
+                vision_description = get_cache().chat_completion(
+                    client,
+                    OPENAI_VISION_MODEL,  # Use global variable
+                    messages,
                     temperature=0.3,
                     max_tokens=300
                 )
-                vision_description = response.choices[0].message.content
                 return f"## OCR Text:\n\n{text}\n\n## Image Analysis:\n\n{vision_description}"
             except Exception as e:
                 logger.warning(f"OpenAI vision processing failed: {str(e)}")
@@ -364,6 +417,14 @@ def extract_from_image(file_path: str, run_timestamp: Optional[str] = None) -> s
         return f"ERROR: Could not extract text from {file_path}."
 
 
+def markdown_header(file_path: Path) -> str:
+    """Header written at the top of every converted file."""
+    content = f"# {file_path.stem}\n\n"
+    content += f"Source: {file_path}\n"
+    content += f"Processed on: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n---\n\n"
+    return content
+
+
 def convert_to_markdown(file_path: str, run_timestamp: Optional[str] = None) -> Tuple[str, str]:
     """Convert various file formats to markdown text.
 
@@ -378,9 +439,7 @@ def convert_to_markdown(file_path: str, run_timestamp: Optional[str] = None) ->
     file_ext = file_path.suffix.lower()[1:]  # Remove the dot
     file_name = file_path.stem
     
-    content = f"# {file_name}\n\n"
-    content += f"Source: {file_path}\n"
-    content += f"Processed on: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n---\n\n"
+    content = markdown_header(file_path)
     
     try:
         if file_ext == "txt":
@@ -393,7 +452,7 @@ def convert_to_markdown(file_path: str, run_timestamp: Optional[str] = None) ->
             extracted = extract_from_pptx(str(file_path))
         elif file_ext in ["xlsx", "xls"]:
             extracted = extract_from_xlsx(str(file_path))
-        elif file_ext in ["jpg", "jpeg", "png", "gif", "bmp"]:
+        elif file_ext in IMAGE_EXTENSIONS:
             extracted = extract_from_image(str(file_path), run_timestamp)
         else:
             extracted = f"Unsupported file format: {file_ext}"
@@ -408,6 +467,139 @@ def convert_to_markdown(file_path: str, run_timestamp: Optional[str] = None) ->
     return content, f"{file_name}.md"
 
 
+def convert_files(file_paths: List[Path], run_timestamp: Optional[str] = None) -> List[Tuple[str, str]]:
+    """Convert many files to markdown in parallel.
+
+    CPU-bound formats run in a process pool, with large PDFs split into page ranges.
+    Images run in a separate, smaller thread pool because their cost is the vision-LLM call.
+    Everything else is converted inline.
+
+    Args:
+        file_paths: Files to convert
+        run_timestamp: Optional timestamp for consistent log naming across a run
+
+    Returns:
+        List of (markdown_content, markdown_file_name) in the same order as file_paths.
+        A file that fails gets an error note in its content, like convert_to_markdown.
+    """
+    results: List[Optional[Tuple[str, str]]] = [None] * len(file_paths)
+    # index -> list of futures whose results are concatenated in order
+    pending: Dict[int, List[Any]] = {}
+    headers: Dict[int, str] = {}
+
+    cpu_pool = None
+    vision_pool = None
+    try:
+        for idx, file_path in enumerate(file_paths):
+            file_ext = file_path.suffix.lower()[1:]
+
+            if file_ext in IMAGE_EXTENSIONS:
+                if vision_pool is None:
+                    vision_pool = ThreadPoolExecutor(max_workers=max(1, VISION_WORKERS))
+                pending[idx] = [vision_pool.submit(convert_to_markdown, str(file_path), run_timestamp)]
+            elif file_ext in CPU_EXTENSIONS and EXTRACTION_WORKERS > 1:
+                if cpu_pool is None:
+                    cpu_pool = ProcessPoolExecutor(max_workers=EXTRACTION_WORKERS)
+                pages = pdf_page_count(str(file_path)) if file_ext == "pdf" else 0
+                if pages > PDF_PAGES_PER_TASK:
+                    # Page-parallel extraction, reassembled in page order below
+                    headers[idx] = markdown_header(file_path)
+                    pending[idx] = [
+                        cpu_pool.submit(extract_pdf_pages, str(file_path), start, start + PDF_PAGES_PER_TASK)
+                        for start in range(0, pages, PDF_PAGES_PER_TASK)
+                    ]
+                else:
+                    pending[idx] = [cpu_pool.submit(convert_to_markdown, str(file_path), run_timestamp)]
+            else:
+                results[idx] = convert_to_markdown(str(file_path), run_timestamp)
+
+        # Collect in input order so output and error reporting stay deterministic
+        for idx in sorted(pending):
+            file_path = file_paths[idx]
+            try:
+                if idx in headers:
+                    parts = [future.result() for future in pending[idx]]
+                    results[idx] = (headers[idx] + "\n".join(parts), f"{file_path.stem}.md")
+                else:
+                    results[idx] = pending[idx][0].result()
+            except Exception as e:
+                logger.error(f"Error processing {file_path}: {str(e)}")
+                content = markdown_header(file_path)
+                content += f"ERROR: Failed to process file {file_path}. Exception: {str(e)}"
+                results[idx] = (content, f"{file_path.stem}.md")
+    finally:
+        if cpu_pool is not None:
+            cpu_pool.shutdown(cancel_futures=True)
+        if vision_pool is not None:
+            vision_pool.shutdown(cancel_futures=True)
+
+    return results
+
+
+def file_sha256(file_path: Path) -> str:
+    """Hash a file in blocks, so large PDFs are not read into memory at once."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def extractor_signature(file_path: Path) -> str:
+    """Extractor version plus the settings that change its output for this file type."""
+    file_ext = file_path.suffix.lower()[1:]
+    if file_ext in IMAGE_EXTENSIONS:
+        vision = OPENAI_VISION_MODEL if OPENAI_AVAILABLE and os.environ.get("OPENAI_API_KEY") else "ocr"
+        return f"{EXTRACTOR_VERSION}:{vision}"
+    if file_ext == "pdf":
+        return f"{EXTRACTOR_VERSION}:{PDF_EXTRACTOR}"
+    return EXTRACTOR_VERSION
+
+
+def load_manifest(output_folder: Path) -> Dict[str, Dict[str, Any]]:
+    """Load the processing manifest, keyed by source file name."""
+    manifest_path = output_folder / MANIFEST_NAME
+    if not manifest_path.exists():
+        return {}
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable manifest {manifest_path}: {str(e)}")
+        return {}
+
+
+def save_manifest(output_folder: Path, manifest: Dict[str, Dict[str, Any]]) -> None:
+    """Write the manifest atomically."""
+    manifest_path = output_folder / MANIFEST_NAME
+    tmp_path = manifest_path.with_suffix(".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+def is_unchanged(file_path: Path, entry: Optional[Dict[str, Any]], output_folder: Path) -> bool:
+    """Check a source file against its manifest entry.
+
+    Size and mtime are compared first; only when they differ is the content hashed, so a
+    touched but identical file is still skipped.
+    """
+    if not entry or entry.get("extractor_version") != extractor_signature(file_path):
+        return False
+    if not (output_folder / entry.get("output", "")).is_file():
+        return False
+
+    stat = file_path.stat()
+    if entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+        return True
+    if entry.get("size") != stat.st_size:
+        return False
+    if file_sha256(file_path) == entry.get("sha256"):
+        entry["mtime_ns"] = stat.st_mtime_ns
+        return True
+    return False
+
+
 def process_company_folder(company_folder: str) -> List[Tuple[str, str]]:
     """Process all files in a company folder.
 
@@ -439,22 +631,68 @@ def process_company_folder(company_folder: str) -> List[Tuple[str, str]]:
     # Create a single timestamp for this processing run
     run_timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
     
+    # Manifest of what was already converted, so unchanged inputs are skipped
+    manifest = load_manifest(output_folder)
+    seen = set()
+    converted = 0
+    
     results = []
     
-    # Process all files in the folder
-    for file_path in company_path.glob("*"):
-        if file_path.is_file() and not file_path.name.startswith('.') and not file_path.name.endswith('.md'):
+    # Find new or modified files, unchanged ones reuse the cached markdown
+    source_files = [
+        file_path for file_path in sorted(company_path.glob("*"))
+        if file_path.is_file() and not file_path.name.startswith('.') and not file_path.name.endswith('.md')
+    ]
+    to_convert = []
+    for file_path in source_files:
+        seen.add(file_path.name)
+        if not is_unchanged(file_path, manifest.get(file_path.name), output_folder):
             logger.info(f"Processing file: {file_path}")
-            
-            # Convert the file to markdown using the common run timestamp
-            markdown_content, markdown_name = convert_to_markdown(str(file_path), run_timestamp)
-            
-            # Save the markdown file
-            markdown_path = output_folder / markdown_name
-            with open(markdown_path, 'w', encoding='utf-8') as f:
-                f.write(markdown_content)
-            
+            to_convert.append(file_path)
+    
+    # Convert the files in parallel using the common run timestamp
+    converted_files = dict(zip(to_convert, convert_files(to_convert, run_timestamp)))
+    
+    for file_path in source_files:
+        if file_path not in converted_files:
+            markdown_path = output_folder / manifest[file_path.name]["output"]
+            with open(markdown_path, 'r', encoding='utf-8') as f:
+                markdown_content = f.read()
             results.append((markdown_content, str(markdown_path)))
+            continue
+        
+        markdown_content, markdown_name = converted_files[file_path]
+        
+        # Save the markdown file
+        markdown_path = output_folder / markdown_name
+        with open(markdown_path, 'w', encoding='utf-8') as f:
+            f.write(markdown_content)
+        converted += 1
+        
+        # Failed conversions are not recorded, so they are retried on the next run
+        if "\n---\n\nERROR:" in markdown_content:
+            manifest.pop(file_path.name, None)
+        else:
+            stat = file_path.stat()
+            manifest[file_path.name] = {
+                "sha256": file_sha256(file_path),
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "extractor_version": extractor_signature(file_path),
+                "output": markdown_name,
+                "processed_at": run_timestamp
+            }
+        
+        results.append((markdown_content, str(markdown_path)))
+    
+    # Drop outputs of source files that were removed from the folder
+    for name in [name for name in manifest if name not in seen]:
+        stale_output = output_folder / manifest.pop(name)["output"]
+        if stale_output.is_file() and not any(e["output"] == stale_output.name for e in manifest.values()):
+            stale_output.unlink()
+            logger.info(f"Removed {stale_output}, its source {name} no longer exists")
     
+    save_manifest(output_folder, manifest)
+    logger.info(f"Converted {converted} new or modified files, reused {len(results) - converted} unchanged files")
     logger.info(f"Processed {len(results)} files for company: {company_name}")
     return results
\ No newline at end of file
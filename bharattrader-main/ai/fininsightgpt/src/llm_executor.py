@@ -0,0 +1,190 @@
+"""
+LLM Executor Module
+
+This module runs batches of chat completion requests concurrently, under a concurrency
+limit and a tokens-per-minute budget, with retries and exponential backoff.
+"""
+
+import os
+import sys
+import time
+import random
+import logging
+import threading
+from pathlib import Path
+from collections import deque
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Union
+
+import text_chunker
+
+# Shared LLM response cache lives in bharattrader-main/ai
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from llm_cache import get_cache, endpoint_of
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Parallel requests in flight (LLM_MAX_CONCURRENCY)
+MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "4"))
+# Prompt + completion tokens allowed per minute, 0 disables the limit (LLM_TOKENS_PER_MINUTE)
+TOKENS_PER_MINUTE = int(os.environ.get("LLM_TOKENS_PER_MINUTE", "0"))
+# Attempts per request before giving up (LLM_MAX_RETRIES)
+MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "5"))
+# Use the offline mock client instead of OpenAI (FININSIGHT_MOCK_LLM)
+MOCK_LLM = os.environ.get("FININSIGHT_MOCK_LLM", "false").lower() == "true"
+
+
+@dataclass
+class LLMRequest:
+    """A single chat completion request."""
+    name: str
+    messages: List[Dict[str, Any]]
+    temperature: float
+    max_tokens: int
+
+
+class TokenRateLimiter:
+    """Sliding one-minute window over the tokens sent, shared by all worker threads."""
+
+    def __init__(self, tokens_per_minute: int):
+        self.tokens_per_minute = tokens_per_minute
+        self.window = deque()
+        self.used = 0
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens: int) -> None:
+        """Block until the request fits in the budget of the last 60 seconds.
+
+        Args:
+            tokens: Estimated prompt plus completion tokens of the request
+        """
+        if self.tokens_per_minute <= 0:
+            return
+
+        # A single request larger than the budget is let through on an empty window
+        tokens = min(tokens, self.tokens_per_minute)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                while self.window and now - self.window[0][0] >= 60:
+                    self.used -= self.window.popleft()[1]
+                if self.used + tokens <= self.tokens_per_minute:
+                    self.window.append((now, tokens))
+                    self.used += tokens
+                    return
+                wait = 60 - (now - self.window[0][0])
+            time.sleep(max(wait, 0.05))
+
+
+def create_client():
+    """Create the chat completion client, the offline mock when FININSIGHT_MOCK_LLM is set.
+
+    Returns:
+        An OpenAI compatible client
+    """
+    if MOCK_LLM:
+        from mock_llm import MockOpenAI
+        logger.info("Using offline mock LLM client")
+        return MockOpenAI()
+
+    from openai import OpenAI
+    return OpenAI(api_key=os.environ["OPENAI_API_KEY"])
+
+
+class LLMExecutor:
+    """Runs chat completion requests on a thread pool and returns results in request order."""
+
+    def __init__(
+        self,
+        client,
+        model: str,
+        max_concurrency: int = MAX_CONCURRENCY,
+        tokens_per_minute: int = TOKENS_PER_MINUTE,
+        max_retries: int = MAX_RETRIES,
+        base_delay: float = 1.0
+    ):
+        self.client = client
+        self.model = model
+        self.max_concurrency = max(1, max_concurrency)
+        self.limiter = TokenRateLimiter(tokens_per_minute)
+        self.max_retries = max(1, max_retries)
+        self.base_delay = base_delay
+        self.cache = get_cache()
+
+    def estimate_tokens(self, request: LLMRequest) -> int:
+        prompt = "".join(str(m.get("content", "")) for m in request.messages)
+        return text_chunker.count_tokens(prompt, self.model) + request.max_tokens
+
+    def complete(self, request: LLMRequest) -> str:
+        """Answer one request from the response cache, or send it.
+
+        Args:
+            request: The request to send
+
+        Returns:
+            The completion text
+        """
+        return self.cache.get_or_call(
+            self.model, request.messages, request.temperature, request.max_tokens,
+            lambda: self.send(request), endpoint=endpoint_of(self.client)
+        )
+
+    def send(self, request: LLMRequest) -> str:
+        """Send one request, retrying with exponential backoff and jitter.
+
+        Args:
+            request: The request to send
+
+        Returns:
+            The completion text
+        """
+        tokens = self.estimate_tokens(request)
+        for attempt in range(self.max_retries):
+            self.limiter.acquire(tokens)
+            try:
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=request.messages,
+                    temperature=request.temperature,
+                    max_tokens=request.max_tokens
+                )
+                return response.choices[0].message.content
+            except Exception as e:
+                if attempt == self.max_retries - 1:
+                    raise
+                delay = self.base_delay * (2 ** attempt) + random.uniform(0, self.base_delay)
+                logger.warning(f"LLM call {request.name} failed ({str(e)}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def run(self, requests: List[LLMRequest]) -> List[Union[str, Exception]]:
+        """Run requests concurrently.
+
+        Args:
+            requests: Requests to send
+
+        Returns:
+            One entry per request, in the same order: the completion text, or the
+            exception raised after the last retry
+        """
+        if not requests:
+            return []
+
+        logger.info(f"Running {len(requests)} LLM calls with concurrency {self.max_concurrency}")
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(requests))) as executor:
+            futures = [executor.submit(self.complete, request) for request in requests]
+
+        results = []
+        for request, future in zip(requests, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logger.error(f"Error in LLM call {request.name}: {str(e)}")
+                results.append(e)
+        self.cache.log_stats()
+        return results
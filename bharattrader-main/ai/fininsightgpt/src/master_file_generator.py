@@ -5,10 +5,10 @@ This module handles the creation of the consolidated master markdown file from i
 """
 
 import os
-import re
+import json
 import logging
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
 import datetime
 
 # Configure logging
@@ -18,6 +18,80 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Only this many characters from the start of each file are used to classify it
+CLASSIFY_PREFIX_CHARS = 64 * 1024
+
+# Characters copied per read when streaming a file into the master file
+STREAM_BLOCK_CHARS = 1024 * 1024
+
+# Section order in the master file, with the keywords that put a file in it
+SECTION_KEYWORDS = [
+    ("Financial Data", ["profit", "revenue", "financial", "balance sheet", "income", "statement", "ratio"]),
+    ("Business Overview", ["business", "product", "service", "segment", "overview"]),
+    ("Management", ["ceo", "director", "management", "board"]),
+    ("Industry Analysis", ["industry", "market", "competitor", "competition"]),
+    ("News & Media", ["news", "press", "announcement", "media"]),
+    ("Miscellaneous", []),
+]
+
+
+def index_path_for(master_file_path: str) -> Path:
+    """Path of the sidecar index written next to a master file."""
+    return Path(master_file_path).with_suffix(".index.json")
+
+
+def classify_markdown(md_file: str) -> str:
+    """Pick the master file section for a markdown file from a bounded prefix.
+
+    Args:
+        md_file: Path to the markdown file
+
+    Returns:
+        Section name
+    """
+    with open(md_file, 'r', encoding='utf-8') as f:
+        prefix = f.read(CLASSIFY_PREFIX_CHARS).lower()
+
+    for section, keywords in SECTION_KEYWORDS:
+        if any(kw in prefix for kw in keywords):
+            return section
+    return "Miscellaneous"
+
+
+class MasterWriter:
+    """Writes "\n\n" separated parts to a binary file and tracks byte offsets."""
+
+    def __init__(self, f: BinaryIO):
+        self.f = f
+        self.first = True
+
+    def tell(self) -> int:
+        return self.f.tell()
+
+    def start_part(self) -> int:
+        # Separator before every part but the first, returns where the part starts
+        if not self.first:
+            self.f.write(b"\n\n")
+        self.first = False
+        return self.f.tell()
+
+    def part(self, text: str) -> Tuple[int, int]:
+        start = self.start_part()
+        self.f.write(text.encode('utf-8'))
+        return start, self.f.tell()
+
+    def stream_file(self, md_file: str, filename: str) -> Tuple[int, int]:
+        """Copy a markdown file as one part, dropping its first heading if it repeats the filename."""
+        start = self.start_part()
+        with open(md_file, 'r', encoding='utf-8') as src:
+            first_line = src.readline()
+            # This avoids duplication with the heading added for the file
+            if not (first_line.startswith("# ") and filename in first_line):
+                self.f.write(first_line.encode('utf-8'))
+            for block in iter(lambda: src.read(STREAM_BLOCK_CHARS), ''):
+                self.f.write(block.encode('utf-8'))
+        return start, self.f.tell()
+
 
 def generate_master_file(
     company_name: str,
@@ -51,53 +125,17 @@ def generate_master_file(
     
     output_path = Path(output_dir) / master_filename
     
-    # Prepare master file content
-    master_content = [
-        f"# {company_name.upper()} - Consolidated Analysis",
-        f"Generated on: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-        f"Number of source documents: {len(markdown_files)}",
-        "\n---\n"
-    ]
-    
-    # Table of Contents
+    # Pass 1: classify every file from a bounded prefix, only names are kept in memory
+    sections: Dict[str, List[Tuple[str, Optional[str], Optional[str]]]] = {name: [] for name, _ in SECTION_KEYWORDS}
     toc = ["## Table of Contents"]
     
-    # Track sections for organizing content
-    sections = {
-        "Financial Data": [],
-        "Business Overview": [],
-        "Management": [],
-        "Industry Analysis": [],
-        "News & Media": [],
-        "Miscellaneous": []
-    }
-    
-    # Process each markdown file
     for idx, md_file in enumerate(markdown_files):
+        # Extract filename for reference
+        filename = Path(md_file).stem
         try:
-            with open(md_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Extract filename for reference
-            filename = Path(md_file).stem
-            
-            # Determine section based on content keywords
-            section = "Miscellaneous"
-            content_lower = content.lower()
-            
-            if any(kw in content_lower for kw in ["profit", "revenue", "financial", "balance sheet", "income", "statement", "ratio"]):
-                section = "Financial Data"
-            elif any(kw in content_lower for kw in ["business", "product", "service", "segment", "overview"]):
-                section = "Business Overview"
-            elif any(kw in content_lower for kw in ["ceo", "director", "management", "board"]):
-                section = "Management"
-            elif any(kw in content_lower for kw in ["industry", "market", "competitor", "competition"]):
-                section = "Industry Analysis"
-            elif any(kw in content_lower for kw in ["news", "press", "announcement", "media"]):
-                section = "News & Media"
-            
+            section = classify_markdown(md_file)
             # Add to appropriate section
-            sections[section].append((filename, content))
+            sections[section].append((filename, md_file, None))
             
             # Add to TOC
             toc.append(f"- [{filename}](#{filename.lower().replace(' ', '-')})")
@@ -106,54 +144,88 @@ def generate_master_file(
             logger.error(f"Error processing markdown file {md_file}: {str(e)}")
             sections["Miscellaneous"].append((
                 f"Error_{idx}",
+                None,
                 f"Error processing file {md_file}: {str(e)}"
             ))
     
-    # Add TOC to master content
-    master_content.extend(toc)
-    master_content.append("\n---\n")
+    # Pass 2: stream the files into the master file in section order, recording byte offsets
+    index: Dict[str, Any] = {
+        "master_file": master_filename,
+        "company": company_name,
+        "sections": []
+    }
     
-    # Add content by section
-    for section_name, section_contents in sections.items():
-        if section_contents:
-            master_content.append(f"# {section_name}")
+    try:
+        with open(output_path, 'wb') as f:
+            writer = MasterWriter(f)
+            writer.part(f"# {company_name.upper()} - Consolidated Analysis")
+            writer.part(f"Generated on: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+            writer.part(f"Number of source documents: {len(markdown_files)}")
+            writer.part("\n---\n")
+            
+            # Add TOC to master content
+            for line in toc:
+                writer.part(line)
+            writer.part("\n---\n")
             
-            for filename, content in section_contents:
-                # Add section anchor
-                master_content.append(f"<a id='{filename.lower().replace(' ', '-')}'></a>")
+            # Add content by section
+            for section_name, section_contents in sections.items():
+                if not section_contents:
+                    continue
+                section_start, _ = writer.part(f"# {section_name}")
+                documents = []
                 
-                # Clean up the content by removing the first heading if it matches the filename
-                # This avoids duplication with our added heading
-                content_lines = content.split("\n")
-                if len(content_lines) > 0 and content_lines[0].startswith("# ") and filename in content_lines[0]:
-                    content = "\n".join(content_lines[1:])
+                for filename, md_file, error in section_contents:
+                    # Add section anchor
+                    writer.part(f"<a id='{filename.lower().replace(' ', '-')}'></a>")
+                    doc_start, _ = writer.part(f"## {filename}")
+                    content_start = writer.tell()
+                    if error is None:
+                        try:
+                            content_start, content_end = writer.stream_file(md_file, filename)
+                        except Exception as e:
+                            logger.error(f"Error processing markdown file {md_file}: {str(e)}")
+                            content_start, content_end = writer.part(f"Error processing file {md_file}: {str(e)}")
+                    else:
+                        content_start, content_end = writer.part(error)
+                    documents.append({
+                        "title": filename,
+                        "start": doc_start,
+                        "content_start": content_start,
+                        "end": content_end
+                    })
+                    writer.part("\n---\n")
                 
-                master_content.append(f"## {filename}")
-                master_content.append(content)
-                master_content.append("\n---\n")
-    
-    # Add metadata and summary section
-    master_content.append("# Metadata")
-    master_content.append("## Document Sources")
-    
-    sources_table = ["| Source | Type | Date Included |"]
-    sources_table.append("| --- | --- | --- |")
-    
-    for md_file in markdown_files:
-        file_path = Path(md_file)
-        file_type = file_path.suffix
-        file_date = datetime.datetime.fromtimestamp(os.path.getmtime(md_file)).strftime('%Y-%m-%d')
-        sources_table.append(f"| {file_path.stem} | {file_type} | {file_date} |")
-    
-    master_content.extend(sources_table)
-    
-    # Write the master file
-    try:
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write("\n\n".join(master_content))
+                index["sections"].append({
+                    "title": section_name,
+                    "start": section_start,
+                    "end": writer.tell(),
+                    "documents": documents
+                })
+            
+            # Add metadata and summary section
+            writer.part("# Metadata")
+            writer.part("## Document Sources")
+            
+            writer.part("| Source | Type | Date Included |")
+            writer.part("| --- | --- | --- |")
+            
+            for md_file in markdown_files:
+                file_path = Path(md_file)
+                file_type = file_path.suffix
+                try:
+                    file_date = datetime.datetime.fromtimestamp(os.path.getmtime(md_file)).strftime('%Y-%m-%d')
+                except OSError:
+                    file_date = ""
+                writer.part(f"| {file_path.stem} | {file_type} | {file_date} |")
+        
+        # Sidecar index of byte offsets, so readers can seek to a section
+        with open(index_path_for(str(output_path)), 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2)
+        
         logger.info(f"Master file generated: {output_path}")
     except Exception as e:
         logger.error(f"Error writing master file: {str(e)}")
         return ""
     
-    return str(output_path)
\ No newline at end of file
+    return str(output_path)
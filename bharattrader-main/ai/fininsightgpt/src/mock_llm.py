@@ -0,0 +1,47 @@
+"""
+Mock LLM Module
+
+This module provides an offline, OpenAI compatible client for running the pipeline
+without an API key. Enable it with FININSIGHT_MOCK_LLM=true.
+"""
+
+import os
+import time
+import hashlib
+from types import SimpleNamespace
+from typing import List, Dict, Any
+
+# Simulated seconds per call (MOCK_LLM_LATENCY)
+MOCK_LATENCY = float(os.environ.get("MOCK_LLM_LATENCY", "0"))
+
+
+class _Completions:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    def create(self, model: str, messages: List[Dict[str, Any]], temperature: float = 1.0,
+               max_tokens: int = 1000, **kwargs) -> SimpleNamespace:
+        """Return a deterministic completion derived from the last message."""
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        prompt = str(messages[-1].get("content", "")) if messages else ""
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+        first_line = prompt.strip().splitlines()[0][:120] if prompt.strip() else ""
+        content = f"[mock {model} {digest}] {first_line}"
+
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(role="assistant", content=content), finish_reason="stop")],
+            usage=SimpleNamespace(prompt_tokens=len(prompt) // 4, completion_tokens=len(content) // 4,
+                                  total_tokens=(len(prompt) + len(content)) // 4),
+            model=model
+        )
+
+
+class MockOpenAI:
+    """Stand-in for openai.OpenAI exposing client.chat.completions.create."""
+
+    def __init__(self, latency: float = MOCK_LATENCY, **kwargs):
+        self.chat = SimpleNamespace(completions=_Completions(latency))
@@ -8,9 +8,10 @@ import os
 import re
 import logging
 import json
+import importlib.util
 from pathlib import Path
 import datetime
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 
 # Load environment variables from .env file
 try:
@@ -34,24 +35,73 @@ OPENAI_VISION_MODEL = os.environ.get("OPENAI_VISION_MODEL", "gpt-4-vision-previe
 # Flag to enable/disable LLM prompt logging (default: enabled)
 ENABLE_LOGGING = os.environ.get("ENABLE_LLM_LOGGING", "true").lower() == "true"
 
-try:
-    import openai
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
+# The client itself is created by llm_executor, only check that the library is installed
+OPENAI_AVAILABLE = importlib.util.find_spec("openai") is not None
+if not OPENAI_AVAILABLE:
     logger.warning("OpenAI library not found. Install it with: pip install openai")
 
 # Get model IDs from environment variables
 OPENAI_TEXT_MODEL = os.environ.get("OPENAI_TEXT_MODEL", "gpt-4-turbo")
 OPENAI_VISION_MODEL = os.environ.get("OPENAI_VISION_MODEL", "gpt-4-vision-preview")
 
-try:
-    import tiktoken
-    TIKTOKEN_AVAILABLE = True
-except ImportError:
-    TIKTOKEN_AVAILABLE = False
-    logger.warning("tiktoken not found. Install it with: pip install tiktoken")
+import text_chunker
+from master_file_generator import index_path_for
+from llm_executor import LLMExecutor, LLMRequest, create_client, MOCK_LLM
+from retrieval_index import load_or_build_index, index_path_for_company
+
+# Report sections in output order. Sections with keywords are written from the master file
+# chunks retrieved for the keywords and heading, the others from the document summary.
+REPORT_SECTIONS = [
+    {
+        "key": "executive_summary",
+        "heading": "Executive Summary",
+        "max_tokens": 1000,
+        "keywords": None,
+        "prompt": "Based on the following summary of information about {company}, write ONLY the Executive Summary section of an equity research report: \n\n{content}"
+    },
+    {
+        "key": "business_overview",
+        "heading": "Business Overview",
+        "max_tokens": 1500,
+        "keywords": ["business", "company", "overview", "product", "service"],
+        "prompt": "Based on the following information about {company}, write ONLY the Business Overview section of an equity research report. Focus on the company's products, services, market position, and business model: \n\n{content}"
+    },
+    {
+        "key": "financial_analysis",
+        "heading": "Financial Analysis",
+        "max_tokens": 2000,
+        "keywords": ["financial", "revenue", "profit", "margin", "growth", "income", "balance", "cash flow"],
+        "prompt": "Based on the following financial information about {company}, write ONLY the Financial Analysis section of an equity research report. Focus on revenue trends, profitability, balance sheet strength, and cash flow: \n\n{content}"
+    },
+    {
+        "key": "competitive_landscape",
+        "heading": "Competitive Landscape",
+        "max_tokens": 1500,
+        "keywords": ["competition", "competitor", "market", "industry", "landscape", "peer", "swot", "strength"],
+        "prompt": "Based on the following information about {company}'s competitive position, write ONLY the Competitive Landscape section of an equity research report: \n\n{content}"
+    },
+    {
+        "key": "growth_prospects",
+        "heading": "Growth Prospects and Future Outlook",
+        "max_tokens": 1500,
+        "keywords": ["growth", "future", "outlook", "expansion", "strategy", "opportunity", "initiative"],
+        "prompt": "Based on the following information about {company}'s growth prospects, write ONLY the Growth Prospects and Future Outlook section of an equity research report: \n\n{content}"
+    },
+    {
+        "key": "risks_challenges",
+        "heading": "Risks and Challenges",
+        "max_tokens": 1500,
+        "keywords": ["risk", "challenge", "threat", "regulation", "compliance", "issue", "problem", "concern"],
+        "prompt": "Based on the following information about risks facing {company}, write ONLY the Risks and Challenges section of an equity research report: \n\n{content}"
+    },
+    {
+        "key": "conclusion",
+        "heading": "Conclusion",
+        "max_tokens": 1000,
+        "keywords": None,
+        "prompt": "Based on all the information provided about {company}, write ONLY a brief Conclusion section for an equity research report that summarizes the investment thesis: \n\n{content}"
+    }
+]
 
 
 def log_llm_prompt(
@@ -157,70 +207,22 @@ def count_tokens(text: str, model: str = "gpt-4") -> int:
     Returns:
         Token count
     """
-    if not TIKTOKEN_AVAILABLE:
-        # Approximate token count if tiktoken not available
-        return len(text) // 4
-    
-    try:
-        encoding = tiktoken.encoding_for_model(model)
-        return len(encoding.encode(text))
-    except Exception as e:
-        logger.error(f"Error counting tokens: {str(e)}")
-        return len(text) // 4
+    return text_chunker.count_tokens(text, model)
 
 
-def chunk_text(text: str, max_tokens: int = 4000) -> List[str]:
+def chunk_text(text: str, max_tokens: int = 4000, overlap_tokens: int = 0) -> List[str]:
     """Split text into chunks that fit within token limits.
 
     Args:
         text: Text to chunk
         max_tokens: Maximum tokens per chunk
+        overlap_tokens: Tokens of context repeated between consecutive chunks
 
     Returns:
         List of text chunks
     """
-    # Split by markdown sections (## or ###)
-    section_pattern = r'((?:^|\n)#{2,3}\s+[^\n]+)'
-    sections = re.split(section_pattern, text)
-    
-    # Recombine sections with their headers
-    chunks = []
-    current_chunk = ""
-    
-    for i in range(0, len(sections)):
-        section = sections[i]
-        
-        # Check if adding this section exceeds the token limit
-        combined = current_chunk + section
-        if count_tokens(combined) > max_tokens and current_chunk:
-            chunks.append(current_chunk)
-            current_chunk = section
-        else:
-            current_chunk = combined
-    
-    # Add the last chunk if it's not empty
-    if current_chunk:
-        chunks.append(current_chunk)
-    
-    # If some chunks are still too large, split by paragraphs
-    result = []
-    for chunk in chunks:
-        if count_tokens(chunk) > max_tokens:
-            paragraphs = chunk.split("\n\n")
-            current_chunk = ""
-            
-            for para in paragraphs:
-                if count_tokens(current_chunk + para + "\n\n") > max_tokens and current_chunk:
-                    result.append(current_chunk)
-                    current_chunk = para + "\n\n"
-                else:
-                    current_chunk += para + "\n\n"
-                    
-            if current_chunk:
-                result.append(current_chunk)
-        else:
-            result.append(chunk)
-    
+    result = text_chunker.chunk_text(text, max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+
     # Print the total number of chunks
     logger.info(f"Chunking complete. Total chunks: {len(result)}")
     
@@ -244,11 +246,11 @@ def generate_report(
     Returns:
         Path to the generated report
     """
-    if not OPENAI_AVAILABLE:
+    if not OPENAI_AVAILABLE and not MOCK_LLM:
         logger.error("OpenAI library is required for report generation")
         return ""
     
-    if not os.environ.get("OPENAI_API_KEY"):
+    if not os.environ.get("OPENAI_API_KEY") and not MOCK_LLM:
         logger.error("OPENAI_API_KEY environment variable not set")
         return ""
     
@@ -259,13 +261,16 @@ def generate_report(
         model = OPENAI_TEXT_MODEL  # Use the global variable
         logger.info(f"Using model from environment: {model}")
     
-    # Load master file content
-    try:
-        with open(master_file_path, 'r', encoding='utf-8') as f:
-            master_content = f.read()
-    except Exception as e:
-        logger.error(f"Error reading master file: {str(e)}")
-        return ""
+    # Load master file content, master files with a sidecar index are read document by document
+    master_index = load_master_index(master_file_path)
+    master_content = None
+    if master_index is None:
+        try:
+            with open(master_file_path, 'r', encoding='utf-8') as f:
+                master_content = f.read()
+        except Exception as e:
+            logger.error(f"Error reading master file: {str(e)}")
+            return ""
     
     # Extract company name from master file path
     file_name = Path(master_file_path).stem  # e.g., company_master_timestamp
@@ -297,285 +302,70 @@ def generate_report(
     user_prompt = user_prompt.replace("{company}", company_name).replace("{timestamp}", current_datetime)
     
     # Improved approach for handling content:
-    # 1. First chunk the master content into sections
-    sections = extract_semantic_sections(master_content)
+    # 1. Index the master content chunks for retrieval, reused across runs of the same documents
+    if master_index is not None:
+        documents = master_document_ranges(master_index)
+    else:
+        documents = [("", 0, os.path.getsize(master_file_path))]
+    retriever = load_or_build_index(master_file_path, documents, index_path_for_company(master_file_path))
     
     # 2. Process sections with appropriate context
-    client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
+    client = create_client()
+    executor = LLMExecutor(client, model)
     
     # Define phase for logging
     phase = "report_generation"
     
     # Generate a structured report in parts
-    report_components = {
-        "executive_summary": None,
-        "business_overview": None,
-        "financial_analysis": None,
-        "competitive_landscape": None,
-        "growth_prospects": None,
-        "risks": None,
-        "conclusion": None
-    }
+    report_components = {spec["key"]: None for spec in REPORT_SECTIONS}
     
-    # 3. First generate a high-level summary of the entire document to provide context
+    # 3. The document summary chunks and the keyword based sections do not depend on each
+    # other, so they go out as one concurrent batch
     logger.info("Generating high-level summary of the master document")
-    summary_chunks = chunk_text(master_content, max_tokens=7000)  # Larger chunks for summary
-    summary_content = []
-    
-    for i, chunk in enumerate(summary_chunks):
-        try:
-            messages = [
+    if master_index is not None:
+        # Larger chunks for summary, packed across documents without joining them
+        summary_chunks = text_chunker.chunk_texts(
+            (text for _, text in iter_master_documents(master_file_path, master_index)), max_tokens=7000
+        )
+        logger.info(f"Chunking complete. Total chunks: {len(summary_chunks)}")
+    else:
+        summary_chunks = chunk_text(master_content, max_tokens=7000)  # Larger chunks for summary
+    summary_requests = [
+        LLMRequest(
+            name=f"document_summary_chunk_{i+1}",
+            messages=[
                 {"role": "system", "content": "You are a financial analyst summarizing key information about a company. Provide only the factual information from the document without analysis or conclusions."},
                 {"role": "user", "content": f"Summarize the key information about {company_name} from this document, focusing on extracting factual data:\n\n{chunk}"}
-            ]
-            
-            # Log the prompt
-            log_llm_prompt(
-                company_name=company_name,
-                phase=phase,
-                section=f"document_summary_chunk_{i+1}",
-                messages=messages,
-                model=model,
-                temperature=0.2,
-                max_tokens=1500,
-                run_timestamp=run_timestamp
-            )
-            
-            response = client.chat.completions.create(
-                model=model,
-                messages=messages,
-                temperature=0.2,
-                max_tokens=1500
-            )
-            summary_content.append(response.choices[0].message.content)
-        except Exception as e:
-            logger.error(f"Error generating summary: {str(e)}")
-    
-    document_summary = "\n\n".join(summary_content)
-    
-    # 4. Now generate each section of the report with the overall context
-    logger.info("Generating report sections with document context")
-    
-    # Executive Summary
-    try:
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": f"Based on the following summary of information about {company_name}, write ONLY the Executive Summary section of an equity research report: \n\n{document_summary}"}
-        ]
-        
-        # Log the prompt
-        log_llm_prompt(
-            company_name=company_name,
-            phase=phase,
-            section="executive_summary",
-            messages=messages,
-            model=model,
-            temperature=0.3,
-            max_tokens=1000,
-            run_timestamp=run_timestamp
-        )
-        
-        response = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=0.3,
-            max_tokens=1000
-        )
-        report_components["executive_summary"] = response.choices[0].message.content
-    except Exception as e:
-        logger.error(f"Error generating executive summary: {str(e)}")
-        report_components["executive_summary"] = f"## Executive Summary\n\nError generating content: {str(e)}"
-    
-    # Business Overview
-    try:
-        # Find the most relevant chunks for business overview
-        business_content = extract_content_for_section(sections, ["business", "company", "overview", "product", "service"])
-        
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": f"Based on the following information about {company_name}, write ONLY the Business Overview section of an equity research report. Focus on the company's products, services, market position, and business model: \n\n{business_content}"}
-        ]
-        
-        # Log the prompt
-        log_llm_prompt(
-            company_name=company_name,
-            phase=phase,
-            section="business_overview",
-            messages=messages,
-            model=model,
-            temperature=0.3,
-            max_tokens=1500,
-            run_timestamp=run_timestamp
-        )
-        
-        response = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=0.3,
+            ],
+            temperature=0.2,
             max_tokens=1500
         )
-        report_components["business_overview"] = response.choices[0].message.content
-    except Exception as e:
-        logger.error(f"Error generating business overview: {str(e)}")
-        report_components["business_overview"] = f"## Business Overview\n\nError generating content: {str(e)}"
-    
-    # Financial Analysis
-    try:
-        financial_content = extract_content_for_section(sections, ["financial", "revenue", "profit", "margin", "growth", "income", "balance", "cash flow"])
-        
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": f"Based on the following financial information about {company_name}, write ONLY the Financial Analysis section of an equity research report. Focus on revenue trends, profitability, balance sheet strength, and cash flow: \n\n{financial_content}"}
-        ]
-        
-        # Log the prompt
-        log_llm_prompt(
-            company_name=company_name,
-            phase=phase,
-            section="financial_analysis",
-            messages=messages,
-            model=model,
-            temperature=0.3,
-            max_tokens=2000,
-            run_timestamp=run_timestamp
-        )
-        
-        response = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=0.3,
-            max_tokens=2000
-        )
-        report_components["financial_analysis"] = response.choices[0].message.content
-    except Exception as e:
-        logger.error(f"Error generating financial analysis: {str(e)}")
-        report_components["financial_analysis"] = f"## Financial Analysis\n\nError generating content: {str(e)}"
+        for i, chunk in enumerate(summary_chunks)
+    ]
     
-    # Competitive Landscape
-    try:
-        competitive_content = extract_content_for_section(sections, ["competition", "competitor", "market", "industry", "landscape", "peer", "swot", "strength"])
-        
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": f"Based on the following information about {company_name}'s competitive position, write ONLY the Competitive Landscape section of an equity research report: \n\n{competitive_content}"}
-        ]
-        
-        # Log the prompt
-        log_llm_prompt(
-            company_name=company_name,
-            phase=phase,
-            section="competitive_landscape",
-            messages=messages,
-            model=model,
-            temperature=0.3,
-            max_tokens=1500,
-            run_timestamp=run_timestamp
-        )
-        
-        response = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=0.3,
-            max_tokens=1500
+    keyword_specs = [spec for spec in REPORT_SECTIONS if spec["keywords"]]
+    keyword_requests = [
+        build_section_request(
+            spec, company_name, system_prompt, retriever.context_for(" ".join(spec["keywords"] + [spec["heading"]]))
         )
-        report_components["competitive_landscape"] = response.choices[0].message.content
-    except Exception as e:
-        logger.error(f"Error generating competitive landscape: {str(e)}")
-        report_components["competitive_landscape"] = f"## Competitive Landscape\n\nError generating content: {str(e)}"
+        for spec in keyword_specs
+    ]
     
-    # Growth Prospects
-    try:
-        growth_content = extract_content_for_section(sections, ["growth", "future", "outlook", "expansion", "strategy", "opportunity", "initiative"])
-        
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": f"Based on the following information about {company_name}'s growth prospects, write ONLY the Growth Prospects and Future Outlook section of an equity research report: \n\n{growth_content}"}
-        ]
-        
-        # Log the prompt
-        log_llm_prompt(
-            company_name=company_name,
-            phase=phase,
-            section="growth_prospects",
-            messages=messages,
-            model=model,
-            temperature=0.3,
-            max_tokens=1500,
-            run_timestamp=run_timestamp
-        )
-        
-        response = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=0.3,
-            max_tokens=1500
-        )
-        report_components["growth_prospects"] = response.choices[0].message.content
-    except Exception as e:
-        logger.error(f"Error generating growth prospects: {str(e)}")
-        report_components["growth_prospects"] = f"## Growth Prospects\n\nError generating content: {str(e)}"
+    results = run_logged(executor, summary_requests + keyword_requests, company_name, phase, model, run_timestamp)
+    summary_content = [r for r in results[:len(summary_requests)] if not isinstance(r, Exception)]
+    store_section_results(report_components, keyword_specs, results[len(summary_requests):])
     
-    # Risks and Challenges
-    try:
-        risk_content = extract_content_for_section(sections, ["risk", "challenge", "threat", "regulation", "compliance", "issue", "problem", "concern"])
-        
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": f"Based on the following information about risks facing {company_name}, write ONLY the Risks and Challenges section of an equity research report: \n\n{risk_content}"}
-        ]
-        
-        # Log the prompt
-        log_llm_prompt(
-            company_name=company_name,
-            phase=phase,
-            section="risks_challenges",
-            messages=messages,
-            model=model,
-            temperature=0.3,
-            max_tokens=1500,
-            run_timestamp=run_timestamp
-        )
-        
-        response = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=0.3,
-            max_tokens=1500
-        )
-        report_components["risks"] = response.choices[0].message.content
-    except Exception as e:
-        logger.error(f"Error generating risks section: {str(e)}")
-        report_components["risks"] = f"## Risks and Challenges\n\nError generating content: {str(e)}"
+    document_summary = "\n\n".join(summary_content)
     
-    # Conclusion
-    try:
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": f"Based on all the information provided about {company_name}, write ONLY a brief Conclusion section for an equity research report that summarizes the investment thesis: \n\n{document_summary}"}
-        ]
-        
-        # Log the prompt
-        log_llm_prompt(
-            company_name=company_name,
-            phase=phase,
-            section="conclusion",
-            messages=messages,
-            model=model,
-            temperature=0.3,
-            max_tokens=1000,
-            run_timestamp=run_timestamp
-        )
-        
-        response = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=0.3,
-            max_tokens=1000
-        )
-        report_components["conclusion"] = response.choices[0].message.content
-    except Exception as e:
-        logger.error(f"Error generating conclusion: {str(e)}")
-        report_components["conclusion"] = f"## Conclusion\n\nError generating content: {str(e)}"
+    # 4. Now generate the sections that need the overall context
+    logger.info("Generating report sections with document context")
+    summary_specs = [spec for spec in REPORT_SECTIONS if not spec["keywords"]]
+    summary_section_requests = [
+        build_section_request(spec, company_name, system_prompt, document_summary)
+        for spec in summary_specs
+    ]
+    results = run_logged(executor, summary_section_requests, company_name, phase, model, run_timestamp)
+    store_section_results(report_components, summary_specs, results)
     
     # 5. Assemble the final report
     final_report = [
@@ -586,26 +376,9 @@ def generate_report(
     ]
     
     # Add each component in order
-    if report_components["executive_summary"]:
-        final_report.append(ensure_section_heading(report_components["executive_summary"], "Executive Summary", 1))
-    
-    if report_components["business_overview"]:
-        final_report.append(ensure_section_heading(report_components["business_overview"], "Business Overview", 1))
-    
-    if report_components["financial_analysis"]:
-        final_report.append(ensure_section_heading(report_components["financial_analysis"], "Financial Analysis", 1))
-    
-    if report_components["competitive_landscape"]:
-        final_report.append(ensure_section_heading(report_components["competitive_landscape"], "Competitive Landscape", 1))
-    
-    if report_components["growth_prospects"]:
-        final_report.append(ensure_section_heading(report_components["growth_prospects"], "Growth Prospects and Future Outlook", 1))
-    
-    if report_components["risks"]:
-        final_report.append(ensure_section_heading(report_components["risks"], "Risks and Challenges", 1))
-    
-    if report_components["conclusion"]:
-        final_report.append(ensure_section_heading(report_components["conclusion"], "Conclusion", 1))
+    for spec in REPORT_SECTIONS:
+        if report_components[spec["key"]]:
+            final_report.append(ensure_section_heading(report_components[spec["key"]], spec["heading"], 1))
     
     # Add metadata
     final_report.append("\n---\n")
@@ -627,58 +400,120 @@ def generate_report(
     return str(output_path)
 
 
-def extract_semantic_sections(content: str) -> Dict[str, str]:
-    """Extract semantic sections from the master content.
+def build_section_request(
+    spec: Dict[str, Any],
+    company_name: str,
+    system_prompt: str,
+    content: str
+) -> LLMRequest:
+    """Build the LLM request for one report section.
 
     Args:
-        content: The master file content
+        spec: Entry of REPORT_SECTIONS
+        company_name: Name of the company
+        system_prompt: System prompt from the template
+        content: Context for the section
 
     Returns:
-        Dictionary of section type to content
+        The request
     """
-    # Split by markdown headers
-    header_pattern = r'(^|\n)#{1,3}\s+(.+?)(\n|$)'
-    parts = re.split(header_pattern, content, flags=re.MULTILINE)
-    
-    sections = {}
-    current_title = "General"
-    current_content = ""
-    
-    for i in range(0, len(parts), 4):
-        if i + 2 < len(parts):
-            title = parts[i + 2].strip()
-            if i + 3 < len(parts):
-                content_part = parts[i + 3]
-                if title.lower() not in sections:
-                    sections[title.lower()] = content_part
-                else:
-                    sections[title.lower()] += "\n\n" + content_part
-    
-    return sections
+    return LLMRequest(
+        name=spec["key"],
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": spec["prompt"].format(company=company_name, content=content)}
+        ],
+        temperature=0.3,
+        max_tokens=spec["max_tokens"]
+    )
+
+
+def run_logged(
+    executor: LLMExecutor,
+    requests: List[LLMRequest],
+    company_name: str,
+    phase: str,
+    model: str,
+    run_timestamp: str
+) -> List[Any]:
+    """Log every prompt, then run the requests concurrently.
+
+    Prompts are logged from the calling thread, so the run log keeps the request order.
+
+    Returns:
+        Completion text or exception per request, in request order
+    """
+    for request in requests:
+        log_llm_prompt(
+            company_name=company_name,
+            phase=phase,
+            section=request.name,
+            messages=request.messages,
+            model=model,
+            temperature=request.temperature,
+            max_tokens=request.max_tokens,
+            run_timestamp=run_timestamp
+        )
+    return executor.run(requests)
 
 
-def extract_content_for_section(sections: Dict[str, str], keywords: List[str]) -> str:
-    """Extract content relevant for a specific section based on keywords.
+def store_section_results(
+    report_components: Dict[str, Optional[str]],
+    specs: List[Dict[str, Any]],
+    results: List[Any]
+) -> None:
+    """Put section results into report_components, with an error note for failed sections."""
+    for spec, result in zip(specs, results):
+        if isinstance(result, Exception):
+            logger.error(f"Error generating {spec['heading'].lower()}: {str(result)}")
+            report_components[spec["key"]] = f"## {spec['heading']}\n\nError generating content: {str(result)}"
+        else:
+            report_components[spec["key"]] = result
+
+
+def load_master_index(master_file_path: str) -> Optional[Dict[str, Any]]:
+    """Load the byte offset index written next to a master file.
 
     Args:
-        sections: Dictionary of section titles to content
-        keywords: List of keywords to match section titles against
+        master_file_path: Path to the master markdown file
 
     Returns:
-        Combined content for the section
+        The index, or None for master files generated without one
     """
-    relevant_content = []
-    
-    for section_title, content in sections.items():
-        if any(keyword.lower() in section_title.lower() for keyword in keywords):
-            relevant_content.append(f"# {section_title.title()}\n\n{content}")
-    
-    # If no matching sections, include all content
-    if not relevant_content:
-        all_content = "\n\n".join([f"# {title.title()}\n\n{content}" for title, content in sections.items()])
-        return all_content[:8000]  # Limit content if too large
-    
-    return "\n\n".join(relevant_content)
+    index_path = index_path_for(master_file_path)
+    if not index_path.exists():
+        return None
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable master index {index_path}: {str(e)}")
+        return None
+    if index.get("master_file") != Path(master_file_path).name:
+        return None
+    return index
+
+
+def master_document_ranges(index: Dict[str, Any]) -> List[Tuple[str, int, int]]:
+    """(title, start, end) byte range of each document of a master file."""
+    return [
+        (document["title"], document["start"], document["end"])
+        for section in index["sections"]
+        for document in section["documents"]
+    ]
+
+
+def iter_master_documents(master_file_path: str, index: Dict[str, Any]) -> Iterator[Tuple[str, str]]:
+    """Yield (title, text) for each document of a master file by seeking to its offsets.
+
+    The text starts with the document's "## title" heading.
+    """
+    with open(master_file_path, 'rb') as f:
+        for section in index["sections"]:
+            for document in section["documents"]:
+                f.seek(document["start"])
+                raw = f.read(document["end"] - document["start"])
+                yield document["title"], raw.decode('utf-8', errors='replace')
 
 
 def ensure_section_heading(content: str, heading: str, level: int = 2) -> str:
@@ -0,0 +1,323 @@
+"""
+Retrieval Index Module
+
+This module builds a local retrieval index over the chunks of a master file, so each
+report section is written from its most relevant chunks under a token budget.
+
+The index is built in one streaming pass over the master file documents: each document is
+read from its byte offsets, hashed, chunked and tokenized (or given the chunk offsets and term
+counts stored for the same hash by an earlier run) and added to the BM25 postings before the
+next one is read. The persisted index holds chunk byte offsets and term counts, never the
+chunk text, which is read back from the master file for the chunks a section actually uses.
+"""
+
+import os
+import re
+import json
+import math
+import hashlib
+import logging
+from pathlib import Path
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Tuple
+
+import text_chunker
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Tokens per retrievable chunk (RETRIEVAL_CHUNK_TOKENS)
+CHUNK_TOKENS = int(os.environ.get("RETRIEVAL_CHUNK_TOKENS", "400"))
+# Chunks pulled per report section (RETRIEVAL_TOP_K)
+TOP_K = int(os.environ.get("RETRIEVAL_TOP_K", "12"))
+# Context tokens per report section (RETRIEVAL_TOKEN_BUDGET)
+TOKEN_BUDGET = int(os.environ.get("RETRIEVAL_TOKEN_BUDGET", "6000"))
+# Local sentence-transformers model for hybrid scoring, blank = BM25 only (RETRIEVAL_EMBEDDING_MODEL)
+EMBEDDING_MODEL = os.environ.get("RETRIEVAL_EMBEDDING_MODEL", "")
+
+INDEX_NAME = ".retrieval_index.json"
+INDEX_VERSION = 3
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+try:
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+    EMBEDDINGS_AVAILABLE = True
+except ImportError:
+    EMBEDDINGS_AVAILABLE = False
+
+TERM_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word terms used by BM25."""
+    return TERM_PATTERN.findall(text.lower())
+
+
+class RetrievalIndex:
+    """BM25 index over the chunks of a master file, with optional embedding vectors.
+
+    Chunks are (title, start, end, tokens) with byte offsets into the master file.
+    """
+
+    def __init__(self, master_file_path: str, fingerprint: str = "", embedding_model: str = ""):
+        self.master_file_path = master_file_path
+        self.fingerprint = fingerprint
+        self.embedding_model = embedding_model
+        self.embeddings = None
+        self.chunks: List[Dict[str, Any]] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.lengths: List[int] = []
+        self.total_length = 0
+
+    @property
+    def avg_length(self) -> float:
+        return (self.total_length / len(self.lengths)) if self.lengths else 0.0
+
+    def add_chunk(self, title: str, start: int, end: int, tokens: int, terms: Dict[str, int]) -> None:
+        """Add one chunk and its term counts, the text itself is not kept."""
+        chunk_id = len(self.chunks)
+        self.chunks.append({"title": title, "start": start, "end": end, "tokens": tokens})
+        length = sum(terms.values())
+        self.lengths.append(length)
+        self.total_length += length
+        for term, tf in terms.items():
+            self.postings.setdefault(term, []).append((chunk_id, tf))
+
+    def chunk_texts(self, chunk_ids: Iterable[int]) -> Dict[int, str]:
+        """Read the text of the given chunks from the master file."""
+        texts = {}
+        with open(self.master_file_path, 'rb') as f:
+            for chunk_id in sorted(chunk_ids):
+                chunk = self.chunks[chunk_id]
+                f.seek(chunk["start"])
+                texts[chunk_id] = f.read(chunk["end"] - chunk["start"]).decode('utf-8', errors='replace')
+        return texts
+
+    def bm25_scores(self, query: str) -> Dict[int, float]:
+        """BM25 score of every chunk that shares a term with the query."""
+        n = len(self.chunks)
+        avg_length = self.avg_length or 1
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, tf in postings:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[chunk_id] / avg_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return scores
+
+    def scores(self, query: str) -> Dict[int, float]:
+        """BM25, blended half and half with cosine similarity when embeddings are loaded."""
+        scores = self.bm25_scores(query)
+        if self.embeddings is None:
+            return scores
+
+        top = max(scores.values()) if scores else 0.0
+        query_vector = get_embedder(self.embedding_model).encode([query], normalize_embeddings=True)[0]
+        similarity = self.embeddings @ query_vector
+        return {
+            chunk_id: 0.5 * (scores.get(chunk_id, 0.0) / top if top else 0.0) + 0.5 * float(similarity[chunk_id])
+            for chunk_id in range(len(self.chunks))
+        }
+
+    def context_for(self, query: str, top_k: int = TOP_K, token_budget: int = TOKEN_BUDGET) -> str:
+        """Top-k chunks for a query that fit the token budget, in document order.
+
+        Args:
+            query: Keywords and heading of the report section
+            top_k: Maximum number of chunks
+            token_budget: Maximum total tokens of the returned context
+
+        Returns:
+            Context text with each chunk under its document heading
+        """
+        ranked = sorted(self.scores(query).items(), key=lambda item: (-item[1], item[0]))
+        selected = []
+        used = 0
+        for chunk_id, score in ranked:
+            if len(selected) >= top_k or score <= 0:
+                break
+            tokens = self.chunks[chunk_id]["tokens"]
+            if used + tokens > token_budget:
+                continue
+            selected.append(chunk_id)
+            used += tokens
+
+        if not selected:
+            # Nothing matched: the start of the document, within the budget
+            for chunk_id, chunk in enumerate(self.chunks):
+                if used + chunk["tokens"] > token_budget:
+                    break
+                selected.append(chunk_id)
+                used += chunk["tokens"]
+
+        logger.info(f"Retrieved {len(selected)} chunks ({used} tokens) for: {query[:60]}")
+        texts = self.chunk_texts(selected)
+        return "\n\n".join(
+            f"# {self.chunks[chunk_id]['title']}\n\n{texts[chunk_id]}" if self.chunks[chunk_id]["title"]
+            else texts[chunk_id]
+            for chunk_id in sorted(selected)
+        )
+
+
+_embedders = {}
+
+
+def get_embedder(model_name: str):
+    """Load a sentence-transformers model once per process."""
+    if model_name not in _embedders:
+        _embedders[model_name] = SentenceTransformer(model_name)
+    return _embedders[model_name]
+
+
+def index_path_for_company(master_file_path: str) -> Path:
+    """Retrieval index kept in the company folder, shared by all master files of the company."""
+    return Path(master_file_path).parent / INDEX_NAME
+
+
+def chunk_spans(text: str, chunk_tokens: int = CHUNK_TOKENS) -> List[List[int]]:
+    """[start, end, tokens] of the chunks of a document, byte offsets relative to its start."""
+    spans = []
+    char_pos = 0
+    byte_pos = 0
+    for chunk in text_chunker.chunk_text(text, max_tokens=chunk_tokens):
+        # Chunks are consecutive pieces of the text, find tolerates a hard split that did not
+        # decode back to the exact characters
+        start = char_pos if text.startswith(chunk, char_pos) else text.find(chunk, char_pos)
+        if start < 0:
+            start = char_pos
+        end = min(len(text), start + len(chunk))
+        byte_start = byte_pos + len(text[char_pos:start].encode('utf-8'))
+        byte_end = byte_start + len(text[start:end].encode('utf-8'))
+        if chunk.strip():
+            spans.append([byte_start, byte_end, text_chunker.count_tokens(chunk)])
+        char_pos, byte_pos = end, byte_end
+    return spans
+
+
+def load_stored(index_path: Path, settings: str) -> Dict[str, Any]:
+    """Chunk spans, term counts and embedding rows per document hash from a persisted index built with the same settings."""
+    stored = {"fingerprint": None, "documents": {}, "embeddings": None}
+    if not index_path.exists():
+        return stored
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable retrieval index {index_path}: {str(e)}")
+        return stored
+    if payload.get("version") != INDEX_VERSION or payload.get("settings") != settings:
+        return stored
+
+    embeddings = None
+    vectors_path = index_path.with_suffix(".npy")
+    if payload.get("embedding_model"):
+        if not (EMBEDDINGS_AVAILABLE and vectors_path.exists()):
+            return stored
+        embeddings = np.load(vectors_path)
+
+    row = 0
+    for document in payload.get("documents", []):
+        rows = (row, row + len(document["chunks"]))
+        stored["documents"][document["hash"]] = (document["chunks"], document["terms"], rows)
+        row = rows[1]
+    if embeddings is not None and len(embeddings) != row:
+        return {"fingerprint": None, "documents": {}, "embeddings": None}
+    stored["fingerprint"] = payload.get("fingerprint")
+    stored["embeddings"] = embeddings
+    return stored
+
+
+def save_index(index_path: Path, settings: str, index: RetrievalIndex, documents: List[Dict[str, Any]]) -> None:
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "version": INDEX_VERSION,
+        "settings": settings,
+        "fingerprint": index.fingerprint,
+        "embedding_model": index.embedding_model,
+        "documents": documents
+    }
+    tmp_path = index_path.with_suffix(".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, index_path)
+    if index.embeddings is not None:
+        np.save(index_path.with_suffix(".npy"), index.embeddings)
+
+
+def load_or_build_index(
+    master_file_path: str,
+    documents: Iterable[Tuple[str, int, int]],
+    index_path: Path,
+    embedding_model: str = EMBEDDING_MODEL
+) -> RetrievalIndex:
+    """Index the master file documents in one pass, reusing the chunks and terms of unchanged documents.
+
+    Args:
+        master_file_path: Path to the master markdown file
+        documents: (title, start, end) byte ranges of the master file documents, in order
+        index_path: Where the index is persisted for the company
+        embedding_model: Local embedding model, blank for BM25 only
+
+    Returns:
+        The retrieval index
+    """
+    if embedding_model and not EMBEDDINGS_AVAILABLE:
+        logger.warning("sentence-transformers not found, using BM25 only for retrieval")
+        embedding_model = ""
+
+    settings = f"{CHUNK_TOKENS}:{embedding_model}"
+    stored = load_stored(index_path, settings)
+    index = RetrievalIndex(master_file_path, embedding_model=embedding_model)
+    digest = hashlib.sha256(f"{INDEX_VERSION}:{settings}".encode('utf-8'))
+    entries = []
+    vectors = []
+    reused = 0
+
+    with open(master_file_path, 'rb') as f:
+        for title, start, end in documents:
+            f.seek(start)
+            raw = f.read(end - start)
+            doc_hash = hashlib.sha256(title.encode('utf-8') + b"\0" + raw).hexdigest()
+            digest.update(doc_hash.encode('utf-8'))
+
+            known = stored["documents"].get(doc_hash)
+            if known:
+                # Unchanged document: its chunks are neither decoded nor tokenized again
+                spans, terms, rows = known
+                reused += 1
+            else:
+                spans = chunk_spans(raw.decode('utf-8', errors='replace'))
+                chunk_texts = [raw[s:e].decode('utf-8', errors='replace') for s, e, _ in spans]
+                terms = [dict(Counter(tokenize(chunk_text))) for chunk_text in chunk_texts]
+            for (s, e, tokens), chunk_terms in zip(spans, terms):
+                index.add_chunk(title, start + s, start + e, tokens, chunk_terms)
+
+            if embedding_model and spans:
+                if known:
+                    vectors.append(stored["embeddings"][rows[0]:rows[1]])
+                else:
+                    vectors.append(get_embedder(embedding_model).encode(chunk_texts, normalize_embeddings=True))
+            entries.append({"hash": doc_hash, "chunks": spans, "terms": terms})
+
+    index.fingerprint = digest.hexdigest()
+    if embedding_model:
+        index.embeddings = np.vstack(vectors) if vectors else None
+
+    if index.fingerprint == stored["fingerprint"]:
+        logger.info(f"Loaded retrieval index with {len(index.chunks)} chunks from {index_path}")
+    else:
+        save_index(index_path, settings, index, entries)
+        logger.info(f"Built retrieval index with {len(index.chunks)} chunks at {index_path} "
+                    f"({reused} of {len(entries)} documents unchanged)")
+    return index
@@ -0,0 +1,245 @@
+"""
+Text Chunker Module
+
+This module splits large markdown documents into token-bounded chunks for LLM calls.
+"""
+
+import re
+import logging
+from functools import lru_cache
+from typing import Iterable, List, Tuple
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+    logger.warning("tiktoken not found. Install it with: pip install tiktoken")
+
+# Markdown headings that start a new section (## or ###)
+SECTION_PATTERN = re.compile(r'((?:^|\n)#{2,3}\s+[^\n]+)')
+
+# Paragraph boundaries, the separator stays with the preceding paragraph
+PARAGRAPH_PATTERN = re.compile(r'(?<=\n\n)')
+
+# Characters per token when tiktoken is not available
+CHARS_PER_TOKEN = 4
+
+DEFAULT_ENCODING = "cl100k_base"
+
+
+@lru_cache(maxsize=None)
+def get_encoder(model: str = "gpt-4"):
+    """Return the tiktoken encoder for a model, built once per model.
+
+    Args:
+        model: The model to get the encoder for
+
+    Returns:
+        The encoder, or None if tiktoken is not available or fails to load
+    """
+    if not TIKTOKEN_AVAILABLE:
+        return None
+
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            logger.warning(f"No tiktoken encoding registered for {model}, using {DEFAULT_ENCODING}")
+            return tiktoken.get_encoding(DEFAULT_ENCODING)
+    except Exception as e:
+        # Falls back to the character approximation, cached so the load is not retried per call
+        logger.error(f"Error loading tiktoken encoding: {str(e)}")
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4") -> int:
+    """Count the number of tokens in a text string.
+
+    Args:
+        text: The text to count tokens for
+        model: The model to count tokens for
+
+    Returns:
+        Token count
+    """
+    encoder = get_encoder(model)
+    if encoder is None:
+        # Approximate token count if tiktoken not available
+        return len(text) // CHARS_PER_TOKEN
+
+    try:
+        return len(encoder.encode(text, disallowed_special=()))
+    except Exception as e:
+        logger.error(f"Error counting tokens: {str(e)}")
+        return len(text) // CHARS_PER_TOKEN
+
+
+def hard_split(text: str, max_tokens: int, overlap_tokens: int = 0, model: str = "gpt-4") -> List[Tuple[str, int]]:
+    """Split a single piece of text at token boundaries.
+
+    Used for paragraphs that are larger than a chunk on their own.
+
+    Args:
+        text: Text to split
+        max_tokens: Maximum tokens per piece
+        overlap_tokens: Tokens repeated at the start of the next piece
+        model: The model to count tokens for
+
+    Returns:
+        List of (piece, token_count) tuples
+    """
+    step = max(1, max_tokens - overlap_tokens)
+    encoder = get_encoder(model)
+
+    if encoder is None:
+        # Character windows that approximate the token budget
+        size = max_tokens * CHARS_PER_TOKEN
+        char_step = step * CHARS_PER_TOKEN
+        return [(text[i:i + size], len(text[i:i + size]) // CHARS_PER_TOKEN)
+                for i in range(0, len(text), char_step)]
+
+    tokens = encoder.encode(text, disallowed_special=())
+    return [(encoder.decode(tokens[i:i + max_tokens]), len(tokens[i:i + max_tokens]))
+            for i in range(0, len(tokens), step)]
+
+
+def split_units(
+    text: str,
+    max_tokens: int,
+    model: str = "gpt-4",
+    overlap_tokens: int = 0
+) -> List[Tuple[str, int]]:
+    """Split text into units no larger than max_tokens, each tokenized exactly once.
+
+    Markdown sections are the preferred unit. Sections that are too large fall back to
+    paragraphs, and paragraphs that are still too large are hard split on tokens, with
+    overlap_tokens repeated between consecutive pieces.
+
+    Args:
+        text: Text to split
+        max_tokens: Maximum tokens per unit
+        model: The model to count tokens for
+        overlap_tokens: Tokens repeated at the start of the next piece of a hard split paragraph
+
+    Returns:
+        List of (unit, token_count) tuples, in document order
+    """
+    # re.split returns [preamble, heading, body, heading, body, ...], keep each heading with its body
+    parts = SECTION_PATTERN.split(text)
+    sections = [parts[0]] + [parts[i] + parts[i + 1] for i in range(1, len(parts) - 1, 2)]
+
+    units = []
+    for section in sections:
+        if not section:
+            continue
+        tokens = count_tokens(section, model)
+        if tokens <= max_tokens:
+            units.append((section, tokens))
+            continue
+
+        for para in PARAGRAPH_PATTERN.split(section):
+            if not para:
+                continue
+            tokens = count_tokens(para, model)
+            if tokens <= max_tokens:
+                units.append((para, tokens))
+            else:
+                units.extend(hard_split(para, max_tokens, overlap_tokens, model=model))
+    return units
+
+
+def pack_units(
+    units: Iterable[Tuple[str, int]],
+    max_tokens: int = 4000,
+    overlap_tokens: int = 0
+) -> List[str]:
+    """Pack (unit, token_count) pairs into chunks of at most max_tokens.
+
+    Args:
+        units: Units in document order, each no larger than max_tokens
+        max_tokens: Maximum tokens per chunk
+        overlap_tokens: Trailing tokens of a chunk repeated at the start of the next one
+
+    Returns:
+        List of text chunks
+    """
+    if overlap_tokens >= max_tokens:
+        raise ValueError("overlap_tokens must be smaller than max_tokens")
+
+    chunks = []
+    current: List[Tuple[str, int]] = []
+    current_tokens = 0
+
+    for unit, tokens in units:
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("".join(part for part, _ in current))
+
+            # Carry whole trailing units into the next chunk as overlap
+            carried: List[Tuple[str, int]] = []
+            carried_tokens = 0
+            for part, part_tokens in reversed(current):
+                if carried_tokens + part_tokens > overlap_tokens or carried_tokens + part_tokens + tokens > max_tokens:
+                    break
+                carried.insert(0, (part, part_tokens))
+                carried_tokens += part_tokens
+            current, current_tokens = carried, carried_tokens
+
+        current.append((unit, tokens))
+        current_tokens += tokens
+
+    if current:
+        chunks.append("".join(part for part, _ in current))
+
+    return chunks
+
+
+def chunk_text(
+    text: str,
+    max_tokens: int = 4000,
+    overlap_tokens: int = 0,
+    model: str = "gpt-4"
+) -> List[str]:
+    """Split text into chunks that fit within token limits.
+
+    Each unit is tokenized once and chunks are packed by summing the unit counts, so the
+    cost is linear in the size of the text.
+
+    Args:
+        text: Text to chunk
+        max_tokens: Maximum tokens per chunk
+        overlap_tokens: Trailing tokens of a chunk repeated at the start of the next one
+        model: The model to count tokens for
+
+    Returns:
+        List of text chunks
+    """
+    return pack_units(split_units(text, max_tokens, model, overlap_tokens), max_tokens, overlap_tokens)
+
+
+def chunk_texts(
+    texts: Iterable[str],
+    max_tokens: int = 4000,
+    overlap_tokens: int = 0,
+    model: str = "gpt-4"
+) -> List[str]:
+    """Chunk a stream of documents as if they were one text, without joining them first.
+
+    Args:
+        texts: Documents in order
+        max_tokens: Maximum tokens per chunk
+        overlap_tokens: Trailing tokens of a chunk repeated at the start of the next one
+        model: The model to count tokens for
+
+    Returns:
+        List of text chunks
+    """
+    units = (unit for text in texts for unit in split_units(text, max_tokens, model, overlap_tokens))
+    return pack_units(units, max_tokens, overlap_tokens)
@@ -0,0 +1,222 @@
+"""
+LLM Response Cache
+
+Shared on-disk cache of LLM responses for the scripts under ai/ and beta/.
+
+Responses are stored in SQLite, keyed by a SHA-256 of (model, messages, temperature,
+max_tokens) plus any extra generation parameters, so a repeated run with byte-identical
+prompts is answered from disk and only changed prompts reach the model. The cache is
+bounded in size; the least recently used entries are evicted first.
+
+Environment:
+    LLM_CACHE_PATH      SQLite file (default ~/.cache/llm_cache/responses.sqlite)
+    LLM_CACHE_MAX_MB    Size bound before eviction (default 512)
+    LLM_CACHE_BYPASS    true = skip lookups, still store fresh responses
+    LLM_CACHE_DISABLE   true = no reads and no writes
+
+Usage:
+    from llm_cache import get_cache
+    text = get_cache().chat_completion(client, model, messages, temperature=0.3, max_tokens=500)
+
+    python llm_cache.py stats
+    python llm_cache.py clear
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".cache", "llm_cache", "responses.sqlite")
+
+
+def _env_flag(name: str) -> bool:
+    return os.environ.get(name, "false").lower() in ("1", "true", "yes")
+
+
+def endpoint_of(client) -> str:
+    """Client class and base URL, so a local server, a mock and OpenAI never share entries."""
+    return f"{type(client).__name__}:{getattr(client, 'base_url', '') or ''}"
+
+
+class LLMCache:
+    """Size-bounded, content-addressed store of LLM responses."""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+        bypass: Optional[bool] = None,
+        disabled: Optional[bool] = None
+    ):
+        self.path = path or os.environ.get("LLM_CACHE_PATH", DEFAULT_PATH)
+        self.max_bytes = max_bytes if max_bytes is not None else int(float(os.environ.get("LLM_CACHE_MAX_MB", "512")) * 1024 * 1024)
+        self.bypass = _env_flag("LLM_CACHE_BYPASS") if bypass is None else bypass
+        self.disabled = _env_flag("LLM_CACHE_DISABLE") if disabled is None else disabled
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = None
+
+        if self.disabled:
+            return
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                response TEXT,
+                size INTEGER,
+                created_at REAL,
+                accessed_at REAL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed_at ON responses (accessed_at)")
+        self.conn.commit()
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict[str, Any]], temperature: Optional[float] = None,
+                 max_tokens: Optional[int] = None, **extra) -> str:
+        """Hash of everything that determines the response."""
+        payload = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "extra": extra
+        }
+        canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        if self.conn is None or self.bypass:
+            return None
+        with self.lock:
+            row = self.conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+            return row[0]
+
+    def put(self, key: str, response: str, model: str = "") -> None:
+        if self.conn is None or response is None:
+            return
+        size = len(response.encode("utf-8")) + len(key)
+        now = time.time()
+        with self.lock:
+            old = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, size, now, now)
+            )
+            self.total_bytes += size - (old[0] if old else 0)
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+            self.conn.commit()
+
+    def _evict(self) -> None:
+        # Drop least recently used entries until 90% of the bound
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+            if self.total_bytes <= target:
+                break
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.total_bytes -= size
+            evicted += 1
+        logger.info(f"LLM cache evicted {evicted} entries, {self.total_bytes} bytes kept")
+
+    def get_or_call(self, model: str, messages: List[Dict[str, Any]], temperature: Optional[float],
+                    max_tokens: Optional[int], call: Callable[[], str], **extra) -> str:
+        """Return the cached response, or run call() and store its result."""
+        key = self.make_key(model, messages, temperature, max_tokens, **extra)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        if self.conn is not None and self.bypass:
+            self.misses += 1
+        response = call()
+        self.put(key, response, model)
+        return response
+
+    def chat_completion(self, client, model: str, messages: List[Dict[str, Any]],
+                        temperature: Optional[float] = None, max_tokens: Optional[int] = None, **kwargs) -> str:
+        """Cached client.chat.completions.create for OpenAI compatible clients, returns the message text."""
+        def call():
+            params = {"model": model, "messages": messages, **kwargs}
+            if temperature is not None:
+                params["temperature"] = temperature
+            if max_tokens is not None:
+                params["max_tokens"] = max_tokens
+            response = client.chat.completions.create(**params)
+            return response.choices[0].message.content
+
+        return self.get_or_call(model, messages, temperature, max_tokens, call, endpoint=endpoint_of(client), **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        entries = 0
+        if self.conn is not None:
+            with self.lock:
+                entries = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "entries": entries,
+            "bytes": self.total_bytes if self.conn is not None else 0,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "bypass": self.bypass,
+            "disabled": self.disabled
+        }
+
+    def log_stats(self) -> None:
+        s = self.stats()
+        logger.info(f"LLM cache: {s['hits']} hits, {s['misses']} misses, {s['entries']} entries, {s['bytes']} bytes")
+
+    def clear(self) -> None:
+        if self.conn is None:
+            return
+        with self.lock:
+            self.conn.execute("DELETE FROM responses")
+            self.conn.commit()
+            self.conn.execute("VACUUM")
+            self.total_bytes = 0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> LLMCache:
+    """Process wide cache built from the environment."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache()
+    return _cache
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    cache = LLMCache(bypass=False, disabled=False)
+    if command == "clear":
+        cache.clear()
+        print(f"Cleared {cache.path}")
+    else:
+        print(json.dumps(cache.stats(), indent=2))
@@ -0,0 +1,114 @@
+'''
+Local store for NSE announcement attachments.
+
+Files are kept as <sha1 of url>.<ext>, so a cached attachment is found again whatever
+extension the server reported when it was first downloaded. Downloads share one
+requests.Session with a per-host connection pool and retries, and run on a thread pool.
+'''
+import os
+import glob
+import hashlib
+import logging
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0'
+DOWNLOAD_WORKERS = 8
+MAX_RETRIES = 3
+TIMEOUT = 30
+KNOWN_EXTENSIONS = ('pdf', 'xml')
+
+
+# Session with a connection pool per host and retries with backoff on errors and throttling
+def make_session(pool_size=DOWNLOAD_WORKERS, retries=MAX_RETRIES):
+    retry = Retry(
+        total=retries, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=['GET']
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.headers.update({'User-Agent': USER_AGENT})
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+# Attachment type from the Content-Type header, then the URL, then the first bytes
+def detect_extension(url, content_type, content):
+    content_type = (content_type or '').lower()
+    if 'pdf' in content_type:
+        return 'pdf'
+    if 'xml' in content_type:
+        return 'xml'
+    url_ext = os.path.splitext(urlparse(url).path)[1].lstrip('.').lower()
+    if url_ext in KNOWN_EXTENSIONS:
+        return url_ext
+    head = content[:64].lstrip()
+    if head.startswith(b'%PDF'):
+        return 'pdf'
+    if head.startswith(b'<'):
+        return 'xml'
+    logger.warning(f"Unknown content type: {content_type} for {url}. Assuming default .pdf")
+    return 'pdf'
+
+
+class AttachmentStore:
+    def __init__(self, root='notifications', session=None, max_workers=DOWNLOAD_WORKERS):
+        self.root = root
+        self.max_workers = max_workers
+        self.session = session or make_session(max_workers)
+        os.makedirs(root, exist_ok=True)
+
+    def key(self, url):
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    # Cached file for the url, or None
+    def get(self, url):
+        matches = sorted(glob.glob(os.path.join(self.root, self.key(url) + '.*')))
+        matches = [m for m in matches if not m.endswith('.part')]
+        return matches[0] if matches else None
+
+    # Local path of the attachment, downloaded only when it is not cached
+    def fetch(self, url):
+        cached = self.get(url)
+        if cached:
+            logger.info(f"File already exists locally: {cached}")
+            return cached
+        try:
+            response = self.session.get(url, timeout=TIMEOUT)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            logger.error(f"Failed to download {url}: {e}")
+            return None
+
+        extension = detect_extension(url, response.headers.get('Content-Type'), response.content)
+        local_path = os.path.join(self.root, f"{self.key(url)}.{extension}")
+        # Write to a temporary name first so an interrupted run never leaves a partial file in the cache
+        tmp_path = local_path + '.part'
+        with open(tmp_path, 'wb') as f:
+            f.write(response.content)
+        os.replace(tmp_path, local_path)
+        return local_path
+
+    # fetch() that logs any failure and returns None, so one bad attachment does not stop fetch_all
+    def fetch_or_none(self, url):
+        try:
+            return self.fetch(url)
+        except Exception as e:
+            logger.error(f"Failed to fetch {url}: {e}")
+            return None
+
+    # Fetch many urls concurrently, returns {url: local path or None}
+    def fetch_all(self, urls):
+        unique_urls = list(dict.fromkeys(urls))
+        if not unique_urls:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(unique_urls))) as executor:
+            paths = list(executor.map(self.fetch_or_none, unique_urls))
+        return dict(zip(unique_urls, paths))
@@ -0,0 +1,143 @@
+'''
+Batched summary and sentiment for announcement texts.
+
+Identical announcements (after whitespace and case normalization) are summarized once.
+Short announcements are packed several to a request, each under an id, and the model
+answers with one JSON object per id. Long announcements, and anything the model leaves out
+or returns malformed, go through the single announcement path.
+'''
+import re
+import json
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from llm_cache import get_cache
+
+logger = logging.getLogger(__name__)
+
+SHORT_WORDS = 400  # announcements up to this many words are packed together
+BATCH_WORDS = 1500  # words per packed request
+BATCH_ITEMS = 8  # announcements per packed request
+SUMMARY_TOKENS = 250  # completion tokens per packed announcement
+
+# A score written as 0.7, .75, 1 or 0, not a digit of a larger number
+SCORE_NUMBER = r'(?<![\d.])(?:[01]?\.\d+|[01](?:\.0+)?)(?!\d)'
+SCORE_PATTERN = re.compile(SCORE_NUMBER)
+# The number after a score label, e.g. "Sentiment score (0-1): 0.7" or "the score is 0.65"
+LABELLED_SCORE_PATTERN = re.compile(r'\bscore\b[^:=\n]*?(?::|=|\bis\b)\s*(' + SCORE_NUMBER + ')', re.IGNORECASE)
+
+BATCH_PROMPT = (
+    "Summarize each company announcement below and give an investor sentiment score between "
+    "0 (negative sentiment) and 1 (positive sentiment). Reply with JSON only, in the form "
+    '{"items": [{"id": "<id>", "summary": "<summary>", "sentiment": <float>}]}, '
+    "with one entry for every id.\n\n"
+)
+
+
+# Same key for announcements that differ only in whitespace or case
+def text_key(text):
+    normalized = ' '.join(text.split()).lower()
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+# Score in a model reply, clamped to [0, 1]; -1.0 when there is none
+# The number after a "score" label wins, otherwise the last score-like number, so the
+# scale in "On a scale of 0 to 1 ..." is not taken for the answer
+def parse_sentiment(value):
+    if isinstance(value, (int, float)):
+        score = float(value)
+    else:
+        text = str(value)
+        labelled = LABELLED_SCORE_PATTERN.search(text)
+        if labelled:
+            score = float(labelled.group(1))
+        else:
+            matches = SCORE_PATTERN.findall(text)
+            if not matches:
+                return -1.0
+            score = float(matches[-1])
+    return min(max(score, 0.0), 1.0)
+
+
+# JSON object in a reply, tolerating code fences or text around it
+def parse_json_reply(reply):
+    start, end = reply.find('{'), reply.rfind('}')
+    if start == -1 or end <= start:
+        return None
+    try:
+        return json.loads(reply[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+
+
+# Group short texts into packed batches, returns (batches, keys of the long texts)
+def pack_batches(keys, texts):
+    batches, long_keys, current, current_words = [], [], [], 0
+    for key in keys:
+        words = len(texts[key].split())
+        if words > SHORT_WORDS:
+            long_keys.append(key)
+            continue
+        if current and (len(current) >= BATCH_ITEMS or current_words + words > BATCH_WORDS):
+            batches.append(current)
+            current, current_words = [], 0
+        current.append(key)
+        current_words += words
+    if current:
+        batches.append(current)
+    return batches, long_keys
+
+
+# One request for a packed batch, returns {key: (summary, score)} for the ids the model answered
+def summarize_batch(batch, texts, client, model):
+    ids = {f"A{i + 1}": key for i, key in enumerate(batch)}
+    body = "\n\n".join(f"### id: {item_id}\n{texts[key]}" for item_id, key in ids.items())
+    try:
+        reply = get_cache().chat_completion(
+            client, model, temperature=0.2, max_tokens=SUMMARY_TOKENS * len(batch),
+            messages=[{"role": "user", "content": BATCH_PROMPT + body}]
+        )
+    except Exception as e:
+        logger.error(f"Error in batched summary of {len(batch)} announcements: {e}")
+        return {}
+
+    parsed = parse_json_reply(reply or '')
+    items = parsed.get('items', []) if isinstance(parsed, dict) else []
+    results = {}
+    for item in items:
+        if not isinstance(item, dict) or item.get('id') not in ids or not item.get('summary'):
+            continue
+        results[ids[item['id']]] = (str(item['summary']).strip(), parse_sentiment(item.get('sentiment', '')))
+    return results
+
+
+# Summary and sentiment for every text, in order
+def summarize_texts(texts, client, model, fallback, max_workers=4):
+    keys = [text_key(text) for text in texts]
+    unique = {}
+    for key, text in zip(keys, texts):
+        if text.strip() and key not in unique:
+            unique[key] = text
+
+    batches, long_keys = pack_batches(list(unique), unique)
+    logger.info(f"Summarizing {len(unique)} unique of {len(texts)} announcements in "
+                f"{len(batches) + len(long_keys)} requests")
+
+    results = {}
+    if unique:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(batches) + len(long_keys))) as executor:
+            # Long announcements go straight through the single announcement path
+            singles = executor.map(lambda key: fallback(unique[key]), long_keys)
+            for batch_results in executor.map(lambda b: summarize_batch(b, unique, client, model), batches):
+                results.update(batch_results)
+            results.update(zip(long_keys, singles))
+
+        # Announcements the batched replies missed go through the single announcement path too
+        missing = [key for key in unique if key not in results]
+        if missing:
+            logger.warning(f"{len(missing)} announcements missing from batched replies, summarizing individually")
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(missing))) as executor:
+                results.update(zip(missing, executor.map(lambda key: fallback(unique[key]), missing)))
+
+    return [results.get(key, ("", -1.0)) for key in keys]
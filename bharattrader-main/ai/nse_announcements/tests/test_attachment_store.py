@@ -0,0 +1,108 @@
+'''
+Offline tests for AttachmentStore against a local HTTP stand-in for the NSE archive.
+
+    python -m unittest discover -s tests
+'''
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from attachment_store import AttachmentStore, make_session
+
+# path -> (status, Content-Type, body)
+ROUTES = {
+    '/corporate/result.pdf': (200, 'application/pdf', b'%PDF-1.4 result'),
+    '/corporate/filing.xml': (200, 'text/xml', b'<xbrl>dividend</xbrl>'),
+    # NSE often serves attachments as octet-stream from URLs without an extension
+    '/corporate/download': (200, 'application/octet-stream', b'%PDF-1.7 no extension'),
+    '/corporate/missing.pdf': (404, 'text/html', b'not found'),
+}
+
+
+class ArchiveHandler(BaseHTTPRequestHandler):
+    hits = {}
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with self.lock:
+            self.hits[self.path] = self.hits.get(self.path, 0) + 1
+        status, content_type, body = ROUTES.get(self.path, (404, 'text/html', b''))
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class AttachmentStoreTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), ArchiveHandler)
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        ArchiveHandler.hits.clear()
+        self.root = tempfile.mkdtemp()
+        # No retries, so the 404 route answers at once
+        self.store = AttachmentStore(self.root, session=make_session(retries=0), max_workers=4)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def url(self, path):
+        return self.base_url + path
+
+    def test_extension_from_content_type_and_content(self):
+        self.assertTrue(self.store.fetch(self.url('/corporate/result.pdf')).endswith('.pdf'))
+        self.assertTrue(self.store.fetch(self.url('/corporate/filing.xml')).endswith('.xml'))
+        self.assertTrue(self.store.fetch(self.url('/corporate/download')).endswith('.pdf'))
+
+    def test_cached_attachment_is_not_downloaded_again(self):
+        url = self.url('/corporate/download')
+        first = self.store.fetch(url)
+        second = AttachmentStore(self.root, session=make_session(retries=0)).fetch(url)
+        self.assertEqual(first, second)
+        self.assertEqual(ArchiveHandler.hits['/corporate/download'], 1)
+        with open(first, 'rb') as f:
+            self.assertEqual(f.read(), b'%PDF-1.7 no extension')
+
+    def test_fetch_all_downloads_each_url_once_and_keeps_failures_apart(self):
+        urls = [self.url(path) for path in ROUTES] + [self.url('/corporate/result.pdf')]
+        paths = self.store.fetch_all(urls)
+        self.assertEqual(set(paths), set(urls))
+        self.assertIsNone(paths[self.url('/corporate/missing.pdf')])
+        self.assertEqual(sum(path is not None for path in paths.values()), 3)
+        self.assertEqual(ArchiveHandler.hits['/corporate/result.pdf'], 1)
+        self.assertFalse([name for name in os.listdir(self.root) if name.endswith('.part')])
+
+    def test_fetch_all_survives_an_unexpected_error(self):
+        broken = self.url('/corporate/filing.xml')
+        fetch = self.store.fetch
+
+        def failing_fetch(url):
+            if url == broken:
+                raise OSError('disk full')
+            return fetch(url)
+
+        self.store.fetch = failing_fetch
+        paths = self.store.fetch_all([self.url('/corporate/result.pdf'), broken])
+        self.assertIsNone(paths[broken])
+        self.assertTrue(paths[self.url('/corporate/result.pdf')].endswith('.pdf'))
+
+
+if __name__ == '__main__':
+    unittest.main()
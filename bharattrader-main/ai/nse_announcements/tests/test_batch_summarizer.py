@@ -0,0 +1,71 @@
+'''
+Tests for the sentiment score parsing and request packing of batch_summarizer.
+
+    python -m unittest discover -s tests
+'''
+import os
+import sys
+import unittest
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(here, '..'))
+# llm_cache lives in bharattrader-main/ai
+sys.path.insert(0, os.path.join(here, '..', '..'))
+import batch_summarizer
+from batch_summarizer import pack_batches, parse_sentiment, summarize_texts
+
+
+class ParseSentimentTest(unittest.TestCase):
+    def test_plain_numbers(self):
+        self.assertEqual(parse_sentiment('0.7'), 0.7)
+        self.assertEqual(parse_sentiment(' 1 '), 1.0)
+        self.assertEqual(parse_sentiment('0'), 0.0)
+        self.assertEqual(parse_sentiment(0.35), 0.35)
+
+    def test_leading_dot(self):
+        self.assertEqual(parse_sentiment('.75'), 0.75)
+        self.assertEqual(parse_sentiment('Score: .4'), 0.4)
+
+    def test_labelled_score_after_the_scale(self):
+        self.assertEqual(parse_sentiment('Sentiment score (0-1): 0.7'), 0.7)
+        self.assertEqual(parse_sentiment('On a scale of 0 to 1 the score is 0.65'), 0.65)
+        self.assertEqual(parse_sentiment('score = 0.2, on a 0 to 1 scale'), 0.2)
+
+    def test_unlabelled_prose_takes_the_last_score(self):
+        self.assertEqual(parse_sentiment('On a scale of 0 to 1, I would rate this 0.8.'), 0.8)
+        self.assertEqual(parse_sentiment('{"sentiment": 0.55}'), 0.55)
+
+    def test_out_of_range_and_missing(self):
+        self.assertEqual(parse_sentiment(1.4), 1.0)
+        self.assertEqual(parse_sentiment('positive'), -1.0)
+        self.assertEqual(parse_sentiment(''), -1.0)
+
+
+class PackingTest(unittest.TestCase):
+    def test_long_texts_are_not_packed(self):
+        texts = {'short1': 'word ' * 10, 'long': 'word ' * (batch_summarizer.SHORT_WORDS + 1), 'short2': 'word ' * 10}
+        batches, long_keys = pack_batches(list(texts), texts)
+        self.assertEqual(batches, [['short1', 'short2']])
+        self.assertEqual(long_keys, ['long'])
+
+    def test_long_texts_go_through_the_single_path(self):
+        batched = []
+
+        def fake_batch(batch, texts, client, model):
+            batched.append(list(batch))
+            return {key: ('batched', 0.5) for key in batch}
+
+        long_text = 'long ' * (batch_summarizer.SHORT_WORDS + 1)
+        original, batch_summarizer.summarize_batch = batch_summarizer.summarize_batch, fake_batch
+        try:
+            outputs = summarize_texts(['short one', long_text, 'Short  ONE'], None, 'model',
+                                      lambda text: ('single', 0.9))
+        finally:
+            batch_summarizer.summarize_batch = original
+        self.assertEqual(outputs, [('batched', 0.5), ('single', 0.9), ('batched', 0.5)])
+        self.assertEqual(len(batched), 1)
+        self.assertEqual(len(batched[0]), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,19 +1,29 @@
 import pandas as pd
-import requests
 import fitz  # PyMuPDF
 import os
 from openai import OpenAI
-from urllib.parse import urlparse
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from dotenv import load_dotenv, find_dotenv
 from datetime import datetime
 import argparse
 import logging
+import sys
+
+# Shared LLM response cache lives in bharattrader-main/ai
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from llm_cache import get_cache
+from attachment_store import AttachmentStore
+from batch_summarizer import summarize_texts, parse_sentiment
 
 log_timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
 LOCAL_MODEL = '' #'llama3.1:latest'  # keep it blank if, gpt is used
 LOCAL_URL = 'http://10.0.0.4:7862/v1'  # Update with cloud URL or Local
 GPT_MODEL = 'gpt-4o-mini'  # if LOCAL_MODEL is blank, GPT will be used
 CONTEXT_LEN = 1500
+DOWNLOAD_WORKERS = 8  # concurrent attachment downloads
+EXTRACT_WORKERS = os.cpu_count() or 4  # processes extracting PDF text
+LLM_WORKERS = 4  # concurrent summary requests
 
 # Logging configuration
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -33,8 +43,6 @@ def get_llm_client_model():
         my_local_client = OpenAI(base_url=LOCAL_URL, api_key="local-llm")
         return my_local_client, LOCAL_MODEL
 
-client, model = get_llm_client_model()
-
 critical_subjects = [
     "Updates", "Press Release", "Financial Result Updates", "Sale or Disposal-XBRL",
     "Acquisition-XBRL", "Record Date", "Investor Presentation",
@@ -53,51 +61,30 @@ routine_updates_subjects = [
     "Disclosure under SEBI (PIT) Reg 2015"
 ]
 
-# Function to download and extract PDF or XML text
-def download_and_extract_pdf(url, local_path):
-    # Skip download if file already exists
-    if os.path.exists(local_path):
-        logger.info(f"File already exists locally: {local_path}")
-        return extract_pdf_text(local_path)
-
-    try:
-        # Make the request to download the file
-        response = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'})
-        response.raise_for_status()  # Ensure no bad response
-
-        # Check the Content-Type header to determine file type
-        content_type = response.headers.get('Content-Type')
-        file_extension = None
-        
-        if 'application/pdf' in content_type:
-            file_extension = 'pdf'
-        elif 'application/xml' in content_type:
-            file_extension = 'xml'
-        
-        # Ensure we append the correct file extension to local_path
-        if file_extension:
-            local_path += f'.{file_extension}'
-        else:
-            logger.warning(f"Unknown content type: {content_type}. Assuming default .pdf")
-            file_extension = 'pdf'
-            local_path += '.pdf'
-        
-        # Write the file to the local path
-        with open(local_path, 'wb') as f:
-            f.write(response.content)
-        
-        # Extract text based on file type
-        if file_extension == 'pdf':
-            return extract_pdf_text(local_path)
-        elif file_extension == 'xml':
-            return extract_xml_text(local_path)
-        else:
-            logger.error(f"Unsupported file type: {file_extension}")
-            return ""
-    
-    except requests.RequestException as e:
-        logger.error(f"Failed to download {url}: {e}")
+# Extract text from a downloaded PDF or XML attachment
+def extract_text(local_path):
+    if not local_path:
         return ""
+    if local_path.endswith('.xml'):
+        return extract_xml_text(local_path)
+    return extract_pdf_text(local_path)
+
+# Extract attachments in worker processes, each file once, returns {path: text}
+# A file that fails to extract gets an empty text instead of stopping the run
+def extract_all(local_paths):
+    unique_paths = [p for p in dict.fromkeys(local_paths) if p]
+    if not unique_paths:
+        return {}
+    texts = {}
+    with ProcessPoolExecutor(max_workers=min(EXTRACT_WORKERS, len(unique_paths))) as executor:
+        futures = {path: executor.submit(extract_text, path) for path in unique_paths}
+        for path, future in futures.items():
+            try:
+                texts[path] = future.result()
+            except Exception as e:
+                logger.error(f"Failed to extract text from {path}: {e}")
+                texts[path] = ""
+    return texts
 
 # Function to extract text from PDF
 def extract_pdf_text(local_path):
@@ -124,24 +111,25 @@ def truncate_words(text):
     return ' '.join(words[:CONTEXT_LEN]) if len(words) > CONTEXT_LEN else text
 
 # Get summary and sentiment using OpenAI API
-def get_summary_and_sentiment(text):
+def get_summary_and_sentiment(text, client, model):
     truncated_text = truncate_words(text)
     try:
-        response = client.chat.completions.create(
-            model=model, temperature=1.0, max_tokens=500,
+        # Repeated announcements are answered from the response cache
+        cache = get_cache()
+        summary = cache.chat_completion(
+            client, model, temperature=1.0, max_tokens=500,
             messages=[
                 {"role": "user", "content": "Please summarize the company announcement provided."},
                 {"role": "user", "content": truncated_text}
             ]
         )
-        summary = response.choices[0].message.content
-        sentiment_response = client.chat.completions.create(
-            model=model, temperature=1.0, max_tokens=20,
+        sentiment = cache.chat_completion(
+            client, model, temperature=1.0, max_tokens=20,
             messages=[
                 {"role": "user", "content": f"Provide an investor sentiment analysis score in a scale between 0 (negative sentiment) to 1 (positive sentiment) for the following text. The answer should be a single float value, no explanation is required: {summary}"}
             ]
         )
-        sentiment_score = float(sentiment_response.choices[0].message.content.strip())
+        sentiment_score = parse_sentiment(sentiment)
         return summary, sentiment_score
     except Exception as e:
         logger.error(f"Error in generating summary/sentiment: {e}")
@@ -152,13 +140,8 @@ def write_to_file(file, data):
     with open(file, 'a') as f:
         f.write(data)
 
-# Main processing function
-def process_announcement(index, row, stock):
-    pdf_url = row['ATTACHMENT']
-    filename = os.path.basename(urlparse(pdf_url).path)
-    pdf_local_path = os.path.join('notifications', filename)
-    pdf_text = download_and_extract_pdf(pdf_url, pdf_local_path)
-    summary, sentiment_score = get_summary_and_sentiment(pdf_text)
+# Result row for one announcement
+def build_result(row, stock, summary, sentiment_score):
     return {
         'Stock': stock, 'Company': row['COMPANY NAME'], 'Subject': row['SUBJECT'],
         'Summary': summary, 'Score': sentiment_score, 'Link': row['ATTACHMENT']
@@ -173,25 +156,34 @@ def main():
     args = parser.parse_args()
 
     try:
+        # Built here rather than at import, so extraction worker processes do not create clients
+        client, model = get_llm_client_model()
         stocks = pd.read_csv("stocks.csv", usecols=["Ticker"])
         df = pd.read_csv(args.file)
         df = df[~df['SUBJECT'].isin(routine_updates_subjects) & df['SUBJECT'].isin(critical_subjects)]
         logger.info(f"Analyzing {len(df)} announcements")
 
-        result_df = pd.DataFrame(columns=['Stock', 'Company', 'Subject', 'Summary', 'Score', 'Link'])
+        # Announcements per stock in stocks.csv order, from a single groupby
+        groups = dict(tuple(df[df['SYMBOL'].isin(stocks["Ticker"])].groupby('SYMBOL', sort=False)))
+        jobs = [(stock, row) for stock in stocks["Ticker"] if stock in groups for _, row in groups[stock].iterrows()]
+
+        # Download, extract and summarize concurrently, each stage keeps the job order
+        store = AttachmentStore('notifications', max_workers=DOWNLOAD_WORKERS)
+        local_paths = store.fetch_all([row['ATTACHMENT'] for _, row in jobs])
+        job_paths = [local_paths.get(row['ATTACHMENT']) for _, row in jobs]
+        texts = extract_all(job_paths)
+        outputs = summarize_texts(
+            [truncate_words(texts.get(path, "")) for path in job_paths],
+            client, model, partial(get_summary_and_sentiment, client=client, model=model), max_workers=LLM_WORKERS
+        )
 
-        for stock in stocks["Ticker"]:
-            for index, row in df[df['SYMBOL'] == stock].iterrows():
-                try:
-                    result = process_announcement(index, row, stock)
-                    # Append the new row to the DataFrame
-                    result_df.loc[len(result_df)] = result
-                except Exception as e:
-                    logger.error(f"Error processing {stock}: {e}")
+        results = [build_result(row, stock, summary, score) for (stock, row), (summary, score) in zip(jobs, outputs)]
+        result_df = pd.DataFrame(results, columns=['Stock', 'Company', 'Subject', 'Summary', 'Score', 'Link'])
 
         file_name = f'output/{args.file}_report_{log_timestamp}.csv'
         result_df.to_csv(file_name, index=False)
         logger.info(f"Results saved to {file_name}")
+        get_cache().log_stats()
 
     except Exception as e:
         logger.error(f"Error during processing: {e}")
@@ -13,12 +13,22 @@ from smolagents import CodeAgent, LiteLLMModel
 import datetime
 import csv
 
+from orchestrator import run_businesses
+
+# "true" runs offline with the stub agent instead of the model (TURNAROUND_STUB)
+use_stub = os.getenv("TURNAROUND_STUB", "false").lower() == "true"
+
 # Initialize the tools and models
 #local_model=mlx_model = MLXModel("Path to local model directory")
-model = LiteLLMModel(model_id="openai/gpt-4.1-mini", api_key=os.getenv("OPENAI_API_KEY"))
+if not use_stub:
+    model = LiteLLMModel(model_id="openai/gpt-4.1-mini", api_key=os.getenv("OPENAI_API_KEY"))
 
-#Create the agent with the model and tools
-agent = CodeAgent(tools=[web_fetcher, save_report, fs_reader, cmd_executor], model=model, additional_authorized_imports=["os", "openai", "json", "csv"]) # Not adding base tools.
+#Create an agent with the model and tools, one per business as agents keep their run memory
+def agent_factory():
+    if use_stub:
+        from stub_backend import StubAgent
+        return StubAgent()
+    return CodeAgent(tools=[web_fetcher, save_report, fs_reader, cmd_executor], model=model, additional_authorized_imports=["os", "openai", "json", "csv"]) # Not adding base tools.
 
 # Define the data directory and today's date
 data_dir = "data/financial_data.csv"
@@ -64,13 +74,5 @@ with open(data_dir, 'r', encoding='utf-8') as file:
             business_entry = f"""Name: {name} / NSE: {nse_code} / BSE: {bse_code}"""
         businesses.append(business_entry)
 
-total_businesses = len(businesses)
-count = 0
-for business in businesses:
-    print(f"Starting analyzing financial data and generating a report for {business}... Please wait.")
-    final_instructions = instructions.format(business_name=business)
-    #print(f"Final instructions for the agent: {final_instructions}")
-    response = agent.run(final_instructions, max_steps=20)
-    # Print progress
-    count += 1
-    print(f"Completed {count}/{total_businesses} businesses. Current business: {business}")
\ No newline at end of file
+# Businesses run in parallel, finished ones are skipped on reruns
+run_businesses(businesses, agent_factory, instructions, max_steps=20)
@@ -1,8 +1,12 @@
 from smolagents import tool
+import os
 import datetime
 
 instructions = """You are simple file writer tool that dumps the input text into a file."""
 
+# Stub runs (TURNAROUND_STUB) save their canned reports apart from real ones (TURNAROUND_OUTPUT_DIR)
+output_dir = os.getenv("TURNAROUND_OUTPUT_DIR", "output/stub" if os.getenv("TURNAROUND_STUB", "false").lower() == "true" else "output")
+
 @tool
 def save_report(md_report: str, business_name: str) -> None:
     """
@@ -17,10 +21,11 @@ def save_report(md_report: str, business_name: str) -> None:
     if not md_report:
         return "No file path provided."
     
-    output_file = f"output/{business_name}" + datetime.datetime.now().strftime("%Y%m%d_%H%M%S") + "_report.md"
+    output_file = os.path.join(output_dir, business_name + datetime.datetime.now().strftime("%Y%m%d_%H%M%S") + "_report.md")
 
     # Save the output to a file
     try:
+        os.makedirs(output_dir, exist_ok=True)
         with open(output_file, "w", encoding="utf-8") as file:
             file.write(md_report)
     except Exception as e:
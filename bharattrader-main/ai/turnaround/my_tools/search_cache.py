@@ -0,0 +1,83 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+# Web search results are reused for this many hours (SEARCH_CACHE_TTL_HOURS)
+TTL_HOURS = float(os.getenv("SEARCH_CACHE_TTL_HOURS", "24"))
+# Stub runs keep their canned results apart from real ones (SEARCH_BACKEND)
+CACHE_FILE = os.getenv("SEARCH_CACHE_FILE", "cache/stub_search_cache.json" if os.getenv("SEARCH_BACKEND") == "stub"
+                       else "cache/search_cache.json")
+
+
+class SearchCache:
+    """
+    Thread safe TTL cache of search results, persisted to a JSON file so that
+    agents running in parallel and later reruns share the same results.
+    Results are keyed by backend and query, so one backend never serves another's results.
+    """
+
+    def __init__(self, path: str = CACHE_FILE, ttl_hours: float = TTL_HOURS):
+        self.path = path
+        self.ttl = ttl_hours * 3600
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as file:
+                    self.entries = json.load(file)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    @staticmethod
+    def key(query: str, backend: str) -> str:
+        normalized = " ".join(query.split()).lower()
+        return hashlib.sha256(f"{backend}\n{normalized}".encode("utf-8")).hexdigest()
+
+    def get(self, query: str, backend: str):
+        with self.lock:
+            entry = self.entries.get(self.key(query, backend))
+            if entry and time.time() - entry["time"] < self.ttl:
+                return entry["result"]
+        return None
+
+    def put(self, query: str, backend: str, result: str) -> None:
+        with self.lock:
+            now = time.time()
+            self.entries = {k: v for k, v in self.entries.items() if now - v["time"] < self.ttl}
+            self.entries[self.key(query, backend)] = {"query": query, "backend": backend, "time": now, "result": result}
+            self._save()
+
+    def _save(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(self.entries, file)
+        os.replace(tmp_path, self.path)
+
+    def get_or_search(self, query: str, backend: str, search) -> str:
+        """
+        Returns the cached result of the backend for the query, or runs search(query) and caches it.
+        A search that raises is not cached.
+        """
+        cached = self.get(query, backend)
+        if cached is not None:
+            return cached
+        result = search(query)
+        self.put(query, backend, result)
+        return result
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> SearchCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SearchCache()
+    return _cache
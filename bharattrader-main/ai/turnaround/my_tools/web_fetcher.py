@@ -2,9 +2,37 @@ from smolagents import tool
 import os
 from openai import OpenAI
 import json
+import threading
+from .search_cache import get_search_cache
 
 model="gpt-4.1-mini"
-client = OpenAI()
+# "stub" answers searches offline with canned results (SEARCH_BACKEND)
+backend = os.getenv("SEARCH_BACKEND", "openai")
+
+client = None
+client_lock = threading.Lock()
+
+def get_client():
+    global client
+    with client_lock:
+        if client is None:
+            client = OpenAI()
+    return client
+
+def openai_search(query: str) -> str:
+    response = get_client().responses.create(
+        model=model,  # or another supported model
+        input=query,
+        tools=[
+            {
+                "type": "web_search"
+            }
+        ]
+    )
+    return json.dumps(response.output, default=lambda o: o.__dict__, indent=2)
+
+def stub_search(query: str) -> str:
+    return json.dumps([{"type": "message", "content": [{"type": "output_text", "text": f"Stub search results for: {query}"}]}], indent=2)
 
 @tool
 def search_web(query: str) -> str:
@@ -20,13 +48,6 @@ def search_web(query: str) -> str:
     if not query:
         return "No file path provided."
     
-    response = client.responses.create(
-        model=model,  # or another supported model
-        input=query,
-        tools=[
-            {
-                "type": "web_search"
-            }
-        ]
-    )
-    return json.dumps(response.output, default=lambda o: o.__dict__, indent=2)
\ No newline at end of file
+    # Results are shared by all agents and reruns until they expire
+    search = stub_search if backend == "stub" else openai_search
+    return get_search_cache().get_or_search(query, backend, search)
@@ -0,0 +1,120 @@
+import os
+import json
+import time
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Businesses analyzed in parallel (TURNAROUND_WORKERS)
+MAX_WORKERS = int(os.getenv("TURNAROUND_WORKERS", "4"))
+# Wall clock seconds allowed per business, 0 for no limit (TURNAROUND_TIME_BUDGET)
+TIME_BUDGET = float(os.getenv("TURNAROUND_TIME_BUDGET", "600"))
+# Stub runs (TURNAROUND_STUB) keep their checkpoint and reports apart from real runs (TURNAROUND_OUTPUT_DIR)
+OUTPUT_DIR = os.getenv("TURNAROUND_OUTPUT_DIR", "output/stub" if os.getenv("TURNAROUND_STUB", "false").lower() == "true" else "output")
+CHECKPOINT_FILE = os.path.join(OUTPUT_DIR, ".completed.json")
+
+
+class Checkpoint:
+    """
+    Businesses whose agent run completed, kept on disk so reruns skip them.
+    Delete the file to analyze every business again.
+    """
+
+    def __init__(self, path: str = CHECKPOINT_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.done = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as file:
+                    self.done = json.load(file)
+            except (OSError, ValueError):
+                # A corrupt checkpoint only means those businesses are analyzed again
+                self.done = {}
+
+    def is_done(self, business: str) -> bool:
+        return business in self.done
+
+    def mark_done(self, business: str, seconds: float) -> None:
+        with self.lock:
+            self.done[business] = {
+                "completed_at": datetime.datetime.now().isoformat(timespec="seconds"),
+                "seconds": round(seconds, 1)
+            }
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(self.done, file, indent=2)
+            os.replace(tmp_path, self.path)
+
+
+def analyze_business(business: str, agent_factory, instructions: str, time_budget: float, max_steps: int) -> tuple:
+    """
+    Runs a fresh agent for one business. Agents keep per-run memory, so each business gets
+    its own. When the time budget runs out the agent is interrupted at its next step.
+    Returns the status, "done", "timeout" or "failed: <error>", and the seconds taken.
+    """
+    print(f"Starting analyzing financial data and generating a report for {business}... Please wait.")
+    try:
+        agent = agent_factory()
+    except Exception as e:
+        return f"failed: {e}", 0.0
+    timed_out = threading.Event()
+
+    def interrupt():
+        timed_out.set()
+        agent.interrupt()
+
+    timer = threading.Timer(time_budget, interrupt) if time_budget > 0 else None
+    start = time.time()
+    if timer:
+        timer.start()
+    status = "done"
+    try:
+        agent.run(instructions.format(business_name=business), max_steps=max_steps)
+    except Exception as e:
+        status = f"failed: {e}"
+    finally:
+        if timer:
+            timer.cancel()
+    seconds = time.time() - start
+    # Only a run the timer actually interrupted is a timeout, one that finished just past the budget is done
+    if timed_out.is_set() and status != "done":
+        status = "timeout"
+    return status, seconds
+
+
+def run_businesses(businesses, agent_factory, instructions: str, max_workers: int = MAX_WORKERS,
+                   time_budget: float = TIME_BUDGET, max_steps: int = 20, checkpoint_path: str = CHECKPOINT_FILE) -> dict:
+    """
+    Analyzes businesses on a bounded worker pool, skipping those already in the checkpoint.
+    Returns the status of every business that was run.
+    """
+    checkpoint = Checkpoint(checkpoint_path)
+    pending = [business for business in businesses if not checkpoint.is_done(business)]
+    skipped = len(businesses) - len(pending)
+    if skipped:
+        print(f"Skipping {skipped} businesses already analyzed (checkpoint: {checkpoint_path})")
+    if not pending:
+        return {}
+
+    total = len(pending)
+    count = 0
+    statuses = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, total))) as executor:
+        futures = {
+            executor.submit(analyze_business, business, agent_factory, instructions, time_budget, max_steps): business
+            for business in pending
+        }
+        for future in as_completed(futures):
+            business = futures[future]
+            status, seconds = future.result()
+            statuses[business] = status
+            if status == "done":
+                checkpoint.mark_done(business, seconds)
+            # Print progress
+            count += 1
+            print(f"Completed {count}/{total} businesses. Current business: {business} ({status})")
+    return statuses
@@ -0,0 +1,34 @@
+import re
+import os
+import time
+from my_tools import search_web, save_report
+
+# Seconds each stub step takes, to exercise the worker pool and time budget (STUB_STEP_SECONDS)
+STEP_SECONDS = float(os.getenv("STUB_STEP_SECONDS", "0.5"))
+
+
+class StubAgent:
+    """
+    Offline stand in for CodeAgent. It searches once and saves a canned report through the
+    same tools, so the orchestrator, search cache and checkpoint can be exercised without a model.
+    Use it with SEARCH_BACKEND=stub to avoid network calls entirely.
+    """
+
+    def __init__(self, steps: int = 3):
+        self.steps = steps
+        self.interrupted = False
+
+    def interrupt(self):
+        self.interrupted = True
+
+    def run(self, task: str, max_steps: int = 20):
+        match = re.search(r"Company/Business Name/Stock Codes: (.+?)\.\n", task)
+        business = match.group(1) if match else "Unknown"
+        results = search_web(query=f"{business} latest quarterly results")
+        for _ in range(min(self.steps, max_steps)):
+            if self.interrupted:
+                raise RuntimeError("Agent interrupted")
+            time.sleep(STEP_SECONDS)
+        name = re.sub(r"[^A-Za-z0-9]+", "_", business).strip("_")
+        save_report(md_report=f"# {business}\n\n## Turnaround Potential Verdict\n\nNo Turnaround (stub)\n\n{results}\n", business_name=name)
+        return "No Turnaround (stub)"
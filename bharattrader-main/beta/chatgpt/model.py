@@ -1,22 +1,40 @@
 import openai
 import os
+import sys
 from dotenv import load_dotenv, find_dotenv
 
+# Shared LLM response cache lives in bharattrader-main/ai
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'ai'))
+from llm_cache import get_cache
+
 model_name = 'gpt-4' #gpt-3.5-turbo
 
 def get_completion(prompt, model=model_name):
     messages = [{"role": "user", "content": prompt}]
-    response = openai.ChatCompletion.create(
-        model=model,
-        messages=messages,
-        temperature=0, # this is the degree of randomness of the model's output
-    )
-    return response.choices[0].message["content"]
+
+    def call():
+        response = openai.ChatCompletion.create(
+            model=model,
+            messages=messages,
+            temperature=0, # this is the degree of randomness of the model's output
+        )
+        return response.choices[0].message["content"]
+
+    return get_cache().get_or_call(model, messages, 0, None, call)
 
 def get_completion_large(messages, 
                         model=model_name, 
                         temperature=0, 
                         max_tokens=1000):
+    # Keyed on the messages as passed in, the loop below appends to them
+    key_messages = [dict(m) for m in messages]
+
+    def call():
+        return _completion_large(messages, model, temperature, max_tokens)
+
+    return get_cache().get_or_call(model, key_messages, temperature, max_tokens, call, mode="large")
+
+def _completion_large(messages, model, temperature, max_tokens):
     continuation_token = None
 
     while True:
@@ -43,13 +61,16 @@ def get_completion_from_messages(messages,
                                  model=model_name, 
                                  temperature=0, 
                                  max_tokens=500):
-    response = openai.ChatCompletion.create(
-        model=model,
-        messages=messages,
-        temperature=temperature, 
-        max_tokens=max_tokens,
-    )
-    return response.choices[0].message["content"]
+    def call():
+        response = openai.ChatCompletion.create(
+            model=model,
+            messages=messages,
+            temperature=temperature, 
+            max_tokens=max_tokens,
+        )
+        return response.choices[0].message["content"]
+
+    return get_cache().get_or_call(model, messages, temperature, max_tokens, call)
 
 def set_api():
     _ = load_dotenv(find_dotenv()) # read local .env file
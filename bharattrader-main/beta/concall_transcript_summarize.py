@@ -1,7 +1,12 @@
 import os
+import sys
 from PyPDF2 import PdfReader
 from transformers import PegasusTokenizer, PegasusForConditionalGeneration
 
+# Shared LLM response cache lives in bharattrader-main/ai
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ai'))
+from llm_cache import get_cache
+
 #path of the folder where your pdfs are located
 folder_path = "concallpdfs" 
 
@@ -15,11 +20,28 @@ max_length_pegasus_fin_summ = 32
 # model_name = "google/pegasus-xsum" -- used for testing
 model_name = "human-centered-summarization/financial-summarization-pegasus"
 
-# Load pretrained tokenizer
-pegasus_tokenizer = PegasusTokenizer.from_pretrained(model_name)
+# Tokenizer and model are loaded on the first page that is not in the cache
+pegasus_tokenizer = None
+model = None
+
+def summarize_page(page_text):
+    def call():
+        global pegasus_tokenizer, model
+        if model is None:
+            # Load pretrained tokenizer
+            pegasus_tokenizer = PegasusTokenizer.from_pretrained(model_name)
+            # Make model from pre-trained model
+            model = PegasusForConditionalGeneration.from_pretrained(model_name)
+        # Generate input tokens
+        input_ids = pegasus_tokenizer(page_text,  max_length=max_seq_length, truncation=True, return_tensors="pt").input_ids
+        # Generate Summary
+        summary_ids = model.generate(input_ids, max_length=max_length_pegasus_fin_summ, num_beams=5, early_stopping=True)
+        tgt_texts = pegasus_tokenizer.batch_decode(summary_ids, skip_special_tokens=True, clean_up_tokenization_spaces=False)
+        return tgt_texts[0]
 
-# Make model from pre-trained model
-model = PegasusForConditionalGeneration.from_pretrained(model_name)
+    messages = [{"role": "user", "content": page_text}]
+    return get_cache().get_or_call(model_name, messages, None, max_length_pegasus_fin_summ, call,
+                                   max_seq_length=max_seq_length, num_beams=5)
 
 for filename in os.listdir(folder_path):
     if filename.endswith(".pdf"):
@@ -31,12 +53,7 @@ for filename in os.listdir(folder_path):
             count = 0
             for page in reader.pages: # summarize page by page
                 page_text = page.extract_text()
-                # Generate input tokens
-                input_ids = pegasus_tokenizer(page_text,  max_length=max_seq_length, truncation=True, return_tensors="pt").input_ids
-                # Generate Summary
-                summary_ids = model.generate(input_ids, max_length=max_length_pegasus_fin_summ, num_beams=5, early_stopping=True)
-                tgt_texts = pegasus_tokenizer.batch_decode(summary_ids, skip_special_tokens=True, clean_up_tokenization_spaces=False)
-                page_summaries.append(tgt_texts[0])
+                page_summaries.append(summarize_page(page_text))
                 count = count + 1
                 # print(f'{count} page(s) done')
             # Merge all page summaries
@@ -45,3 +62,5 @@ for filename in os.listdir(folder_path):
             with open(f'{folder_path}/{filename}_summary.txt', 'w') as f:
                 f.write(merged_summary)
         print(f'{filename} done')
+
+print(get_cache().stats())
@@ -0,0 +1,213 @@
+"""
+Batched Combined RSI engine for my_rsi.py.
+
+The Combined RSI only looks back a fixed number of bars (price change, then two rolling
+windows of `period` bars), so each stock's last `lookback_rows(period)` bars are enough to
+reproduce its latest value. Those tails are stacked right aligned into a (bars x stocks) panel,
+the latest bar of every stock in the last row, and all four series are computed for the whole
+universe with the same cumulative-sum rolling kernels. No per-stock DataFrame is modified.
+
+CombinedRSIState keeps the rolling windows of one symbol so a daily run can add the new bars
+in O(period) instead of recomputing the history; states are saved to a JSON file.
+"""
+
+import json
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+
+def lookback_rows(period=14):
+    """Bars needed to reproduce the latest Combined RSI: one price change plus two windows."""
+    return 2 * period + 1
+
+
+def tail_panel(series_by_symbol, rows):
+    """
+    Stack the last `rows` values of each series right aligned into a (rows x symbols) array.
+
+    Parameters:
+    - series_by_symbol (dict): symbol -> pandas.Series or array, oldest value first
+    - rows (int): Number of trailing values kept per symbol
+
+    Returns:
+    - panel (numpy.ndarray): NaN above the first value of symbols with a shorter history
+    """
+    panel = np.full((rows, len(series_by_symbol)), np.nan)
+    for col, values in enumerate(series_by_symbol.values()):
+        tail = np.asarray(values, dtype=float)[-rows:]
+        if len(tail):
+            panel[rows - len(tail):, col] = tail
+    return panel
+
+
+def rolling_sum(values, window):
+    """Column-wise rolling sum over `window` rows, NaN until the window is full or if it holds a NaN."""
+    out = np.full(values.shape, np.nan)
+    if values.shape[0] < window:
+        return out
+    zeros = np.zeros((1, values.shape[1]))
+    csum = np.vstack([zeros, np.cumsum(np.nan_to_num(values), axis=0)])
+    nans = np.vstack([zeros, np.cumsum(np.isnan(values), axis=0)])
+    sums = csum[window:] - csum[:-window]
+    has_nan = (nans[window:] - nans[:-window]) > 0
+    out[window - 1:] = np.where(has_nan, np.nan, sums)
+    return out
+
+
+def rolling_mean(values, window):
+    return rolling_sum(values, window) / window
+
+
+def rolling_std(values, window):
+    """Sample standard deviation (ddof=1) over `window` rows."""
+    sums = rolling_sum(values, window)
+    squares = rolling_sum(values * values, window)
+    variance = (squares - sums * sums / window) / (window - 1)
+    return np.sqrt(np.clip(variance, 0, None))
+
+
+def combined_gain_loss(price_change, volume_ratio, volatility):
+    """Volume and volatility adjusted gain and loss of each bar."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        adjusted = (price_change * volume_ratio) / volatility
+    gain = np.where(price_change > 0, adjusted, 0)
+    loss = np.where(price_change < 0, -adjusted, 0)
+    return gain, loss
+
+
+def rsi_from_averages(avg_gain, avg_loss):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        combined_rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + combined_rs))
+
+
+def combined_rsi_panel(close, volume, period=14):
+    """
+    Combined RSI of every column of right aligned (bars x stocks) close and volume panels.
+
+    Returns:
+    - combined_rsi (numpy.ndarray): Same shape as close
+    """
+    price_change = np.vstack([np.full((1, close.shape[1]), np.nan), np.diff(close, axis=0)])
+
+    # Volume ratio and volatility
+    volume_ratio = volume / rolling_mean(volume, period)
+    volatility = rolling_std(price_change, period)
+
+    # Average combined gain and loss
+    gain, loss = combined_gain_loss(price_change, volume_ratio, volatility)
+    return rsi_from_averages(rolling_mean(gain, period), rolling_mean(loss, period))
+
+
+def latest_combined_rsi(stock_data, period=14):
+    """
+    Latest Combined RSI of every stock, computed on one panel.
+
+    Parameters:
+    - stock_data (dict): symbol -> DataFrame with Close and Volume, oldest bar first
+
+    Returns:
+    - latest (numpy.ndarray): One value per symbol, in stock_data order
+    """
+    if not stock_data:
+        return np.array([])
+    rows = lookback_rows(period)
+    close = tail_panel({s: df['Close'] for s, df in stock_data.items()}, rows)
+    volume = tail_panel({s: df['Volume'] for s, df in stock_data.items()}, rows)
+    return combined_rsi_panel(close, volume, period)[-1]
+
+
+def ranking_frame(symbols, values):
+    """One frame with every symbol, highest Combined RSI first and NaN last."""
+    ranking = pd.DataFrame({'stock': symbols, 'my_rsi': np.round(np.asarray(values, dtype=float), 2)})
+    ranking = ranking.sort_values('my_rsi', ascending=False, na_position='last', kind='stable')
+    ranking.insert(0, 'rank', range(1, len(ranking) + 1))
+    return ranking.reset_index(drop=True)
+
+
+class CombinedRSIState:
+    """
+    Rolling windows of one symbol, updated one bar at a time.
+
+    Holds the last close, the last `period` volumes and price changes, and the last `period`
+    combined gains and losses, which is everything the next Combined RSI value depends on.
+    """
+
+    def __init__(self, period=14):
+        self.period = period
+        self.last_date = None
+        self.last_close = math.nan
+        self.volumes = deque(maxlen=period)
+        self.changes = deque(maxlen=period)
+        self.gains = deque(maxlen=period)
+        self.losses = deque(maxlen=period)
+
+    def update(self, date, close, volume):
+        """Add one bar and return the Combined RSI after it (NaN until enough bars are seen)."""
+        change = close - self.last_close
+        self.last_close = close
+        self.last_date = str(pd.Timestamp(date).date())
+        self.volumes.append(volume)
+        self.changes.append(change)
+
+        # Same NaN rules as the rolling windows: a window that is not full, or holds a NaN, is NaN
+        volume_ratio = volatility = math.nan
+        if len(self.volumes) == self.period:
+            volume_ratio = volume / (sum(self.volumes) / self.period)
+        if len(self.changes) == self.period and not any(map(math.isnan, self.changes)):
+            volatility = float(np.std(np.array(self.changes), ddof=1))
+        gain, loss = combined_gain_loss(np.array(change), np.array(volume_ratio), np.array(volatility))
+        self.gains.append(float(gain))
+        self.losses.append(float(loss))
+        return self.value()
+
+    def value(self):
+        if len(self.gains) < self.period or any(map(math.isnan, self.gains)) or any(map(math.isnan, self.losses)):
+            return math.nan
+        return float(rsi_from_averages(np.array(sum(self.gains) / self.period), np.array(sum(self.losses) / self.period)))
+
+    def is_current_for(self, df):
+        """True if df still holds this state's last bar unchanged, so only newer bars need feeding."""
+        if self.last_date is None or pd.Timestamp(self.last_date) not in df.index:
+            return False
+        return bool(np.isclose(df.loc[pd.Timestamp(self.last_date), 'Close'], self.last_close))
+
+    def feed(self, df):
+        """Add every bar of df (Close, Volume) newer than last_date; returns the latest value."""
+        if self.last_date is not None:
+            df = df[df.index > pd.Timestamp(self.last_date)]
+        for date, close, volume in zip(df.index, df['Close'].to_numpy(dtype=float), df['Volume'].to_numpy(dtype=float)):
+            self.update(date, close, volume)
+        return self.value()
+
+    def to_dict(self):
+        return {'period': self.period, 'last_date': self.last_date, 'last_close': self.last_close,
+                'volumes': list(self.volumes), 'changes': list(self.changes),
+                'gains': list(self.gains), 'losses': list(self.losses)}
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls(data['period'])
+        state.last_date = data['last_date']
+        state.last_close = data['last_close']
+        for name in ('volumes', 'changes', 'gains', 'losses'):
+            getattr(state, name).extend(data[name])
+        return state
+
+
+def load_states(path, period=14):
+    """symbol -> CombinedRSIState from a JSON state file, empty if missing or for another period."""
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {symbol: CombinedRSIState.from_dict(s) for symbol, s in data.items() if s.get('period') == period}
+
+
+def save_states(path, states):
+    with open(path, 'w') as f:
+        json.dump({symbol: state.to_dict() for symbol, state in states.items()}, f)
@@ -0,0 +1,261 @@
+"""
+Momentum ranking engine for mip12_scanner.py.
+
+Every MIP-12 input is a running quantity of the stock's closes: the 252-day high, the 200-day EMA,
+the 200-day EMA of the stock/benchmark ratio and the 12M return over volatility (Sharpe ratio)
+of the last 252 closes. Mip12State keeps these per symbol so a daily run adds the new bar in O(1):
+  - 252-day high: monotonic deque of (bar number, close), the front is the window maximum
+  - EMAs: last value and number of bars seen
+  - Sharpe ratio: the last 252 closes, and the sum and sum of squares of their daily returns
+States are saved to a JSON file. The ranking itself is done on one frame with boolean masks.
+
+indicator_history() computes the same quantities for every bar of a stock with rolling and ewm,
+and historical_rankings() ranks the universe on every past date for portfolio backtests.
+"""
+
+import json
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+high_period = 252
+ema_period = 200
+ratio_period = 200
+sharpe_period = 252
+
+report_columns = ["Ticker", "Rank#", "Price", "52W_High", "200D_EMA", "Sharpe_Ratio"]
+
+
+def ema_step(previous: float, value: float, span: int) -> float:
+    """One step of ewm(span, adjust=False), seeded with the first value."""
+    if math.isnan(previous):
+        return value
+    alpha = 2.0 / (span + 1)
+    return (1 - alpha) * previous + alpha * value
+
+
+def sharpe_from_moments(roc: float, ret_sum: float, ret_sumsq: float, count: int) -> float:
+    """12M return over annualized volatility from the sums of `count` daily returns."""
+    if count < 2:
+        return float('nan')
+    variance = (ret_sumsq - ret_sum * ret_sum / count) / (count - 1)
+    annualized_vol = math.sqrt(max(variance, 0.0)) * math.sqrt(sharpe_period)
+    return 0.0 if annualized_vol == 0 else roc / annualized_vol
+
+
+class Mip12State:
+    """Running MIP-12 quantities of one symbol."""
+
+    def __init__(self):
+        self.last_date = None
+        self.bars = 0
+        self.ema = float('nan')
+        self.closes = deque(maxlen=sharpe_period)
+        self.maxima = deque()
+        self.ret_sum = 0.0
+        self.ret_sumsq = 0.0
+        self.ratio_date = None
+        self.ratio_bars = 0
+        self.ratio = float('nan')
+        self.ratio_ema = float('nan')
+
+    def update(self, date, close: float) -> None:
+        """Add one bar."""
+        self.last_date = str(pd.Timestamp(date).date())
+        self.bars += 1
+        self.ema = ema_step(self.ema, close, ema_period)
+
+        # Window maximum: drop smaller closes behind, and the front once it leaves the window
+        while self.maxima and self.maxima[-1][1] <= close:
+            self.maxima.pop()
+        self.maxima.append((self.bars, close))
+        while self.maxima[0][0] <= self.bars - high_period:
+            self.maxima.popleft()
+
+        # Daily returns of the closes window, the oldest one leaves with the oldest close
+        if len(self.closes) == self.closes.maxlen:
+            leaving = self.closes[1] / self.closes[0] - 1
+            self.ret_sum -= leaving
+            self.ret_sumsq -= leaving * leaving
+        if self.closes:
+            ret = close / self.closes[-1] - 1
+            self.ret_sum += ret
+            self.ret_sumsq += ret * ret
+        self.closes.append(close)
+
+    def update_ratio(self, date, ratio: float) -> None:
+        """Add one stock/benchmark ratio, on a bar both traded."""
+        self.ratio_date = str(pd.Timestamp(date).date())
+        self.ratio_bars += 1
+        self.ratio = ratio
+        self.ratio_ema = ema_step(self.ratio_ema, ratio, ratio_period)
+
+    @classmethod
+    def from_history(cls, close: pd.Series, calendar) -> "Mip12State":
+        """State after the whole close history, with the EMAs from one ewm call."""
+        close = close.dropna()
+        state = cls()
+        if close.empty:
+            return state
+        state.bars = len(close) - min(len(close), sharpe_period)
+        if state.bars:
+            state.ema = close.iloc[:state.bars].ewm(span=ema_period, adjust=False).mean().iloc[-1]
+        for date, value in zip(close.index[state.bars:], close.to_numpy(dtype=float)[state.bars:]):
+            state.update(date, value)
+        # Ratio EMA over all ratio bars at once
+        ratio = calendar.ratio(close).dropna()
+        state.ratio_bars = len(ratio)
+        if state.ratio_bars:
+            state.ratio_date = str(ratio.index[-1].date())
+            state.ratio = float(ratio.iloc[-1])
+            state.ratio_ema = float(ratio.ewm(span=ratio_period, adjust=False).mean().iloc[-1])
+        return state
+
+    def is_current_for(self, close: pd.Series) -> bool:
+        """True if close still holds this state's last bar unchanged, so only newer bars need feeding."""
+        if self.last_date is None or pd.Timestamp(self.last_date) not in close.index:
+            return False
+        return bool(np.isclose(close.loc[pd.Timestamp(self.last_date)], self.closes[-1]))
+
+    def feed(self, close: pd.Series, calendar) -> None:
+        """
+        Add every bar of close newer than last_date, and every ratio newer than ratio_date.
+
+        Ratios are tracked separately so that bars loaded before the benchmark had them still
+        get their ratio on a later run.
+        """
+        close = close.dropna()
+        new = close[close.index > pd.Timestamp(self.last_date)]
+        for date, value in zip(new.index, new.to_numpy(dtype=float)):
+            self.update(date, value)
+        if self.ratio_date is not None:
+            close = close[close.index > pd.Timestamp(self.ratio_date)]
+        ratio = calendar.ratio(close).dropna()
+        for date, value in zip(ratio.index, ratio.to_numpy(dtype=float)):
+            self.update_ratio(date, value)
+
+    def values(self) -> dict:
+        """Price, 52W_High, 200D_EMA, ratio, its EMA and Sharpe_Ratio after the last bar."""
+        if not self.closes:
+            return {}
+        price = self.closes[-1]
+        return {
+            "Price": price,
+            "52W_High": self.maxima[0][1] if self.bars >= high_period else float('nan'),
+            "200D_EMA": self.ema if self.bars >= ema_period else float('nan'),
+            "Ratio": self.ratio,
+            "Ratio_EMA": self.ratio_ema,
+            "Ratio_Bars": self.ratio_bars,
+            "Sharpe_Ratio": sharpe_from_moments(price / self.closes[0] - 1, self.ret_sum, self.ret_sumsq,
+                                                len(self.closes) - 1),
+        }
+
+    def to_dict(self) -> dict:
+        return {'last_date': self.last_date, 'bars': self.bars, 'ema': self.ema,
+                'closes': list(self.closes), 'maxima': [list(m) for m in self.maxima],
+                'ret_sum': self.ret_sum, 'ret_sumsq': self.ret_sumsq,
+                'ratio_date': self.ratio_date, 'ratio_bars': self.ratio_bars,
+                'ratio': self.ratio, 'ratio_ema': self.ratio_ema}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Mip12State":
+        state = cls()
+        state.closes.extend(data.pop('closes'))
+        state.maxima.extend(tuple(m) for m in data.pop('maxima'))
+        state.__dict__.update(data)
+        return state
+
+
+def load_states(path: str) -> dict:
+    """symbol -> Mip12State from a JSON state file, empty if missing."""
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {symbol: Mip12State.from_dict(s) for symbol, s in data.items()}
+
+
+def save_states(path: str, states: dict) -> None:
+    with open(path, 'w') as f:
+        json.dump({symbol: state.to_dict() for symbol, state in states.items()}, f)
+
+
+def snapshot(states: dict) -> pd.DataFrame:
+    """One row per symbol with the current MIP-12 quantities."""
+    rows = {symbol: state.values() for symbol, state in states.items()}
+    frame = pd.DataFrame.from_dict({s: v for s, v in rows.items() if v}, orient='index')
+    frame.index.name = "Ticker"
+    return frame
+
+
+def skip_reasons(frame: pd.DataFrame) -> pd.Series:
+    """Entry filter of every row: the first failed condition, or "" when it passes."""
+    price = frame["Price"]
+    retracement = frame["52W_High"].isna() | (price < 0.5 * frame["52W_High"])
+    above_ema = frame["200D_EMA"].notna() & (price > frame["200D_EMA"])
+    ratio_ok = (frame["Ratio_Bars"] >= ratio_period) & (frame["Ratio"] > frame["Ratio_EMA"])
+    return pd.Series(np.select([retracement, ~above_ema, ~ratio_ok],
+                               ["52W high retracement", "200D EMA", "ratio chart condition"], ""),
+                     index=frame.index)
+
+
+def rank(frame: pd.DataFrame) -> pd.DataFrame:
+    """Stocks passing the entry filters, highest Sharpe ratio first, with Rank#."""
+    passed = frame[(skip_reasons(frame) == "") & frame["Sharpe_Ratio"].notna()]
+    report = passed.sort_values("Sharpe_Ratio", ascending=False, kind='stable').reset_index()
+    report["Rank#"] = range(1, len(report) + 1)
+    return report[report_columns]
+
+
+def indicator_history(close: pd.Series, calendar) -> pd.DataFrame:
+    """The snapshot quantities on every bar of one stock."""
+    close = close.dropna()
+    bar = np.arange(1, len(close) + 1)
+    ema = close.ewm(span=ema_period, adjust=False).mean()
+
+    # Ratio series only has the bars the benchmark traded, the latest one holds until the next
+    ratio = calendar.ratio(close).dropna()
+    ratio_ema = ratio.ewm(span=ratio_period, adjust=False).mean()
+    ratio_bars = pd.Series(np.arange(1, len(ratio) + 1), index=ratio.index)
+
+    # Last 252 closes, or all of them while the history is shorter
+    base = close.shift(sharpe_period - 1).fillna(close.iloc[0]) if len(close) else close
+    returns = close.pct_change()
+    annualized_vol = returns.rolling(sharpe_period - 1, min_periods=2).std() * np.sqrt(sharpe_period)
+    sharpe = (close / base - 1) / annualized_vol
+    sharpe = sharpe.mask(annualized_vol == 0, 0.0)
+
+    return pd.DataFrame({
+        "Price": close,
+        "52W_High": close.rolling(high_period).max(),
+        "200D_EMA": ema.where(bar >= ema_period),
+        "Ratio": ratio.reindex(close.index).ffill(),
+        "Ratio_EMA": ratio_ema.reindex(close.index).ffill(),
+        "Ratio_Bars": ratio_bars.reindex(close.index).ffill().fillna(0),
+        "Sharpe_Ratio": sharpe,
+    })
+
+
+def historical_rankings(closes: dict, calendar, bullish: pd.Series = None) -> pd.DataFrame:
+    """
+    Ranking of every date, from {symbol: close series}.
+
+    A stock is ranked on the dates it has a bar. When bullish (date -> bool) is given it is added
+    as a Bullish column, so a backtest can skip new entries on days the market filter fails.
+    """
+    frames = [indicator_history(close, calendar).assign(Ticker=symbol) for symbol, close in closes.items()]
+    if not frames:
+        return pd.DataFrame(columns=["Date"] + report_columns)
+    history = pd.concat(frames)
+    history.index.name = "Date"
+    history = history[(skip_reasons(history) == "") & history["Sharpe_Ratio"].notna()].reset_index()
+
+    history = history.sort_values(["Date", "Sharpe_Ratio"], ascending=[True, False], kind='stable')
+    history["Rank#"] = history.groupby("Date").cumcount() + 1
+    history = history[["Date"] + report_columns].reset_index(drop=True)
+    if bullish is not None:
+        history["Bullish"] = history["Date"].map(bullish).fillna(False).astype(bool)
+    return history
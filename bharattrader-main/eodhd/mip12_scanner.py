@@ -24,21 +24,21 @@ to include a ranking metric based on the Sharpe ratio, rather than Volar as that
 
 --- Functions ---
 market_trend_filter(benchmark_df, ema_period=20) → bool  
-get_52w_high(stock_df, period=252) → float  
-get_200d_ema(stock_df, period=200) → float  
-compute_sharpe_ratio(stock_df) → float  
+market_trend_history(benchmark_df, ema_period=20) → pd.Series  
+52W high, 200D EMA, ratio EMA and Sharpe ratio are kept in `mip12_engine.Mip12State`.
 
 --- Main Flow ---
 1. Load benchmark data.
 2. Determine `is_bullish` flag based on the market trend filter.
 3. Loop over each symbol:
     a. Load its price series.
-    b. If bullish, enforce entry filters (52W High Retracement and 200D EMA).
-    c. Compute Sharpe ratio for ranking.
-    d. Append record (Ticker, Price, 52W_High, 200D_EMA, Sharpe_Ratio).
-    e. Catch and log any exceptions per symbol.
-4. Build a DataFrame, sort by Sharpe ratio, and insert Rank#.
+    b. Add the bars newer than its saved state (`mip12_state.json`), or build the state
+       from the whole history when there is none or the data changed.
+    c. Catch and log any exceptions per symbol.
+4. Apply the entry filters (52W High Retracement, 200D EMA, ratio above its 200D EMA)
+   to all stocks at once, sort by Sharpe ratio, and insert Rank#.
 5. Export the report and any errors to CSV.
+6. With `historical = True`, also export the ranking of every past date to `mip12_history.csv`.
 
 --- Logging & Error Handling ---
 - Uses Python’s `logging` module to record INFO and ERROR messages.
@@ -48,11 +48,17 @@ Usage:
      python mip12_scanner.py
 
 """
+import os
+import sys
 import pricereader as pr
 import pandas as pd
-import numpy as np
 import logging
 
+# Shared relative strength layer lives in bharattrader-main/yf
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'yf'))
+import relative_strength as rs
+import mip12_engine as engine
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -69,69 +75,28 @@ benchmark = "CRSLDX"  # Nifty 500 Index
 # Read the list of stocks from the CSV file
 stocks = pd.read_csv("nifty500.csv", header=0, usecols=["Ticker"])
 
+# Keep per symbol running state between runs, so a daily run only adds the new bars
+use_state = True
+state_file = "mip12_state.json"
+
+# Historical mode: ranking of every past date, for portfolio backtests
+historical = False
+history_file = "mip12_history.csv"
+
 # --- Helper functions ---
 
 def market_trend_filter(benchmark_df: pd.DataFrame,
                         ema_period: int = 20,
                         price_col: str = 'Close') -> bool:
     """Return True if latest benchmark Close > its EMA."""
+    return bool(market_trend_history(benchmark_df, ema_period, price_col).iloc[-1])
+
+def market_trend_history(benchmark_df: pd.DataFrame,
+                         ema_period: int = 20,
+                         price_col: str = 'Close') -> pd.Series:
+    """Return, for every date, whether the benchmark Close > its EMA."""
     ema = benchmark_df[price_col].ewm(span=ema_period, adjust=False).mean()
-    return benchmark_df[price_col].iloc[-1] > ema.iloc[-1]
-
-def get_52w_high(stock_df: pd.DataFrame,
-                 period: int = 252,
-                 price_col: str = 'Close') -> float:
-    """Return the 52‑week high price, or NaN if insufficient data."""
-    closes = stock_df[price_col].dropna()
-    if len(closes) < period:
-        return float('nan')
-    return closes.iloc[-period:].max()
-
-def get_200d_ema(stock_df: pd.DataFrame,
-                period: int = 200,
-                price_col: str = 'Close') -> float:
-    """Return the most recent 200‑day EMA, or NaN if insufficient data."""
-    closes = stock_df[price_col].dropna()
-    if len(closes) < period:
-        return float('nan')
-    ema = closes.ewm(span=period, adjust=False).mean()
-    return ema.iloc[-1]
-
-def passes_ratio_200d_ema(stock_df: pd.DataFrame,
-                          benchmark_df: pd.DataFrame,
-                          period: int = 200,
-                          price_col: str = 'Close') -> bool:
-    """
-    Return True if the latest ratio of stock/benchmark Close is above
-    its 200‑day EMA on the ratio series.
-    """
-    # align on common dates
-    ratio = (stock_df[price_col] / benchmark_df[price_col]).dropna()
-    if len(ratio) < period:
-        return False
-    ema = ratio.ewm(span=period, adjust=False).mean()
-    return ratio.iloc[-1] > ema.iloc[-1]
-
-def compute_sharpe_ratio(stock_df: pd.DataFrame,
-                         price_col: str = 'Close',
-                         period: int = 252) -> float:
-    """
-    Compute the Sharpe ratio as mean(daily returns) / std(daily returns) for the last `period` days.
-    Returns 0.0 if there is insufficient data or if the annualized volatility is zero.
-    """
-    df_1y = stock_df.tail(period).copy()
-
-    # Calculate 12M ROC
-    current_price = df_1y['Close'].iloc[-1]
-    price_1y_ago = df_1y['Close'].iloc[0]
-    roc_12m = (current_price / price_1y_ago) - 1
-
-    # Daily returns & volatility
-    df_1y['daily_return'] = df_1y['Close'].pct_change()
-    daily_vol = df_1y['daily_return'].std()
-    annualized_vol = daily_vol * np.sqrt(period)
-
-    return 0.0 if annualized_vol == 0 else roc_12m / annualized_vol
+    return benchmark_df[price_col] > ema
 
 
 # --- Main scanning function ---
@@ -142,6 +107,7 @@ def main():
     
     # 1. Load & trim benchmark data
     benchmark_data = pr.get_price_data(benchmark, data_interval)
+    calendar = rs.BenchmarkCalendar(benchmark_data['Close'])
     
     # 2. Check market trend
     is_bullish = market_trend_filter(benchmark_data)
@@ -153,55 +119,44 @@ def main():
     
     # 3. Prepare lists
     candidates = stocks["Ticker"].tolist()
-    records = []
+    states = engine.load_states(state_file) if use_state else {}
+    current = {}
+    closes = {}
     errors = []
     
-    # 4. Per‐stock processing
+    # 4. Per‐stock update of the running state, only new bars when the saved state is current
     for symbol in candidates:
         try:
             print(f"Processing {symbol}...")
             df = pr.get_price_data(symbol, data_interval)
             if df.empty:
                 continue  # no data in date range
-            
-            # Entry filters if bullish
-            high_52w = get_52w_high(df)
-            ema_200  = get_200d_ema(df)
-            
-            
-            price = df['Close'].iloc[-1]
-            if pd.isna(high_52w) or price < 0.5 * high_52w:
-                logging.info("Skipping %s: 52W high retracement not met.", symbol)
-                continue
-            if pd.isna(ema_200) or price <= ema_200:
-                logging.info("Skipping %s: 200D EMA not met.", symbol)
-                continue
-
-            if not passes_ratio_200d_ema(df, benchmark_data):
-                logging.info("Skipping %s: ratio chart condition not met.", symbol)
-                continue
-            
-            # Compute ranking metric
-            sharpe = compute_sharpe_ratio(df)
-            
-            # Record all required fields
-            records.append({
-                "Ticker":       symbol,
-                "Price":        df['Close'].iloc[-1],
-                "52W_High":     high_52w,
-                "200D_EMA":     ema_200,
-                "Sharpe_Ratio": sharpe
-            })
+            close = df['Close'].dropna()
+            if historical:
+                closes[symbol] = close
+
+            state = states.get(symbol)
+            if state is not None and state.is_current_for(close):
+                state.feed(close, calendar)
+            else:
+                state = engine.Mip12State.from_history(close, calendar)
+            states[symbol] = current[symbol] = state
         
         except Exception as e:
             logging.error(f"Error processing {symbol}: {e}")
             errors.append({"Ticker": symbol, "Error": str(e)})
+    if use_state:
+        engine.save_states(state_file, states)
     
-    # 5. Build final report DataFrame
-    report_df = pd.DataFrame(records)
-    report_df = report_df.dropna(subset=["Sharpe_Ratio"])
-    report_df = report_df.sort_values("Sharpe_Ratio", ascending=False)
-    report_df.insert(1, "Rank#", range(1, len(report_df) + 1))
+    # 5. Entry filters and ranking on one frame
+    snapshot = engine.snapshot(current)
+    if snapshot.empty:
+        report_df = pd.DataFrame(columns=engine.report_columns)
+    else:
+        reasons = engine.skip_reasons(snapshot)
+        for symbol, reason in reasons[reasons != ""].items():
+            logging.info("Skipping %s: %s not met.", symbol, reason)
+        report_df = engine.rank(snapshot)
     
     # 6. Export results
     report_df.to_csv("mip12_scan_report.csv", index=False)
@@ -212,6 +167,12 @@ def main():
         err_df = pd.DataFrame(errors)
         err_df.to_csv("mip12_scan_errors.csv", index=False)
         logging.info("Errors saved to mip12_scan_errors.csv.")
+
+    # 8. Optionally rank every past date
+    if historical:
+        history_df = engine.historical_rankings(closes, calendar, market_trend_history(benchmark_data))
+        history_df.to_csv(history_file, index=False)
+        logging.info("Historical rankings saved to %s.", history_file)
     
     return report_df
 
@@ -0,0 +1,109 @@
+'''
+Panel based relative strength trend engine for saucer_crs.py.
+
+Weekly closes of all stocks are aligned on the benchmark's week calendar (yf/relative_strength.py)
+into one (weeks x stocks) panel. The relative strength moving average and its trend are computed
+once for the whole panel, with the trend stored as int8 codes: G = 1 (rising), R = -1 (falling),
+S = 0 (sideways). Both run over each stock's own weeks (relative_strength.on_valid_rows), so a week
+a stock did not trade does not blank out its average or its trend.
+The last analysis_window codes of every stock are gathered into a (window x stocks) matrix, right
+aligned so that each stock's latest week is the last row, and the reversal patterns are detected
+with windowed counts over that matrix. G/R/S strings are only built for the output file.
+'''
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pricereader as pr
+
+# Shared relative strength layer lives in bharattrader-main/yf
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'yf'))
+import relative_strength as rs
+
+# Trend codes
+G = 1
+R = -1
+S = 0
+# Marks rows before a stock's first week in the right aligned sequence matrix
+PAD = 127
+
+code_chars = {G: 'G', R: 'R', S: 'S'}
+
+
+def load_close_panel(symbols, interval, calendar):
+    # Close of every symbol aligned by position to the benchmark calendar, NaN where it has no bar
+    closes = {}
+    for symbol in symbols:
+        data = pr.get_price_data(symbol, interval)
+        if data.empty or 'Close' not in data.columns:
+            print("Error: " + symbol)
+            continue
+        data = data.dropna()
+        closes[symbol] = data['Close'][~data.index.duplicated(keep='last')]
+    return calendar.align_many(closes)
+
+
+def trend_codes(source, length, valid=None):
+    # Rising when above the max of the previous `length` values, falling when below their min,
+    # the previous values being those of the column's own valid rows
+    highest = rs.on_valid_rows(source, lambda packed: packed.shift(1).rolling(window=length).max(), valid)
+    lowest = rs.on_valid_rows(source, lambda packed: packed.shift(1).rolling(window=length).min(), valid)
+    is_rising = (source > highest).to_numpy()
+    is_falling = (source < lowest).to_numpy()
+    return np.where(is_rising, G, np.where(is_falling, R, S)).astype(np.int8)
+
+
+def last_codes(codes, valid, window):
+    # Last `window` codes of each column over its valid rows, right aligned and padded with PAD
+    bars_from_end = np.cumsum(valid[::-1], axis=0)[::-1]
+    mask = valid & (bars_from_end <= window)
+    rows, cols = np.nonzero(mask)
+    sequences = np.full((window, codes.shape[1]), PAD, dtype=np.int8)
+    sequences[window - bars_from_end[rows, cols], cols] = codes[rows, cols]
+    lengths = mask.sum(axis=0)
+    return sequences, lengths
+
+
+def count_in_window(sequences, lengths, code, offset, count):
+    # Occurrences of `code` in the `count` rows starting `offset` rows into each sequence
+    window = sequences.shape[0]
+    cumulative = np.vstack([np.zeros((1, sequences.shape[1]), dtype=np.int32),
+                            np.cumsum(sequences == code, axis=0, dtype=np.int32)])
+    cols = np.arange(sequences.shape[1])
+    start = np.clip(window - lengths + offset, 0, window)
+    end = np.clip(start + count, 0, window)
+    return cumulative[end, cols] - cumulative[start, cols]
+
+
+def detect_reversal(sequences, lengths, initial_count, initial_type, final_pattern):
+    # First `initial_count` weeks all of `initial_type` and the sequence ending in `final_pattern`
+    initial = count_in_window(sequences, lengths, initial_type, 0, initial_count) >= initial_count
+    final = lengths >= len(final_pattern)
+    for i, code in enumerate(reversed(final_pattern)):
+        final &= sequences[-1 - i] == code
+    return initial & final
+
+
+def sequence_strings(sequences):
+    # G/R/S string per column, PAD rows left out
+    strings = []
+    for column in sequences.T:
+        strings.append(''.join(code_chars[c] for c in column.tolist() if c != PAD))
+    return strings
+
+
+def scan(closes, calendar, avg_length, trend_length, analysis_window):
+    # Trend sequence and reversal message of every stock in the (weeks x stocks) closes panel
+    valid = closes.notna().to_numpy()
+    ratio_mean = rs.ratio_ma(calendar.ratio_panel(closes), avg_length)
+    codes = trend_codes(ratio_mean, trend_length, valid)
+
+    sequences, lengths = last_codes(codes, valid, analysis_window)
+
+    # 14 weeks of current trend and 2 weeks of opposite trend at the end, in between we do not care
+    bullish = detect_reversal(sequences, lengths, 14, R, [G, G])
+    bearish = detect_reversal(sequences, lengths, 14, G, [R, R])
+    messages = np.where(bullish, "Bullish reversal detected.", np.where(bearish, "Bearish reversal detected.", ""))
+
+    return pd.DataFrame({'stock': closes.columns, 'Trend Sequence': sequence_strings(sequences),
+                         'Reversal Message': messages})
@@ -0,0 +1,75 @@
+'''
+Regression tests for rs_trend_engine on stocks with missing weeks.
+
+    python -m unittest discover -s tests
+'''
+import os
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(here, '..'))
+import rs_trend_engine as engine
+
+avg_length = 52
+trend_length = 3
+analysis_window = 26
+
+
+def own_bars_sequence(close, benchmark_close):
+    # saucer_crs's per-stock trend sequence, computed on the stock's own weeks
+    ratio = close / benchmark_close.reindex(close.index)
+    mean = ratio.rolling(window=avg_length).mean()
+    rising = mean > mean.shift(1).rolling(window=trend_length).max()
+    falling = mean < mean.shift(1).rolling(window=trend_length).min()
+    codes = ['G' if r else 'R' if f else 'S' for r, f in zip(rising, falling)]
+    return ''.join(codes[-analysis_window:])
+
+
+class GappedStockTest(unittest.TestCase):
+    def setUp(self):
+        self.weeks = pd.date_range('2018-01-01', periods=300, freq='W-MON')
+        rng = np.random.default_rng(7)
+        self.benchmark = pd.Series(100 * np.cumprod(1 + rng.normal(0, 0.01, len(self.weeks))), index=self.weeks)
+        self.calendar = engine.rs.BenchmarkCalendar(self.benchmark)
+
+    def scan(self, closes):
+        panel = self.calendar.align_many(closes)
+        return engine.scan(panel, self.calendar, avg_length, trend_length, analysis_window).set_index('stock')
+
+    def test_missing_week_keeps_the_trend(self):
+        # Steady outperformance: the RS mean rises every week
+        leader = self.benchmark * np.linspace(1.0, 3.0, len(self.weeks))
+        gapped = leader.drop(self.weeks[-20])
+        result = self.scan({'LEADER': leader, 'GAPPED': gapped})
+
+        self.assertEqual(result.loc['LEADER', 'Trend Sequence'], 'G' * analysis_window)
+        self.assertEqual(result.loc['GAPPED', 'Trend Sequence'], 'G' * analysis_window)
+
+    def test_gapped_stocks_match_their_own_history(self):
+        rng = np.random.default_rng(11)
+        closes = {}
+        for i in range(40):
+            close = pd.Series(50 * np.cumprod(1 + rng.normal(0.002, 0.03, len(self.weeks))), index=self.weeks)
+            missing = rng.choice(self.weeks[60:], size=rng.integers(1, 8), replace=False)
+            closes[f'S{i}'] = close.drop(missing)
+        result = self.scan(closes)
+
+        for symbol, close in closes.items():
+            self.assertEqual(result.loc[symbol, 'Trend Sequence'], own_bars_sequence(close, self.benchmark), symbol)
+
+    def test_bullish_reversal_after_a_gap(self):
+        # Underperforms, then outperforms sharply in the last weeks, with a week missing in between
+        factor = np.r_[np.linspace(3.0, 1.0, len(self.weeks) - 4), [1.4, 2.0, 2.8, 3.8]]
+        close = (self.benchmark * factor).drop(self.weeks[-12])
+        result = self.scan({'TURN': close})
+
+        self.assertEqual(result.loc['TURN', 'Trend Sequence'], own_bars_sequence(close, self.benchmark))
+        self.assertEqual(result.loc['TURN', 'Reversal Message'], 'Bullish reversal detected.')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,8 @@ import yfinance as yf
 import pandas as pd
 import time
 import datetime
+import relative_strength as rs
+from price_data import fetch_close_matrix
 
 def cleanUp_data(data):
     # Drop those with NaN
@@ -30,46 +32,35 @@ srs_length = 123
 # Read the list of stocks from the CSV file
 stocks = pd.read_csv(stock_filename, header=0, usecols=["Ticker"])
 
-# Use yfinance to retrieve the benchmark data
+# Use yfinance to retrieve the benchmark data, it defines the trading calendar
 benchmark_ticker = yf.Ticker(benchmark)
 benchmark_data = benchmark_ticker.history(period=time_frame,interval=data_interval,auto_adjust=False)
 benchmark_data = cleanUp_data(benchmark_data)
+calendar = rs.BenchmarkCalendar(benchmark_data["Close"])
+
+# Retrieve all stocks in batches over the benchmark's dates and align them to its calendar
+symbols = list(stocks["Ticker"])
+start_date = calendar.dates[0].date()
+end_date = calendar.dates[-1].date() + datetime.timedelta(days=1)
+closes = fetch_close_matrix([stock + ".NS" for stock in symbols], start_date, end_date)
+closes.columns = [column[:-3] for column in closes.columns]
+for stock in symbols:
+    if stock not in closes.columns:
+        print("Error " + stock)
+ratios = calendar.ratio_panel(calendar.align_many(closes))
 
-# Create an empty list to store the stock data
-stock_data_list = []
-
-# Iterate through the list of stocks
-for stock in stocks["Ticker"]:
-    try:
-        ticker = yf.Ticker(stock+".NS")
-
-        # Use yfinance to retrieve the stock data
-        stock_data = ticker.history(period=time_frame,interval=data_interval,auto_adjust=False)
-        stock_data = cleanUp_data(stock_data)
-
-        # Calculate the Adaptive relative strength (ARS) using the formula you provided
-        stock_data["Adaptive RS"] = (stock_data["Close"] / stock_data.loc[stock_data.index == reference_date, "Close"].values[0]) / (benchmark_data["Close"] / benchmark_data.loc[benchmark_data.index == reference_date, "Close"].values[0]) - 1
-
-        # Calculate the Static relative strength (SRS) using the formula you provided and the specified number of rows to look back
-        stock_close_123 = stock_data.at[stock_data.index[-123], 'Close']
-        benchmark_close_123 = benchmark_data.at[benchmark_data.index[-123], 'Close']
-        stock_data["Static RS"] = (stock_data["Close"] /stock_close_123) / (benchmark_data["Close"] / benchmark_close_123) - 1
-
-        # Get the last row of the stock data
-        last_row = stock_data.tail(1)
-
-        # Extract the ARS and SRS values from the last row
-        ars = round(last_row["Adaptive RS"].values[0], 2)
-        srs = round(last_row["Static RS"].values[0], 2)
-
-        # Create a dictionary with the stock name, ARS, and SRS values
-        stock_data_dict = {"Stock": stock, "Adaptive RS": ars, "Static RS": srs}
+# Adaptive relative strength (ARS) from the reference date, Static relative strength (SRS) over srs_length bars
+ars = rs.last_values(rs.adaptive_rs(calendar, ratios, reference_date)).round(2)
+srs = rs.last_values(rs.static_rs(ratios, srs_length)).round(2)
 
-        # Add the dictionary to the list
-        stock_data_list.append(stock_data_dict)
-    except Exception as e:
+# Create a dictionary per stock with the stock name, ARS, and SRS values
+stock_data_list = []
+for stock in ratios.columns:
+    # No bar on the reference date or fewer than srs_length bars
+    if pd.isna(ars[stock]) or pd.isna(srs[stock]):
         print("Error " + stock)
-        print(e)
+        continue
+    stock_data_list.append({"Stock": stock, "Adaptive RS": ars[stock], "Static RS": srs[stock]})
 
 # print(stock_data_list)
 
@@ -0,0 +1,110 @@
+'''
+Box detection and chart rendering for box_scan.py, kept apart so only boxes that pass are drawn.
+
+A rally day is the min_rally_days-th (or later) consecutive higher close of a run in which at
+least one up day had volume above its 50 day average. Every rally day starts a new box at its
+high, and a close above that high ends it. So the box still open on the last bar is the one of
+the last rally day s, and it is open iff max(Close[s+1:]) <= High[s]; its low is min(Low[s:]).
+This is found with cumulative run counts over the arrays, without walking the bars.
+
+render_box draws with the Agg backend: wicks as one vlines call, bodies and volume as one bar
+call each, so charts can be drawn in worker processes.
+'''
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import matplotlib.patches as patches
+
+
+def run_position(flags):
+    # 1, 2, 3... along each run of True values, 0 where the flag is False
+    counts = np.cumsum(flags)
+    return counts - np.maximum.accumulate(np.where(flags, 0, counts))
+
+
+def rally_days(df, min_rally_days=3, avg_length=50):
+    # Rows where a rally of at least min_rally_days higher closes with a high volume day is under way
+    close = df['Close'].to_numpy(dtype=float)
+    avg_volume = df['Volume'].rolling(window=avg_length).mean().to_numpy(dtype=float)
+    up = np.zeros(len(close), dtype=bool)
+    up[1:] = close[1:] > close[:-1]
+    high_volume = up & (df['Volume'].to_numpy(dtype=float) > avg_volume)
+
+    # High volume seen so far in the current run: count of high volume days since the run started
+    run_start = np.maximum.accumulate(np.where(up, 0, np.arange(len(close))))
+    seen = np.cumsum(high_volume)
+    high_volume_in_run = (seen - seen[run_start]) > 0
+    return np.flatnonzero((run_position(up) >= min_rally_days) & high_volume_in_run)
+
+
+def find_box(df, min_rally_days=3):
+    # Box open on the last bar: (start row, box high, box low), or None
+    close = df['Close'].to_numpy(dtype=float)
+    starts = rally_days(df, min_rally_days)
+    if len(starts) == 0:
+        return None
+    start = starts[-1]
+    high = df['High'].to_numpy(dtype=float)[start]
+    if np.any(close[start:] > high):
+        return None
+    return start, high, df['Low'].to_numpy(dtype=float)[start:].min()
+
+
+def box_stats(df, box):
+    # Box Duration, Drawdown and Fall Rate of an open box
+    start, box_high, box_low = box
+    box_days = len(df) - start
+    box_drop_percent = -((box_high - box_low) / box_high) * 100
+    box_fall_rate = round(-box_drop_percent / box_days, 2)
+    return box_days, box_drop_percent, box_fall_rate
+
+
+def box_episodes(df, min_rally_days=3):
+    # Every box of the history as (start, end, high, low), for drawing
+    close = df['Close'].to_numpy(dtype=float)
+    high = df['High'].to_numpy(dtype=float)
+    low = df['Low'].to_numpy(dtype=float)
+    starts = rally_days(df, min_rally_days)
+    episodes = []
+    for n, start in enumerate(starts):
+        # A box lasts until the close above its high, the next rally day, or the last bar
+        end = starts[n + 1] - 1 if n + 1 < len(starts) else len(close) - 1
+        breakout = np.flatnonzero(close[start:end + 1] > high[start])
+        if len(breakout):
+            end = start + breakout[0]
+        episodes.append((start, end, high[start], low[start:end + 1].min()))
+    return starts, episodes
+
+
+def render_box(df, stock_code, file_name, min_rally_days=3):
+    # Candles, volume, rally days and boxes of one stock, saved to file_name
+    x = np.arange(len(df))
+    open_, high, low, close = (df[c].to_numpy(dtype=float) for c in ['Open', 'High', 'Low', 'Close'])
+    colors = np.where(close >= open_, 'g', 'r')
+    vol_colors = np.where(np.r_[False, close[1:] >= close[:-1]], 'g', 'r')
+
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(20, 12), sharex=True, gridspec_kw={'height_ratios': [3, 1]})
+    ax1.set_ylabel('Price')
+    ax1.set_title(f'{stock_code} with Negative Drawdown')
+    ax2.set_xlabel('Time')
+    ax2.set_ylabel('Volume')
+
+    ax1.vlines(x, low, high, colors=colors)
+    ax1.bar(x, close - open_, bottom=open_, width=0.6, color=colors)
+    ax2.bar(x, df['Volume'].to_numpy(dtype=float), color=vol_colors, width=0.6)
+
+    starts, episodes = box_episodes(df, min_rally_days)
+    ax1.plot(starts, high[starts], 'o', color='orange')
+    for start, end, box_high, box_low in episodes:
+        ax1.add_patch(patches.Rectangle((start, box_low), end - start, box_high - box_low, fill=True, color='yellow', alpha=0.3))
+
+    box = find_box(df, min_rally_days)
+    if box is not None:
+        box_days, box_drop_percent, box_fall_rate = box_stats(df, box)
+        text_str = f"Box Duration: {box_days} days\nDrawdown: {box_drop_percent:.2f}%\nFR: {box_fall_rate:.2f}"
+        ax1.text(0.75, 0.1, text_str, transform=ax1.transAxes, fontsize=12, verticalalignment='bottom', bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
+
+    fig.savefig(file_name)
+    plt.close(fig)
+    return file_name
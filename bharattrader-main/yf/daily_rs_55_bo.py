@@ -5,6 +5,9 @@ Daily timeframe
 
 import yfinance as yf
 import pandas as pd
+import datetime
+import relative_strength as rs
+from price_data import fetch_close_matrix
 
 # Set the bar time frame
 data_interval = '1d'
@@ -24,34 +27,37 @@ stocks = pd.read_csv("stocks.csv", header=0, usecols=["Ticker"])
 def main():
     print('Started')
 
-    # Use yfinance to retrieve the benchmark data
+    # Use yfinance to retrieve the benchmark data, it defines the trading calendar
     benchmark_ticker = yf.Ticker(benchmark)
     benchmark_data = benchmark_ticker.history(period=time_frame,interval=data_interval,auto_adjust=False)
     benchmark_data = benchmark_data.dropna()
-
-    # Iterate through the list of stocks
-    for stock in stocks["Ticker"]:
-        try:
-            ticker = yf.Ticker(stock+".NS")
-            stock_history = ticker.history(period=time_frame,interval=data_interval,auto_adjust=False)
-            stock_history = stock_history.dropna()
-
-            # Create a new column in the stock dataframe for relative strength
-            rs_column = 'Relative_Strength'
-            stock_history[rs_column] = stock_history['Close'] / benchmark_data['Close']
-
-            # Calculate the average_length-day moving average of the 'Relative_Strength' column
-            crs_average_column = f'{average_length}_RS_MA'
-            stock_history[crs_average_column] = stock_history[rs_column].rolling(window=average_length).mean()
-
-            # Check if there is a cross over of crs
-            isCrossOver = stock_history.iloc[-2][rs_column] <= stock_history.iloc[-2][crs_average_column] and \
-                            stock_history.iloc[-1][rs_column] > stock_history.iloc[-1][crs_average_column]
-            if (isCrossOver):
-                print(stock)
-            
-        except Exception as e:
-            print(f"Error: {stock} ==> {e}")
+    calendar = rs.BenchmarkCalendar(benchmark_data['Close'])
+
+    # Retrieve all stocks in batches over the benchmark's dates
+    symbols = list(stocks["Ticker"])
+    start_date = calendar.dates[0].date()
+    end_date = calendar.dates[-1].date() + datetime.timedelta(days=1)
+    closes = fetch_close_matrix([stock + ".NS" for stock in symbols], start_date, end_date)
+    closes.columns = [column[:-3] for column in closes.columns]
+    for stock in symbols:
+        if stock not in closes.columns:
+            print(f"Error: {stock} ==> no data")
+
+    # Relative strength of all stocks and its average_length-day moving average
+    ratios = calendar.ratio_panel(calendar.align_many(closes))
+    crs_average = rs.ratio_ma(ratios, average_length)
+
+    # Last two bars of each stock
+    values = ratios.to_numpy()
+    averages = crs_average.to_numpy()
+    last_row = rs.nth_last_valid(values, 1)
+    previous_row = rs.nth_last_valid(values, 2)
+
+    # Check if there is a cross over of crs
+    isCrossOver = (rs.take_rows(values, previous_row) <= rs.take_rows(averages, previous_row)) & \
+                    (rs.take_rows(values, last_row) > rs.take_rows(averages, last_row))
+    for stock in ratios.columns[isCrossOver]:
+        print(stock)
 
 if __name__ == "__main__":
     main()
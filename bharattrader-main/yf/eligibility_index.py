@@ -0,0 +1,131 @@
+'''
+Persistent symbol eligibility index: first and last trade date and the traded days of every year.
+
+Every close matrix sector_strength_engine.py fetches is fed to update(), which records per symbol
+the first and last traded day, the date range the fetches covered, and a bitmap of the traded days
+of every year in that range (bit n set when the symbol traded on day n of the year, stored as hex).
+Setting a bit twice changes nothing, so overlapping fetches do not double count. Only symbols with
+at least one bar in the matrix are recorded: a symbol missing from it may just be in a batch that
+failed to download, and is left for the next fetch.
+
+A minimum history filter is then a dictionary lookup: trading_days() counts the set bits of a date
+window, which is the exact number of traded days. It returns None when the window is not covered,
+and only those symbols need to be fetched.
+'''
+import json
+import os
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+
+def to_date(value):
+    return pd.Timestamp(value).date()
+
+
+def year_bits(day_numbers):
+    # Bitmap int with bit n set for every day number n (0 = 1 January) of a year
+    days = np.zeros(366, dtype=bool)
+    days[day_numbers] = True
+    return int.from_bytes(np.packbits(days, bitorder='little').tobytes(), 'little')
+
+
+def count_bits(bits, first_day, last_day):
+    # Set bits from day number first_day to last_day, both included
+    mask = ((1 << (last_day + 1)) - 1) ^ ((1 << first_day) - 1)
+    return bin(bits & mask).count('1')
+
+
+class EligibilityIndex:
+    def __init__(self, path):
+        self.path = path
+        self.records = {}
+        if os.path.exists(path):
+            try:
+                with open(path) as file:
+                    records = json.load(file)
+                # Records without day bitmaps were written by an older version, fetch them again
+                self.records = {symbol: record for symbol, record in records.items() if 'days' in record}
+            except (OSError, ValueError, AttributeError):
+                self.records = {}
+
+    def save(self):
+        with open(self.path, 'w') as file:
+            json.dump(self.records, file)
+
+    def first_trade_date(self, symbol):
+        record = self.records.get(symbol)
+        return to_date(record['first']) if record else None
+
+    def last_trade_date(self, symbol):
+        record = self.records.get(symbol)
+        return to_date(record['last']) if record else None
+
+    def update(self, closes, symbols, start, end):
+        # Record the bars of a (dates x symbols) close matrix fetched for [start, end)
+        start = to_date(start)
+        # Days after the matrix's last bar are not known to be empty yet
+        last_bar = to_date(closes.index.max()) if len(closes.index) else start - timedelta(days=1)
+        through = min(to_date(end) - timedelta(days=1), last_bar)
+        if through < start:
+            return
+
+        days = pd.DatetimeIndex(closes.index).values.astype('datetime64[D]')
+        in_window = (days >= np.datetime64(start)) & (days <= np.datetime64(through))
+        years = days.astype('datetime64[Y]').astype(int) + 1970
+        day_numbers = (days - days.astype('datetime64[Y]')).astype(int)
+        for symbol in symbols:
+            if symbol not in closes.columns:
+                continue
+            traded = closes[symbol].notna().to_numpy() & in_window
+            if not traded.any():
+                continue
+
+            record = self.records.get(symbol)
+            # A window that does not touch the covered range starts the record over
+            if record and (start > to_date(record['through']) + timedelta(days=1) or
+                           through < to_date(record['from']) - timedelta(days=1)):
+                record = None
+            if record is None:
+                record = {'first': None, 'last': None, 'from': str(start), 'through': str(through), 'days': {}}
+
+            for year in np.unique(years[traded]).tolist():
+                bits = year_bits(day_numbers[traded & (years == year)])
+                record['days'][str(year)] = format(int(record['days'].get(str(year), '0'), 16) | bits, 'x')
+
+            traded_days = days[traded]
+            first, last = str(traded_days.min()), str(traded_days.max())
+            record['first'] = min(record['first'], first) if record['first'] else first
+            record['last'] = max(record['last'], last) if record['last'] else last
+            record['from'] = str(min(start, to_date(record['from'])))
+            record['through'] = str(max(through, to_date(record['through'])))
+            self.records[symbol] = record
+
+    def trading_days(self, symbol, start, end):
+        # Traded days in [start, end), None when the index does not cover that window
+        record = self.records.get(symbol)
+        start, last_day = to_date(start), to_date(end) - timedelta(days=1)
+        if record is None or start < to_date(record['from']) or last_day > to_date(record['through']):
+            return None
+
+        total = 0
+        for year in range(start.year, last_day.year + 1):
+            bits = record['days'].get(str(year))
+            if not bits:
+                continue
+            first_day = (max(start, date(year, 1, 1)) - date(year, 1, 1)).days
+            last_of_year = (min(last_day, date(year, 12, 31)) - date(year, 1, 1)).days
+            total += count_bits(int(bits, 16), first_day, last_of_year)
+        return total
+
+    def eligible(self, symbols, start, end, min_days):
+        # (symbols with at least min_days traded days in [start, end), symbols the index cannot answer)
+        eligible, unknown = set(), []
+        for symbol in symbols:
+            days = self.trading_days(symbol, start, end)
+            if days is None:
+                unknown.append(symbol)
+            elif days >= min_days:
+                eligible.add(symbol)
+        return eligible, unknown
@@ -0,0 +1,115 @@
+'''
+Event study over a (dates x symbols) close matrix.
+
+An event is a (symbol, date) pair, e.g. a quarterly result. Every event is resolved to the
+symbol's first traded bar on or after its date, and to the bar `h` traded bars later for each
+post-event horizon, with one searchsorted call for all events: the running count of traded bars
+of every column is laid out column after column with an offset, which keeps the flattened array
+sorted, so "row of the n-th bar of column c" is a single lookup for any mix of columns.
+
+The benchmark is read on the same rows as the stock, so its change covers the same dates.
+Stock %, benchmark %, alpha and ARS of all events are then array operations.
+'''
+import numpy as np
+import pandas as pd
+
+# Post-event horizons in trading bars
+horizons = [1, 5, 21]
+
+
+class BarIndex:
+    def __init__(self, closes):
+        self.values = closes.to_numpy(dtype=float)
+        self.dates = pd.DatetimeIndex(closes.index)
+        self.columns = pd.Index(closes.columns)
+        self.rows = len(self.dates)
+        # Traded bars of each column up to and including each row
+        self.counts = np.cumsum(~np.isnan(self.values), axis=0)
+        self.bars = self.counts[-1]
+        # Counts laid out column after column, each column offset past the previous one's range
+        self.offset = np.arange(len(self.columns)) * (self.rows + 1)
+        self.flat = (self.counts + self.offset).ravel(order='F')
+
+    def column(self, symbols):
+        # Column position of each symbol, -1 when it is not in the matrix
+        return self.columns.get_indexer(symbols)
+
+    def row_of_bar(self, cols, bar):
+        # Row of the bar-th traded bar (1 based) of each column, -1 where there is none
+        c = np.clip(cols, 0, None)
+        found = (cols >= 0) & (bar >= 1) & (bar <= self.bars[c])
+        flat = np.searchsorted(self.flat, bar + self.offset[c], side='left')
+        return np.where(found, flat - c * self.rows, -1)
+
+    def bars_before(self, cols, rows):
+        # Traded bars of each column strictly before row
+        counts = self.counts[np.clip(rows - 1, 0, self.rows - 1), np.clip(cols, 0, None)]
+        return np.where(rows > 0, counts, 0)
+
+    def first_bar_on_or_after(self, cols, dates):
+        # Row of each column's first traded bar on or after date, -1 if there is none
+        rows = self.dates.searchsorted(pd.DatetimeIndex(dates), side='left')
+        return self.row_of_bar(cols, self.bars_before(cols, rows) + 1)
+
+    def last_row(self, cols):
+        return self.row_of_bar(cols, self.bars[np.clip(cols, 0, None)])
+
+    def take(self, cols, rows):
+        # Close at (row, column), NaN where either is -1
+        values = self.values[np.clip(rows, 0, None), np.clip(cols, 0, None)]
+        return np.where((cols >= 0) & (rows >= 0), values, np.nan)
+
+    def date_at(self, rows):
+        return self.dates.take(np.clip(rows, 0, None)).where(rows >= 0)
+
+
+def pct_change(start, end):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (end - start) / start * 100
+
+
+def event_study(closes, symbols, event_dates, benchmark, ars_date=None, horizons=horizons):
+    '''
+    Performance of every (symbol, event date) against the benchmark column of closes.
+
+    Returns one row per event: the event bar's date and close, the last close, stock %, benchmark %,
+    alpha to the last close and, for every horizon h, stock %, benchmark % and alpha over the h
+    traded bars after the event. ARS is (stock / stock on ars_date) / (benchmark / benchmark on
+    ars_date) - 1 at the last close, NaN when either did not trade on ars_date.
+    '''
+    index = BarIndex(closes)
+    cols = index.column(list(symbols))
+    bench = np.full(len(cols), index.column([benchmark])[0])
+
+    event_row = index.first_bar_on_or_after(cols, event_dates)
+    last_row = index.last_row(cols)
+    bench_last_row = index.last_row(bench)
+
+    study = pd.DataFrame({
+        'event_date': index.date_at(event_row),
+        'event_close': index.take(cols, event_row),
+        'last_date': index.date_at(last_row),
+        'last_close': index.take(cols, last_row),
+        'benchmark_event_close': index.take(bench, event_row),
+        'benchmark_last_date': index.date_at(bench_last_row),
+        'benchmark_last_close': index.take(bench, bench_last_row),
+    })
+    study['stock_pct'] = pct_change(study['event_close'], study['last_close'])
+    study['benchmark_pct'] = pct_change(study['benchmark_event_close'], study['benchmark_last_close'])
+    study['alpha'] = study['stock_pct'] - study['benchmark_pct']
+
+    # Every horizon counted in the stock's own traded bars from the event bar
+    event_bar = index.bars_before(cols, event_row) + 1
+    for h in horizons:
+        rows = np.where(event_row >= 0, index.row_of_bar(cols, event_bar + h), -1)
+        study[f'stock_pct_{h}d'] = pct_change(study['event_close'].to_numpy(), index.take(cols, rows))
+        study[f'benchmark_pct_{h}d'] = pct_change(study['benchmark_event_close'].to_numpy(), index.take(bench, rows))
+        study[f'alpha_{h}d'] = study[f'stock_pct_{h}d'] - study[f'benchmark_pct_{h}d']
+
+    if ars_date is not None:
+        ars_row = index.dates.get_indexer(pd.DatetimeIndex([ars_date]))[0]
+        ars_rows = np.full(len(cols), ars_row)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            study['ars'] = (study['last_close'] / index.take(cols, ars_rows)) / \
+                           (study['benchmark_last_close'] / index.take(bench, ars_rows)) - 1
+    return study
@@ -0,0 +1,93 @@
+'''
+Panel based reversion-expansion (green dot) engine for green_dot.py.
+
+All stocks are held in one (dates x stocks) close matrix, NaN where a stock did not trade, and
+the weekly matrix is resampled from the daily one instead of being downloaded again.
+The 20/50/100/200 EMAs of every stock come from one multi-span kernel that walks the dates once
+and skips a stock's NaN rows, so each column equals the EMA of that stock's own bars
+(ewm(span) with adjust=True). delta/emadelta crossovers are boolean arrays against the previous
+valid bar of each stock, and the green dot test over the last `lookback` bars looks for the last
+crossover above the highest EMA and any crossunder after it.
+'''
+import numpy as np
+import pandas as pd
+
+# EMA periods of the reversion-expansion study
+ema_spans = [20, 50, 100, 200]
+# Span of the delta EMA
+delta_span = 7
+
+
+def ewm_mean(values, spans):
+    # (spans x dates x stocks) EMAs, ewm(span, adjust=True) over each column's non NaN rows
+    values = np.asarray(values, dtype=float)
+    decay = (1 - 2.0 / (np.asarray(spans, dtype=float) + 1))[:, None]
+    numerator = np.zeros((len(spans), values.shape[1]))
+    denominator = np.zeros((len(spans), values.shape[1]))
+    out = np.full((len(spans),) + values.shape, np.nan)
+    for row in range(values.shape[0]):
+        valid = ~np.isnan(values[row])
+        # NaN rows neither decay nor add weight
+        numerator[:, valid] = values[row, valid] + decay * numerator[:, valid]
+        denominator[:, valid] = 1 + decay * denominator[:, valid]
+        out[:, row, valid] = numerator[:, valid] / denominator[:, valid]
+    return out
+
+
+def previous_valid(values):
+    # Value at each column's previous non NaN row
+    return pd.DataFrame(values).ffill().shift(1).to_numpy()
+
+
+def reversion_expansion(closes):
+    # highest EMA, delta, emadelta, crossover and crossunder arrays of a (dates x stocks) close frame
+    values = closes.to_numpy(dtype=float)
+    valid = ~np.isnan(values)
+    emas = ewm_mean(values, ema_spans)
+
+    # Lowest of the positive EMAs and the highest EMA
+    with np.errstate(invalid='ignore', divide='ignore'):
+        lowest = np.fmin.reduce(np.where(emas > 0, emas, np.nan), axis=0)
+        highest = emas.max(axis=0)
+        delta = np.where(valid, (highest - lowest) / lowest, np.nan)
+    emadelta = ewm_mean(delta, [delta_span])[0]
+
+    # Crossover and crossunder of delta against emadelta, from each stock's previous bar
+    previous_delta = previous_valid(delta)
+    previous_emadelta = previous_valid(emadelta)
+    with np.errstate(invalid='ignore'):
+        crossover = valid & (delta > emadelta) & (previous_delta < previous_emadelta)
+        crossunder = valid & (delta < emadelta) & (previous_delta > previous_emadelta)
+    return {'close': values, 'valid': valid, 'highest': highest, 'delta': delta,
+            'crossover': crossover, 'crossunder': crossunder}
+
+
+def green_dots(closes, lookback=5):
+    # Per stock: green dot flag, date and delta of the last crossover in the last `lookback` bars
+    study = reversion_expansion(closes)
+    valid = study['valid']
+    rows = np.arange(valid.shape[0])[:, None]
+    cols = np.arange(valid.shape[1])
+    bars_from_end = np.cumsum(valid[::-1], axis=0)[::-1]
+    in_window = valid & (bars_from_end <= lookback)
+
+    # Crossover with the close above the highest EMA; a later crossunder cancels it
+    with np.errstate(invalid='ignore'):
+        events = in_window & study['crossover'] & (study['close'] > study['highest'])
+    last_event = np.where(events, rows, -1).max(axis=0, initial=-1)
+    cancelled = (in_window & study['crossunder'] & (rows > last_event)).any(axis=0)
+    has_event = last_event >= 0
+
+    # Stocks without an event read the padding row: no date, delta 0
+    dates = np.append(closes.index.astype(str), '')
+    deltas = np.vstack([study['delta'], np.zeros((1, valid.shape[1]))])
+    return pd.DataFrame({
+        'crossover': has_event & ~cancelled,
+        'date': dates[last_event],
+        'delta': deltas[last_event, cols],
+    }, index=closes.columns)
+
+
+def weekly_closes(daily_closes):
+    # Weekly close of each stock, weeks labelled by their Monday like yfinance's 1wk bars
+    return daily_closes.resample('W-MON', label='left', closed='left').last()
@@ -17,6 +17,7 @@ import numpy as np
 import math
 import csv
 import datetime
+import reference_data
 
 # Read the list of stocks from the CSV file
 stocks = pd.read_csv("stocks.csv", header=0, usecols=["Ticker"])
@@ -43,41 +44,9 @@ daily_volume_length = 100
 # Number of days to check for limevolume
 lookback_length = 55 #3-months daily
 
-# Read up sector/industry information from text data
-stock_industry_map = pd.read_csv("stock_sector_industry_map.csv", header=0, usecols=["NSE Code","Industry","Market Cap", "Sector"])
-
-# Crore
-One_Cr = 10000000
-
 def fetch_industry_mcap(nse_code):
-
-    industry = ''
-    mcap = ''
-    sector = ''
-
-    try:
-        # We try to get from local file first
-        sector = stock_industry_map[stock_industry_map['NSE Code'] == nse_code]['Sector'].iloc[0]
-        industry = stock_industry_map[stock_industry_map['NSE Code'] == nse_code]['Industry'].iloc[0]
-        mcap =  stock_industry_map[stock_industry_map['NSE Code'] == nse_code]['Market Cap'].iloc[0]
-    except Exception as err:
-        pass
-
-    if industry == '' or mcap == '':
-        try:
-                # Try yf
-                ticker = yf.Ticker(nse_code+".NS")
-                if ticker.info:
-                    if industry == '':
-                        industry = ticker.info['industry']
-                    if mcap == '':
-                        mcap = round(ticker.info['marketCap'] / One_Cr, 0)
-                    if sector == '':
-                        sector = ticker.info['sector']
-        except Exception as err:
-            pass
-
-    return [sector, industry, mcap]
+    # Indexed map lookup with a cached yfinance fallback
+    return reference_data.lookup(nse_code)
 
 def main():
     print("Started... " + start_date + " - " + end_date)
@@ -3,6 +3,8 @@ import pandas as pd
 import time
 import os
 from datetime import datetime, timedelta
+import reference_data
+import prior_high
 
 # Set output folder path
 output_path = "output"
@@ -25,22 +27,12 @@ threshold = 1.0
 # Initialize a list to store the results
 results = []
 
-# Crore
-One_Cr = 10000000
-
 # determine if highest close was minimum_low_length ago.
 def highestClose(stock_data, min_months):
-
-    highest_close = stock_data["Close"][0]
-    highest_close_date = stock_data.index[0]
-    highest_close_idx = 0
-    for i in range(1, len(stock_data)):
-        if stock_data["Close"][i] > highest_close:
-            highest_close = stock_data["Close"][i]
-            highest_close_date = stock_data.index[i]
-            highest_close_idx = i
-    if len(stock_data) - highest_close_idx >= min_months:
-       return [True, highest_close, highest_close_date]
+    # Highest close before the last bar (first occurrence), from the prior ATH of every bar
+    prior = prior_high.prior_highs(stock_data["Close"]).iloc[-1]
+    if prior['bars_since_ath'] >= min_months:
+       return [True, prior['ath'], prior['ath_date']]
     else:
        return [False, '', '']
 
@@ -56,8 +48,6 @@ def write_dataframe_to_file(df, name):
 
 def main():
     print("Started...")
-    # create an empty dataframe to store the results
-    results_df = pd.DataFrame(columns=["Stock", "mcap", "Highest Close", "Highest Close Date", "Current Close", "Diff", "sector" , "industry"])
     # Iterate through the list of stocks
     for stock in stocks["Ticker"]:
         try:
@@ -84,33 +74,23 @@ def main():
                 min_months = len(data)
                 
             # Highest close prior to last month
-            result_highestClose = highestClose(data.iloc[:-1], min_months) # Skip the current month
+            result_highestClose = highestClose(data, min_months)
             highestClose_condition = result_highestClose[0]
             highestClose_value = result_highestClose[1]
             highestClose_date = result_highestClose[2]
 
-            # Essential data
-            sector = ''
-            industry = ''
-            marketCap = ''
-            try:
-                if ticker.info:
-                    marketCap = round(ticker.info['marketCap'] / One_Cr, 0)
-                    industry = ticker.info['industry']
-                    sector = ticker.info['sector']
-            except Exception as err:
-                pass
-
             last_close = data["Close"].tail(1).values[0]
             if (highestClose_condition and last_close >= highestClose_value * threshold):
                 diff = round(((last_close - highestClose_value) / highestClose_value) * 100, 2)
-                new_row = pd.DataFrame({"Stock": stock, "mcap": marketCap, "Highest Close": round(highestClose_value, 2), "Highest Close Date": highestClose_date, \
-                                        "Current Close": round(last_close, 2), "Diff": diff, "sector": sector, "industry": industry}, index=[0])
-                results_df = pd.concat([results_df, new_row])
+                results.append({"Stock": stock, "Highest Close": round(highestClose_value, 2), "Highest Close Date": highestClose_date, \
+                                "Current Close": round(last_close, 2), "Diff": diff})
 
         except Exception as e:
             print(f'Error for ticker: {stock} ==> {e}')
 
+    # Sector, industry and mcap for all breakouts in one merge
+    results_df = pd.DataFrame(results, columns=["Stock", "mcap", "Highest Close", "Highest Close Date", "Current Close", "Diff", "sector" , "industry"])
+    results_df = reference_data.enrich(results_df, "Stock")
     # print(results_df)
     write_dataframe_to_file(results_df, "MultiMonth_BO_")
     print("Done")
@@ -9,6 +9,8 @@ import pandas as pd
 import time
 import os
 from datetime import datetime, timedelta
+import reference_data
+import prior_high
 
 # Set output folder path
 output_path = "output"
@@ -31,9 +33,6 @@ MIN_BO_LENGTH = 50 #5 * 12 # Years in months
 # Initialize a list to store the results
 results = []
 
-# Crore
-One_Cr = 10000000
-
 # Columnns in the report
 report_columns = ["Stock", "mcap", "High Close", "High Close Date", "Current Close", "#MonthsBO", "Diff", "sector" , "industry"]
 
@@ -50,8 +49,6 @@ def write_dataframe_to_file(df, name):
 
 def main():
     print("Started...")
-    # create an empty dataframe to store the results
-    results_df = pd.DataFrame(columns=report_columns)
     # Iterate through the list of stocks
     for stock in stocks["Ticker"]:
         try:
@@ -71,40 +68,21 @@ def main():
                 print(f'Skipping. Not enough data for {stock}, only {len(data)} available, minimum required {MIN_BO_LENGTH+1}')
                 continue
 
-            # Reverse the data frame to start from current candle
-            stk_df = data.iloc[::-1]
-            max_loopback = LOOKBACK_LIIMIT
-            if (len(stk_df) < LOOKBACK_LIIMIT): # Limit lookback if not available data for so long
-                max_loopback = len(stk_df)
-            
-            stk_df_max_lookback = stk_df.head(max_loopback)
-            current_close = stk_df_max_lookback['Close'][0]
-            for i in range(1, len(stk_df_max_lookback)):
-                this_close = stk_df_max_lookback['Close'][i]
-                if this_close > current_close:
-                    if i >= MIN_BO_LENGTH: 
-                        highest_close_date = stk_df_max_lookback.index[i].strftime('%Y-%m-%d')
-                        diff = round((this_close - current_close)/current_close * 100, 2)
-                        # Essential data
-                        sector = ''
-                        industry = ''
-                        marketCap = ''
-                        try:
-                            if ticker.info:
-                                marketCap = round(ticker.info['marketCap'] / One_Cr, 0)
-                                industry = ticker.info['industry']
-                                sector = ticker.info['sector']
-                        except Exception as err:
-                            pass
-                        new_row = pd.DataFrame({"Stock": stock, "mcap": marketCap, "High Close": round(this_close, 2), "High Close Date": highest_close_date, \
-                                        "Current Close": round(current_close, 2), "#MonthsBO": i, "Diff": diff, "sector": sector, "industry": industry}, index=[0])
-                        results_df = pd.concat([results_df, new_row])
-                        break
-                    else:
-                        break # A newer high exist before MIN_BO_LENGTH
+            # Most recent close above the current one, within the lookback limit
+            prior = prior_high.prior_highs(data['Close'], LOOKBACK_LIIMIT).iloc[-1]
+            # A newer high before MIN_BO_LENGTH is not a breakout
+            if pd.notna(prior['prior_high']) and prior['bars_since_high'] >= MIN_BO_LENGTH:
+                this_close = prior['prior_high']
+                current_close = prior['close']
+                diff = round((this_close - current_close)/current_close * 100, 2)
+                results.append({"Stock": stock, "High Close": round(this_close, 2), "High Close Date": prior['prior_high_date'].strftime('%Y-%m-%d'), \
+                                "Current Close": round(current_close, 2), "#MonthsBO": int(prior['bars_since_high']), "Diff": diff})
         except Exception as e:
             print(f'Error for ticker: {stock} ==> {e}')
 
+    # Sector, industry and mcap for all breakouts in one merge
+    results_df = pd.DataFrame(results, columns=report_columns)
+    results_df = reference_data.enrich(results_df, "Stock")
     # print(results_df)
     write_dataframe_to_file(results_df, "newHighMonthly_BO_")
     print("Done")
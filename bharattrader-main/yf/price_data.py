@@ -0,0 +1,39 @@
+'''
+Batched yfinance downloads shared by the yf scanners.
+
+fetch_close_matrix() downloads a list of symbols `batch_size` at a time into one aligned
+(dates x symbols) close matrix, NaN where a symbol did not trade, instead of one ticker.history
+call per stock. Batches that fail are reported and skipped, symbols without any bar are dropped,
+and an empty DataFrame comes back when nothing was downloaded.
+'''
+import pandas as pd
+import yfinance as yf
+
+# Symbols per yf.download call
+batch_size = 100
+
+
+def fetch_close_matrix(symbols, start, end):
+    # Close prices as a (dates x symbols) frame, NaN where a symbol did not trade
+    closes = []
+    for i in range(0, len(symbols), batch_size):
+        batch = symbols[i:i + batch_size]
+        try:
+            data = yf.download(tickers=batch, start=start, end=end, interval='1d', auto_adjust=False,
+                               group_by='ticker', threads=True, progress=False)
+        except Exception as e:
+            print(f'Error downloading batch starting {batch[0]} => {e}')
+            continue
+        if data.empty:
+            continue
+        if not isinstance(data.columns, pd.MultiIndex):
+            data.columns = pd.MultiIndex.from_product([batch, data.columns])
+        batch_close = data.xs('Close', axis=1, level=1)
+        closes.append(batch_close[[s for s in batch if s in batch_close.columns]])
+
+    if not closes:
+        return pd.DataFrame()
+    matrix = pd.concat(closes, axis=1).sort_index()
+    matrix.index = pd.DatetimeIndex(matrix.index).tz_localize(None)
+    # Symbols with no bars at all carry no information
+    return matrix.dropna(axis=1, how='all')
@@ -0,0 +1,72 @@
+'''
+Prior high search for breakout scanners, on monthly, weekly or daily closes.
+
+For every bar it answers "when was the last close higher than this one", with a monotonic stack
+of bar positions whose closes are strictly decreasing: a bar pops every earlier bar that does not
+close above it, and whatever is left on top is its prior higher close. Each bar is pushed and
+popped at most once, so the whole history costs O(n) instead of a backward walk per bar.
+The highest close before every bar (the prior ATH) and its first occurrence come from a running
+maximum.
+
+multimonthBO.py uses the prior ATH of the current bar and newHighMonthly.py its prior higher close.
+'''
+import numpy as np
+import pandas as pd
+
+
+def prior_higher(values):
+    # Position of the nearest earlier value strictly greater than each value, -1 if there is none
+    values = np.asarray(values, dtype=float)
+    prior = np.full(len(values), -1)
+    stack = []
+    for i, value in enumerate(values.tolist()):
+        while stack and values[stack[-1]] <= value:
+            stack.pop()
+        if stack:
+            prior[i] = stack[-1]
+        stack.append(i)
+    return prior
+
+
+def prior_ath(values):
+    # Position of the first occurrence of the highest value before each value, -1 for the first
+    values = np.asarray(values, dtype=float)
+    positions = np.arange(len(values))
+    running_max = np.maximum.accumulate(values)
+    is_record = np.r_[True, values[1:] > running_max[:-1]] if len(values) else np.array([], dtype=bool)
+    record = np.maximum.accumulate(np.where(is_record, positions, 0))
+    return np.r_[-1, record[:-1]] if len(values) else record
+
+
+def prior_highs(close, lookback=None):
+    '''
+    Prior higher close and prior ATH of every bar of a close series.
+
+    Columns: prior_high, prior_high_date and bars_since_high for the nearest earlier close above
+    the bar (NaN when there is none, or when it is `lookback` or more bars back), and ath, ath_date
+    and bars_since_ath for the highest close before the bar.
+    '''
+    values = close.to_numpy(dtype=float)
+    positions = np.arange(len(values))
+
+    higher = prior_higher(values)
+    if lookback is not None:
+        higher = np.where(positions - higher < lookback, higher, -1)
+    ath = prior_ath(values)
+
+    def at(prior, source):
+        # source at each bar's prior position, NaN where there is none
+        return pd.Series(np.asarray(source)[np.clip(prior, 0, None)], index=close.index).where(prior >= 0)
+
+    def since(prior):
+        return pd.Series(positions - prior, index=close.index).where(prior >= 0)
+
+    return pd.DataFrame({
+        'close': values,
+        'prior_high': at(higher, values),
+        'prior_high_date': at(higher, close.index),
+        'bars_since_high': since(higher),
+        'ath': at(ath, values),
+        'ath_date': at(ath, close.index),
+        'bars_since_ath': since(ath),
+    }, index=close.index)
@@ -0,0 +1,135 @@
+'''
+Shared sector / industry / market cap reference data for the yf scanners.
+
+The local stock_sector_industry_map.csv is read once and indexed by NSE Code, so a lookup
+is a dictionary access instead of a boolean scan of the whole map. Codes missing from the map
+fall back to yfinance, and those answers are kept in yf_info_cache.csv so the next run does not
+call ticker.info again. Scanners that build a results frame can call enrich() once at the end
+to add sector/industry/mcap with a single merge.
+'''
+
+import os
+import datetime
+import pandas as pd
+import yfinance as yf
+
+# Local sector/industry information
+map_file = "stock_sector_industry_map.csv"
+
+# Persistent cache of yfinance answers for codes not in the map
+cache_file = "yf_info_cache.csv"
+
+# Refresh yfinance answers older than this
+cache_days = 30
+
+# Exchange suffix used for the yfinance fallback
+exchg = ".NS"
+
+# Crore
+One_Cr = 10000000
+
+map_columns = ["NSE Code", "Sector", "Industry", "Market Cap"]
+
+_industry_map = None
+_yf_cache = None
+# Rows added to the yfinance cache since it was last written
+_yf_cache_dirty = False
+
+
+def load_industry_map():
+    # Read the map once per process, indexed by NSE Code
+    global _industry_map
+    if _industry_map is None:
+        if os.path.exists(map_file):
+            df = pd.read_csv(map_file, header=0, usecols=map_columns)
+            df = df[df["NSE Code"].notna()].drop_duplicates(subset="NSE Code", keep="first")
+            _industry_map = df.set_index("NSE Code")
+        else:
+            _industry_map = pd.DataFrame(columns=map_columns[1:], index=pd.Index([], name="NSE Code"))
+    return _industry_map
+
+
+def load_yf_cache():
+    global _yf_cache
+    if _yf_cache is None:
+        if os.path.exists(cache_file):
+            _yf_cache = pd.read_csv(cache_file, header=0, parse_dates=["Fetched"]).set_index("NSE Code")
+        else:
+            _yf_cache = pd.DataFrame(columns=map_columns[1:] + ["Fetched"], index=pd.Index([], name="NSE Code"))
+    return _yf_cache
+
+
+def save_yf_cache():
+    # Rewrite the cache file only when fetch_from_yf added rows
+    global _yf_cache_dirty
+    if _yf_cache is not None and _yf_cache_dirty:
+        _yf_cache.to_csv(cache_file)
+        _yf_cache_dirty = False
+
+
+def fetch_from_yf(nse_code):
+    # Cached yfinance fallback, returns [sector, industry, mcap] with '' for unknown values
+    global _yf_cache_dirty
+    cache = load_yf_cache()
+    now = datetime.datetime.now()
+    if nse_code in cache.index:
+        cached = cache.loc[nse_code]
+        if now - pd.Timestamp(cached["Fetched"]) < datetime.timedelta(days=cache_days):
+            return [cached["Sector"], cached["Industry"], cached["Market Cap"]]
+
+    sector = ''
+    industry = ''
+    mcap = ''
+    try:
+        info = yf.Ticker(nse_code + exchg).info
+        if info:
+            industry = info.get('industry', '')
+            sector = info.get('sector', '')
+            if info.get('marketCap'):
+                mcap = round(info['marketCap'] / One_Cr, 0)
+    except Exception as err:
+        # Do not cache failures, they are retried next run
+        print(f"Error fetching yfinance info for {nse_code} => {err}")
+        return [sector, industry, mcap]
+
+    cache.loc[nse_code, ["Sector", "Industry", "Market Cap", "Fetched"]] = [sector, industry, mcap, now]
+    _yf_cache_dirty = True
+    return [sector, industry, mcap]
+
+
+def lookup(nse_code):
+    # Same contract as the old limevolume.fetch_industry_mcap: [sector, industry, mcap]
+    industry_map = load_industry_map()
+    if nse_code in industry_map.index:
+        row = industry_map.loc[nse_code]
+        sector, industry, mcap = row["Sector"], row["Industry"], row["Market Cap"]
+        if industry != '' and mcap != '':
+            return [sector, industry, mcap]
+
+    result = fetch_from_yf(nse_code)
+    save_yf_cache()
+    return result
+
+
+def enrich(df, code_col, sector_col='sector', industry_col='industry', mcap_col='mcap'):
+    # Add sector/industry/mcap for every row of a results frame with one merge
+    if df.empty:
+        return df
+
+    industry_map = load_industry_map()
+    codes = pd.Index(df[code_col].unique())
+    missing = codes.difference(industry_map.index)
+
+    # Only codes absent from the map go to yfinance (and its cache)
+    fallback = pd.DataFrame([fetch_from_yf(code) for code in missing], index=missing,
+                            columns=["Sector", "Industry", "Market Cap"])
+    save_yf_cache()
+
+    reference = pd.concat([industry_map.loc[industry_map.index.intersection(codes), ["Sector", "Industry", "Market Cap"]],
+                           fallback])
+    reference = reference.rename(columns={"Sector": sector_col, "Industry": industry_col, "Market Cap": mcap_col})
+
+    # Keep the caller's column order when the report already has placeholder columns
+    columns = list(df.columns) + [c for c in [sector_col, industry_col, mcap_col] if c not in df.columns]
+    df = df.drop(columns=[c for c in [sector_col, industry_col, mcap_col] if c in df.columns])
+    return df.merge(reference, left_on=code_col, right_index=True, how="left")[columns]
@@ -0,0 +1,138 @@
+'''
+Relative strength against a benchmark held once on its own trading calendar.
+
+The benchmark's dates (normalized to tz-naive calendar days, so an Asia/Kolkata index from yfinance
+and a naive index from CSV files line up) are the canonical NSE calendar. A stock is aligned to it
+through integer positions from one get_indexer call instead of an index union per division, and a
+whole universe is aligned into a (dates x stocks) panel. Ratios (CRS), their moving averages, ARS
+against any reference date and SRS over a bar count are then column operations on that panel.
+Reference dates are located with searchsorted.
+
+A stock has NaN on the calendar days it did not trade. Moving averages run over each stock's own
+bars, like they did on its own history: the valid values of every column are packed to the bottom
+of the frame, the window runs there, and the results go back to the rows they came from.
+
+Only pandas/numpy are used, so the eodhd scanners import it as well.
+'''
+import numpy as np
+import pandas as pd
+
+
+def normalize_index(index):
+    # Calendar day of each bar, tz dropped keeping the local date
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.normalize()
+
+
+def nth_last_valid(values, n):
+    # Row position of the n-th last non NaN value of each column, -1 when there are fewer than n
+    valid = ~np.isnan(values)
+    bars_from_end = np.cumsum(valid[::-1], axis=0)[::-1]
+    hit = valid & (bars_from_end == n)
+    return np.where(hit.any(axis=0), np.argmax(hit, axis=0), -1)
+
+
+def take_rows(values, rows):
+    # values[rows[c], c] per column, NaN where the row is -1
+    cols = np.arange(values.shape[1])
+    taken = values[np.clip(rows, 0, None), cols]
+    return np.where(rows >= 0, taken, np.nan)
+
+
+class BenchmarkCalendar:
+    def __init__(self, benchmark_close):
+        close = pd.Series(benchmark_close).dropna()
+        close.index = normalize_index(close.index)
+        close = close[~close.index.duplicated(keep='last')].sort_index()
+        self.dates = close.index
+        self.close = close.to_numpy(dtype=float)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def positions(self, index):
+        # Calendar position of each date, -1 for dates the benchmark did not trade
+        return self.dates.get_indexer(normalize_index(index))
+
+    def locate(self, date):
+        # Position of the last calendar day on or before date, -1 if before the calendar starts
+        return int(self.dates.searchsorted(normalize_index([date])[0], side='right')) - 1
+
+    def align(self, close):
+        # Close of one stock on the calendar, NaN where it has no bar
+        close = pd.Series(close).dropna()
+        aligned = np.full(len(self.dates), np.nan)
+        pos = self.positions(close.index)
+        on_calendar = pos >= 0
+        aligned[pos[on_calendar]] = close.to_numpy(dtype=float)[on_calendar]
+        return aligned
+
+    def align_many(self, closes):
+        # (dates x stocks) panel from {symbol: close series} or a frame of closes
+        if isinstance(closes, pd.DataFrame):
+            closes = {symbol: closes[symbol] for symbol in closes.columns}
+        panel = np.column_stack([self.align(close) for close in closes.values()]) if closes \
+            else np.empty((len(self.dates), 0))
+        return pd.DataFrame(panel, index=self.dates, columns=list(closes.keys()))
+
+    def ratio(self, close):
+        # Stock / benchmark on the stock's own bars, NaN on bars the benchmark did not trade
+        close = pd.Series(close)
+        pos = self.positions(close.index)
+        benchmark = np.where(pos >= 0, self.close[np.clip(pos, 0, None)], np.nan)
+        return pd.Series(close.to_numpy(dtype=float) / benchmark, index=close.index)
+
+    def ratio_panel(self, panel):
+        # Comparative relative strength (CRS) of every column of an aligned panel
+        return panel.div(self.close, axis=0)
+
+
+def on_valid_rows(frame, func, valid=None):
+    # func (a frame -> same shape frame column operation) over each column's valid rows only, as if
+    # the column had no gaps; NaN on the other rows. valid defaults to the non NaN cells of frame
+    values = frame.to_numpy(dtype=float)
+    if valid is None:
+        valid = ~np.isnan(values)
+    bars_from_end = np.cumsum(valid[::-1], axis=0)[::-1]
+    rows, cols = np.nonzero(valid)
+    packed_rows = len(values) - bars_from_end[rows, cols]
+
+    packed = np.full(values.shape, np.nan)
+    packed[packed_rows, cols] = values[rows, cols]
+    result = func(pd.DataFrame(packed, columns=frame.columns)).to_numpy(dtype=float)
+
+    out = np.full(values.shape, np.nan)
+    out[rows, cols] = result[packed_rows, cols]
+    return pd.DataFrame(out, index=frame.index, columns=frame.columns)
+
+
+def ratio_ma(ratios, length):
+    # Simple moving average of the ratios over each stock's last `length` bars
+    return on_valid_rows(ratios, lambda packed: packed.rolling(window=length).mean())
+
+
+def ratio_ema(ratios, span):
+    return on_valid_rows(ratios, lambda packed: packed.ewm(span=span, adjust=False).mean())
+
+
+def adaptive_rs(calendar, ratios, reference_date):
+    # ARS: ratio relative to its value on the reference date, minus 1; NaN when the date is before the calendar
+    pos = calendar.locate(reference_date)
+    if pos < 0:
+        return ratios * np.nan
+    return ratios / ratios.iloc[pos] - 1
+
+
+def static_rs(ratios, length):
+    # SRS: ratio relative to its value `length` bars back from each stock's last bar, minus 1
+    values = ratios.to_numpy(dtype=float)
+    base = take_rows(values, nth_last_valid(values, length))
+    return ratios / base - 1
+
+
+def last_values(frame, n=1):
+    # Value at the n-th last valid row of each column
+    values = frame.to_numpy(dtype=float)
+    return pd.Series(take_rows(values, nth_last_valid(values, n)), index=frame.columns)
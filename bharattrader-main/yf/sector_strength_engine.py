@@ -0,0 +1,179 @@
+'''
+Matrix based engine for stock_sector_strength.py.
+
+Every symbol is downloaded once, in batches (price_data.py), into an aligned (dates x stocks) close
+matrix that covers both the eligibility window (a year before the run date) and the reference date
+window. Eligibility, the reference date gains, the [5, 21, 55, 123] day gains and the sector
+indices are then column operations on that matrix instead of one ticker.history call per stock
+per step.
+The custom index composition is cached in a JSON file, keyed on the inputs that decide it, so a
+rerun with the same settings skips the eligibility window entirely. Every fetched matrix also feeds
+the symbol eligibility index (eligibility_index.py), so stocks whose trading history it already
+covers are filtered by lookup and only fetched from the reference date.
+'''
+import os
+import json
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from eligibility_index import EligibilityIndex
+from price_data import fetch_close_matrix
+
+# Custom index composition cache
+index_cache_file = "custom_indices_cache.json"
+
+# First/last trade date and trading day counts of every symbol fetched so far
+eligibility_index_file = "eligibility_index.json"
+
+
+def trading_day_counts(closes, run_date, lookback_days=365):
+    # Number of trading days per stock in the year before run_date
+    start = pd.Timestamp(run_date) - timedelta(days=lookback_days)
+    window = closes[(closes.index >= start) & (closes.index < pd.Timestamp(run_date))]
+    return window.notna().sum()
+
+
+def first_valid(closes):
+    return closes.bfill().iloc[0]
+
+
+def last_valid(closes):
+    return closes.ffill().iloc[-1]
+
+
+def nth_last_valid(closes, n):
+    # Close of the n-th last traded bar of each stock, NaN if it traded fewer than n bars
+    valid = closes.notna()
+    bars_from_end = valid[::-1].cumsum()[::-1]
+    return closes.where(valid & (bars_from_end == n)).max()
+
+
+def gain_matrix(closes, reference_date, run_date, periods):
+    # Gain % from the reference date and over each period, one row per stock
+    window = closes.loc[reference_date:run_date]
+    end_price = last_valid(window)
+    start_price = first_valid(window)
+
+    gains = pd.DataFrame(index=window.columns)
+    gains['bars'] = window.notna().sum()
+    gains['start'] = start_price
+    gains['end'] = end_price
+    gains['refdate'] = (end_price - start_price) / start_price * 100
+    for period in periods:
+        period_start = nth_last_valid(window, period)
+        gains[f'{period}d'] = ((end_price - period_start) / period_start * 100).round(2)
+    return gains
+
+
+def sector_gain_series(gains, custom_indices, weighting='price'):
+    # Gain % of each custom index from the reference date
+    #   price - sum of closes, the original definition
+    #   equal - mean of the member gains
+    #   cap   - member gains weighted by market cap
+    sector_gains = {}
+    for sector, stocks in custom_indices.items():
+        codes = [s['NSE Code'] for s in stocks if s['NSE Code'] in gains.index]
+        members = gains.loc[codes].dropna(subset=['start', 'end'])
+        if members.empty:
+            sector_gains[sector] = np.nan
+            continue
+        if weighting == 'equal':
+            sector_gain = members['refdate'].mean()
+        elif weighting == 'cap':
+            caps = pd.Series({s['NSE Code']: s['Market Cap'] for s in stocks}).reindex(members.index)
+            sector_gain = np.average(members['refdate'], weights=caps)
+        else:
+            sector_gain = (members['end'].sum() - members['start'].sum()) / members['start'].sum() * 100
+        sector_gains[sector] = round(sector_gain, 2)
+    return sector_gains
+
+
+def index_cache_key(run_date, min_trading_days, max_stocks_per_sector, min_cap, map_file):
+    # Anything that changes the composition invalidates the cache
+    return {
+        'run_date': run_date,
+        'min_trading_days': min_trading_days,
+        'max_stocks_per_sector': max_stocks_per_sector,
+        'min_cap': min_cap,
+        'map_mtime': os.path.getmtime(map_file) if os.path.exists(map_file) else None,
+    }
+
+
+def load_cached_indices(key):
+    if not os.path.exists(index_cache_file):
+        return None
+    try:
+        with open(index_cache_file) as file:
+            cached = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if cached.get('key') != key:
+        return None
+    return cached['custom_indices']
+
+
+def save_cached_indices(key, custom_indices):
+    with open(index_cache_file, 'w') as file:
+        json.dump({'key': key, 'custom_indices': custom_indices}, file, indent=2, default=str)
+
+
+def build_custom_indices(df, eligible, max_stocks_per_sector):
+    # Top stocks by market cap per sector, among those with enough trading history
+    members = df[df['NSE Code'].isin(eligible)]
+    members = members.sort_values('Market Cap', ascending=False, kind='stable')
+    custom_indices = {}
+    for sector, group in members.groupby('Sector', sort=False):
+        custom_indices[sector] = [
+            {'NSE Code': row['NSE Code'], 'Industry': row['Industry'], 'Market Cap': row['Market Cap']}
+            for _, row in group.head(max_stocks_per_sector).iterrows()
+        ]
+    return custom_indices
+
+
+def fetch_codes(index, codes, start, end):
+    # Close matrix of NSE codes, recorded in the eligibility index
+    if not codes:
+        return pd.DataFrame()
+    print(f"Fetching {len(codes)} stocks from {start} to {end}...")
+    closes = fetch_close_matrix([code + '.NS' for code in codes], start, end)
+    closes.columns = [c[:-len('.NS')] for c in closes.columns]
+    index.update(closes, codes, start, end)
+    return closes
+
+
+def run(df, reference_date, run_date, benchmark, periods, min_trading_days, max_stocks_per_sector,
+        min_cap, map_file, weighting='price'):
+    # Returns (custom_indices, stock gains frame, sector gains dict, benchmark gain)
+    key = index_cache_key(run_date, min_trading_days, max_stocks_per_sector, min_cap, map_file)
+    custom_indices = load_cached_indices(key)
+    index = EligibilityIndex(eligibility_index_file)
+    codes = df['NSE Code'].tolist()
+
+    # Only reach back a year before the run date for stocks the eligibility index cannot answer
+    eligible, unknown = set(), []
+    eligibility_start = (datetime.strptime(run_date, '%Y-%m-%d') - timedelta(days=365)).strftime('%Y-%m-%d')
+    if custom_indices is None:
+        eligible, unknown = index.eligible(codes, eligibility_start, run_date, min_trading_days)
+    start = min(reference_date, eligibility_start) if unknown else reference_date
+
+    closes = fetch_codes(index, [code for code in codes if code not in unknown], reference_date, run_date)
+    if unknown:
+        unknown_closes = fetch_codes(index, unknown, start, run_date)
+        closes = pd.concat([closes, unknown_closes], axis=1).sort_index() if not closes.empty else unknown_closes
+    index.save()
+
+    if custom_indices is None:
+        counts = trading_day_counts(closes[[c for c in unknown if c in closes.columns]], run_date)
+        eligible |= set(counts[counts >= min_trading_days].index)
+        custom_indices = build_custom_indices(df, eligible, max_stocks_per_sector)
+        save_cached_indices(key, custom_indices)
+    else:
+        print(f"Using cached custom indices from {index_cache_file}")
+
+    gains = gain_matrix(closes, reference_date, run_date, periods)
+    sector_gains = sector_gain_series(gains, custom_indices, weighting)
+
+    benchmark_closes = fetch_close_matrix([benchmark], reference_date, run_date)
+    benchmark_gain = gain_matrix(benchmark_closes, reference_date, run_date, [])['refdate'].iloc[0]
+
+    return custom_indices, gains, sector_gains, benchmark_gain
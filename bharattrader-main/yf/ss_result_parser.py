@@ -8,8 +8,9 @@ and calculates various performance metrics relative to benchmark.
 
 The script:
 1. Reads stock information from a CSV file with 'companyId' format as 'NSE:SYMBOL' or 'BSE:SYMBOL'
-2. Downloads historical price data for each stock using yfinance
-3. Calculates performance metrics (stock change %, benchmark change %, Alpha, ARS)
+2. Downloads historical price data for all stocks and the benchmark in batches using yfinance
+3. Calculates performance metrics (stock change %, benchmark change %, Alpha, ARS) for all
+   result dates at once with event_study.py, also over the 1, 5 and 21 trading days after the result
 4. Saves the enriched data to a new CSV file
 
 Usage:
@@ -18,15 +19,21 @@ Usage:
 
 # Standard library imports
 import datetime
-import numpy as np
 import pandas as pd
 import yfinance as yf
+import event_study
+from price_data import fetch_close_matrix
 
 # Constants
 ARS_DATE = "2024-05-10"  # ARS (Adaptive Relative Strength) reference date
 START_DATE = '2024-01-01'  # Beginning of analysis period
 END_DATE = (datetime.datetime.now() + datetime.timedelta(days=1)).strftime('%Y-%m-%d')  # today + 1 day
 
+BENCHMARK = "^NSEI"  # NIFTY 50 Index
+HORIZONS = event_study.horizons  # Post-result trading days
+
+EXCHANGE_SUFFIX = {"NSE": ".NS", "BSE": ".BO"}
+
 RESULT_FILE = "ss_result_file.csv"
 OUTPUT_FILE = "final_ss_result_parser.csv"
 
@@ -36,137 +43,127 @@ def main():
     Main function to process stock data and calculate performance metrics.
     """
     print('Started... with yfinance version:', yf.__version__)
-    
-    # Use yfinance to retrieve the benchmark data
-    benchmark_ticker = yf.Ticker("^NSEI")  # NIFTY 50 Index
-    benchmark_data = benchmark_ticker.history(start=START_DATE, end=END_DATE, interval='1d', auto_adjust=False, prepost=False)
-    benchmark_data = benchmark_data.dropna()
 
     # Read the result file
     result = pd.read_csv(RESULT_FILE)
     result = result.dropna(subset=['companyId'])  # Only drop rows with no companyId
-    
-    # Process each stock
+
+    # Collect one event (ticker, result date) per stock
+    events = {}
     for index, row in result.iterrows():
+        print(f"Processing {row['Name']}...")
+        company_id_parts = row['companyId'].split(':')
+        if len(company_id_parts) < 2:
+            print(f"Error processing {row['companyId']}: no exchange in companyId")
+            continue
+        exchange, symbol = company_id_parts[0], company_id_parts[1]
+
+        # Set ticker format based on exchange
+        if exchange not in EXCHANGE_SUFFIX:
+            print(f"Unknown exchange for {row['companyId']}")
+            continue
+        if pd.isna(row['Last Result Date']):
+            print(f"No result date for {row['companyId']}")
+            continue
         try:
-            # Extract exchange and symbol from companyId
-            company_id_parts = row['companyId'].split(':')
-            exchange = company_id_parts[0]
-            symbol = company_id_parts[1]
-            
-            print(f"Processing {row['Name']}...")
-            
-            # Set ticker format based on exchange
-            if exchange == "NSE":
-                stk_ticker = symbol + '.NS'
-            elif exchange == "BSE":
-                stk_ticker = symbol + '.BO'
-            else:
-                print(f"Unknown exchange for {row['companyId']}")
-                continue
-                
-            stk_ticker = yf.Ticker(stk_ticker)
-            stock_data = stk_ticker.history(start=START_DATE, end=END_DATE, interval='1d', auto_adjust=False, prepost=False)
-            
-            if stock_data.empty:
-                print(f"No data available for {row['companyId']}")
-                continue
-                
-            # Fetch Result Date, and then fetch the price on that date from stock_data.
-            if pd.isna(row['Last Result Date']):
-                print(f"No result date for {row['companyId']}")
-                continue
-                
-            result_date = datetime.datetime.strptime(row['Last Result Date'], '%Y-%m-%d').strftime('%Y-%m-%d')
-            result_price = 0.00
-            
-            # Get the last date in the stock data
-            last_date = stock_data.index[-1].strftime('%Y-%m-%d')
-            if last_date < result_date:
-                print(f"Error: {row['companyId']} => Result Date {result_date} is greater than last date in stock data {last_date}")
-                continue
-            
-            # If price not found on result date, try following dates
-            while result_date <= last_date:
-                try:
-                    result_price = stock_data.loc[stock_data.index == result_date, "Close"].values[0]
-                    break
-                except:
-                    result_date = (datetime.datetime.strptime(result_date, '%Y-%m-%d') + datetime.timedelta(days=1)).strftime('%Y-%m-%d')
-                    continue
-            
-            # Calculate and add stock performance metrics
-            add_stock_metrics(result, index, stock_data, result_date, result_price)
-            
-            # Calculate and add benchmark performance metrics
-            add_benchmark_metrics(result, index, benchmark_data, result_date)
-            
-            # Calculate alpha and ARS
-            calculate_comparative_metrics(result, index, stock_data, benchmark_data)
-
-        except Exception as e:
-            print(f'Error processing {row.get("companyId", "unknown")}: {e}')
+            result_date = datetime.datetime.strptime(row['Last Result Date'], '%Y-%m-%d')
+        except ValueError as e:
+            print(f"Error processing {row['companyId']}: {e}")
             continue
-            
+        events[index] = (symbol + EXCHANGE_SUFFIX[exchange], result_date)
+
+    # Download all stocks and the benchmark in batches
+    tickers = list(dict.fromkeys(ticker for ticker, _ in events.values()))
+    closes = fetch_close_matrix(tickers + [BENCHMARK], START_DATE, END_DATE)
+    if closes.empty:
+        print("No price data downloaded")
+        result.to_csv(OUTPUT_FILE, index=False)
+        return
+
+    # Resolve every result date to the next trading bar and measure all events at once
+    study = event_study.event_study(closes, [ticker for ticker, _ in events.values()],
+                                    [date for _, date in events.values()], BENCHMARK, ARS_DATE, HORIZONS)
+    study.index = list(events.keys())
+
+    has_data = study['last_date'].notna()
+    for index in study.index[~has_data]:
+        print(f"No data available for {result.at[index, 'companyId']}")
+    late = has_data & study['event_date'].isna()
+    for index in study.index[late]:
+        print(f"Error: {result.at[index, 'companyId']} => Result Date {events[index][1].strftime('%Y-%m-%d')} "
+              f"is greater than last date in stock data {study.at[index, 'last_date'].strftime('%Y-%m-%d')}")
+    study = study[has_data & ~late]
+
+    # Calculate and add stock, benchmark and comparative metrics
+    add_stock_metrics(result, study)
+    no_benchmark = study['benchmark_event_close'].isna()
+    for index in study.index[no_benchmark]:
+        print(f"Error processing {result.at[index, 'companyId']}: no benchmark price on {study.at[index, 'event_date'].strftime('%Y-%m-%d')}")
+    add_benchmark_metrics(result, study[~no_benchmark])
+    calculate_comparative_metrics(result, study[~no_benchmark])
+    add_horizon_metrics(result, study)
+
     # Save the result file
     result.to_csv(OUTPUT_FILE, index=False)
     print(f"Processing complete. Results saved to {OUTPUT_FILE}")
 
 
-def add_stock_metrics(result_df, index, stock_data, result_date, result_price):
+def add_stock_metrics(result_df, study):
     """
     Calculate and add stock-specific metrics to the result dataframe.
     
     Args:
         result_df: The dataframe containing stock information
-        index: The row index in the dataframe
-        stock_data: Historical stock data from yfinance
-        result_date: The date when the result was announced
-        result_price: The stock price on the result date
+        study: Event study rows indexed like result_df
     """
-    result_df.at[index, 'Result Date Price'] = round(result_price, 2)
-    result_df.at[index, 'Last Close Date'] = stock_data.index[-1].strftime('%Y-%m-%d')
-    result_df.at[index, 'Last Close Price'] = round(stock_data['Close'].iloc[-1], 2)
-    result_df.at[index, '% Stock change'] = round((stock_data['Close'].iloc[-1] - result_price) / result_price * 100, 2)
+    result_df.loc[study.index, 'Result Date Price'] = study['event_close'].round(2)
+    result_df.loc[study.index, 'Last Close Date'] = study['last_date'].dt.strftime('%Y-%m-%d')
+    result_df.loc[study.index, 'Last Close Price'] = study['last_close'].round(2)
+    result_df.loc[study.index, '% Stock change'] = study['stock_pct'].round(2)
 
 
-def add_benchmark_metrics(result_df, index, benchmark_data, result_date):
+def add_benchmark_metrics(result_df, study):
     """
     Calculate and add benchmark metrics to the result dataframe.
     
     Args:
         result_df: The dataframe containing stock information
-        index: The row index in the dataframe
-        benchmark_data: Historical benchmark data from yfinance
-        result_date: The date when the result was announced
+        study: Event study rows indexed like result_df
     """
-    benchmark_result_price = benchmark_data.loc[benchmark_data.index == result_date, "Close"].values[0]
-    result_df.at[index, 'Result Date Benchmark Price'] = round(benchmark_result_price, 2)
-    result_df.at[index, 'Last Benchmark Date'] = benchmark_data.index[-1].strftime('%Y-%m-%d')
-    result_df.at[index, 'Last Benchmark Price'] = round(benchmark_data['Close'].iloc[-1], 2)
-    result_df.at[index, '% Benchmark change'] = round((benchmark_data['Close'].iloc[-1] - benchmark_result_price) / benchmark_result_price * 100, 2)
+    result_df.loc[study.index, 'Result Date Benchmark Price'] = study['benchmark_event_close'].round(2)
+    result_df.loc[study.index, 'Last Benchmark Date'] = study['benchmark_last_date'].dt.strftime('%Y-%m-%d')
+    result_df.loc[study.index, 'Last Benchmark Price'] = study['benchmark_last_close'].round(2)
+    result_df.loc[study.index, '% Benchmark change'] = study['benchmark_pct'].round(2)
 
 
-def calculate_comparative_metrics(result_df, index, stock_data, benchmark_data):
+def calculate_comparative_metrics(result_df, study):
     """
     Calculate comparative performance metrics like Alpha and ARS.
     
     Args:
         result_df: The dataframe containing stock information
-        index: The row index in the dataframe
-        stock_data: Historical stock data from yfinance
-        benchmark_data: Historical benchmark data from yfinance
+        study: Event study rows indexed like result_df
     """
     # Calculate alpha (stock performance relative to benchmark)
-    result_df.at[index, 'Alpha'] = result_df.at[index, '% Stock change'] - result_df.at[index, '% Benchmark change']
-
-    # Calculate ARS (Adaptive Relative Strength)
-    try:
-        result_df.at[index, 'ARS'] = round(
-            (stock_data['Close'].iloc[-1] / stock_data.loc[stock_data.index == ARS_DATE, "Close"].values[0]) / 
-            (benchmark_data['Close'].iloc[-1] / benchmark_data.loc[benchmark_data.index == ARS_DATE, "Close"].values[0]) - 1, 2)
-    except:
-        result_df.at[index, 'ARS'] = 0.00  # Error in calculating ARS, set it to 0.00
+    result_df.loc[study.index, 'Alpha'] = result_df.loc[study.index, '% Stock change'] - result_df.loc[study.index, '% Benchmark change']
+
+    # Calculate ARS (Adaptive Relative Strength), 0.00 when there is no price on ARS_DATE
+    result_df.loc[study.index, 'ARS'] = study['ars'].round(2).fillna(0.00)
+
+
+def add_horizon_metrics(result_df, study):
+    """
+    Add stock %, benchmark % and Alpha over each post-result horizon.
+    
+    Args:
+        result_df: The dataframe containing stock information
+        study: Event study rows indexed like result_df
+    """
+    for h in HORIZONS:
+        result_df.loc[study.index, f'% Stock change {h}d'] = study[f'stock_pct_{h}d'].round(2)
+        result_df.loc[study.index, f'% Benchmark change {h}d'] = study[f'benchmark_pct_{h}d'].round(2)
+        result_df.loc[study.index, f'Alpha {h}d'] = (result_df.loc[study.index, f'% Stock change {h}d'] -
+                                                     result_df.loc[study.index, f'% Benchmark change {h}d'])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,84 @@
+'''
+Array based engine for supply_exhaustion_6m_scan.py.
+
+The scan runs on a (dates x stocks) close matrix, NaN where a stock did not trade. The lowest
+close of the lookback window is found with a last-occurrence argmin, the high before it and the
+high after it with maxima over prefix/suffix masks, so every stock is evaluated in the same
+numpy calls. scan_history re-runs the scan as of each day of a date range for backtesting.
+'''
+import numpy as np
+import pandas as pd
+
+# Columns of the scan output, in the order the scanner writes them
+result_columns = ["Stock", "Lowest Close", "Low Date", "High Prior", "High Prior Date", "23_6 Retrace",
+                  "38_2 Retrace", "50_0 Retrace", "Curr/High %"]
+
+
+def last_argmin(values):
+    # Row of the last occurrence of the column minimum
+    return values.shape[0] - 1 - np.argmin(values[::-1], axis=0)
+
+
+def last_argmax(values):
+    # Row of the last occurrence of the column maximum
+    return values.shape[0] - 1 - np.argmax(values[::-1], axis=0)
+
+
+def scan(closes, lookback=250, min_low_length=123):
+    # Stocks whose lowest close of the last `lookback` bars is at least `min_low_length` bars old
+    # and whose highest close since then stays under the 50% retracement of the prior high
+    closes = closes.dropna(axis=1, how='all')
+    if closes.empty:
+        return pd.DataFrame(columns=result_columns)
+
+    values = closes.to_numpy(dtype=float)
+    valid = ~np.isnan(values)
+    cols = np.arange(values.shape[1])
+    rows = np.arange(values.shape[0])[:, None]
+
+    # Bars from each row to the last bar of the stock, inclusive
+    bars_from_end = np.cumsum(valid[::-1], axis=0)[::-1]
+    window = valid & (bars_from_end <= lookback)
+
+    low_idx = last_argmin(np.where(window, values, np.inf))
+    low_close = values[low_idx, cols]
+    low_ok = bars_from_end[low_idx, cols] >= min_low_length
+
+    # Highest close before the low (whole history) and after it
+    prefix = valid & (rows < low_idx)
+    suffix = valid & (rows > low_idx)
+    prior_idx = last_argmax(np.where(prefix, values, -np.inf))
+    prior_high = values[prior_idx, cols]
+    after_high = np.where(suffix, values, -np.inf).max(axis=0)
+    current_close = values[last_argmax(valid), cols]
+
+    # 23.6%, 38.2% and 50% retracement value
+    diff = prior_high - low_close
+    below_50 = after_high <= low_close + diff * 0.50
+    below_38_2 = below_50 & (after_high <= low_close + diff * 0.382)
+    below_23_6 = below_38_2 & (after_high <= low_close + diff * 0.236)
+
+    hits = np.flatnonzero(low_ok & prefix.any(axis=0) & suffix.any(axis=0) & below_50)
+    results = []
+    for c in hits:
+        results.append({
+            "Stock": closes.columns[c], "Lowest Close": low_close[c], "Low Date": closes.index[low_idx[c]],
+            "High Prior": prior_high[c], "High Prior Date": closes.index[prior_idx[c]],
+            "23_6 Retrace": bool(below_23_6[c]), "38_2 Retrace": bool(below_38_2[c]), "50_0 Retrace": bool(below_50[c]),
+            "Curr/High %": round((current_close[c] - after_high[c]) / after_high[c] * 100, 2)
+        })
+    return pd.DataFrame(results, columns=result_columns)
+
+
+def scan_history(closes, start, end=None, lookback=250, min_low_length=123):
+    # The scan as of every trading day from start to end, one row per (Date, Stock) hit
+    dates = closes.loc[start:end].index
+    frames = []
+    for date in dates:
+        hits = scan(closes.loc[:date], lookback, min_low_length)
+        if not hits.empty:
+            hits.insert(0, "Date", date)
+            frames.append(hits)
+    if not frames:
+        return pd.DataFrame(columns=["Date"] + result_columns)
+    return pd.concat(frames, ignore_index=True)
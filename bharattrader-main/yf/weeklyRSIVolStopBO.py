@@ -37,6 +37,7 @@ data_interval_weekly = '1wk'
 import yfinance as yf
 import pandas as pd
 import numpy as np
+import relative_strength as rs
 
 def rsi_crossover(data, rsi_level):
     current_rsi = data.iloc[-1]['RSI']
@@ -55,9 +56,9 @@ def volatility_stop(data, period, multiplier):
     data['volStop'] = vol_stop
     return data
 
-def ratio_mean(data, benchmark_data, length):
+def ratio_mean(data, calendar, length):
     # Calculate the relative strength of the stock by dividing its weekly closing price by the weekly closing price of the Nifty 50 index
-    relative_strength = data['Close'] / benchmark_data['Close']
+    relative_strength = calendar.ratio(data['Close'])
     data[f'relativeRatio'] = relative_strength
     # print(relative_strength.tail(10))
 
@@ -76,6 +77,8 @@ def main():
     benchmark_ticker = yf.Ticker(benchmark)
     benchmark_data = benchmark_ticker.history(start=start_date, end=end_date, interval=data_interval_weekly,auto_adjust=False, prepost=False)
     benchmark_data = benchmark_data.dropna()
+    # Benchmark held once on its week calendar, stocks are aligned by position
+    calendar = rs.BenchmarkCalendar(benchmark_data['Close'])
 
     # Iterate through the list of stocks
     for stock in stocks["Ticker"]:
@@ -94,7 +97,7 @@ def main():
                 # Calculate ema20W
                 data['ema20'] = ta.trend.EMAIndicator(data['Close'], window=20).ema_indicator()
                 # Calculate the relative ratio and average 21W
-                data = ratio_mean(data, benchmark_data, 21)
+                data = ratio_mean(data, calendar, 21)
                 curr_data = data.iloc[-1]
                 row = {'stock': stock, 'Close': curr_data['Close'], 'volStop10_2.5': str(round(curr_data['volStop'], 2)), 'ema20': str(round(curr_data['ema20'], 2)), \
                         'RS-ratio': str(round(curr_data['relativeRatio'], 2)), 'ratio-21W': str(round(curr_data['ratio21W'], 2)), 'RSI(14)': str(round(curr_data['RSI'], 2))}
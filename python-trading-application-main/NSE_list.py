@@ -1,7 +1,7 @@
 import pandas as pd
-import yfinance as yf
 import requests
 from io import StringIO
+from nse_metadata import load_metadata
 
 url = "https://archives.nseindia.com/content/equities/EQUITY_L.csv"
 
@@ -16,24 +16,17 @@ print(df[['SYMBOL', 'NAME OF COMPANY']].head())
 symbols = df['SYMBOL'].tolist()
 symbols = [sym + ".NS" for sym in symbols]
 
-# Fetch using yfinance
-for symbol in symbols:
-    stock = yf.Ticker(symbol)
-    info = stock.info
-    print(f"{symbol}: {info.get('longName')} - Market Cap: {info.get('marketCap')}")
+# Fetch using yfinance, only new or stale symbols hit the network (see nse_metadata.py)
+meta = load_metadata(symbols)
 
-results = []
-
-for symbol in symbols:
-    stock = yf.Ticker(symbol)
-    info = stock.info
-    results.append({
-        "Symbol": symbol,
-        "Name": info.get("longName"),
-        "Market Cap": info.get("marketCap"),
-        "Sector": info.get("sector"),
-    })
-
-pd.DataFrame(results).to_csv("nse_stock_summary.csv", index=False)
+for symbol, info in meta.iterrows():
+    print(f"{symbol}: {info['name']} - Market Cap: {info['market_cap']}")
 
+results = pd.DataFrame({
+    "Symbol": meta.index,
+    "Name": meta['name'].values,
+    "Market Cap": meta['market_cap'].values,
+    "Sector": meta['sector'].values,
+})
 
+results.to_csv("nse_stock_summary.csv", index=False)
@@ -0,0 +1,449 @@
+"""
+Schema management for the stock_report database.
+
+The original `daily` / `15m_data` tables keep OHLC as FLOAT next to an
+auto-increment id and a UNIQUE(stock_id, date) key, and the TA jobs keep
+widening them with ~34 indicator columns. This module replaces that layout with:
+
+- `daily_ohlcv` / `intraday_15m_ohlcv`: raw prices only, clustered on
+  PRIMARY KEY (stock_id, date) and range partitioned by year.
+- `daily_indicators` / `intraday_15m_indicators`: derived values, same key and
+  partitioning, so indicator rewrites never touch the raw price pages.
+- `*_archive` tables: ROW_FORMAT=COMPRESSED copies for old years, filled by
+  moving whole year partitions out of the hot tables.
+- `*_all` views: UNION ALL of the archive and hot table, for readers that need
+  the full history once old years have been archived.
+
+Until the TA jobs move over, stock_fetch_insert.py keeps filling `daily` next to
+`daily_ohlcv`, and `python db_schema.py sync` copies the indicators they write to
+`daily` into `daily_indicators`.
+
+Range scans per stock walk the clustered primary key, and "latest date across all
+stocks" is answered from the (date) secondary index (InnoDB appends the primary key
+to it, so it covers (date, stock_id)) without touching the rows.
+
+Migrations are ordered lists of SQL statements (or small Python steps for the
+legacy backfill), recorded in `schema_migrations` so running `migrate` again is a no-op.
+
+Usage:
+    python db_schema.py migrate
+    python db_schema.py status
+    python db_schema.py sync
+    python db_schema.py extend --through 2030
+    python db_schema.py archive --before 2015
+"""
+
+import os
+import argparse
+import logging
+from datetime import datetime
+
+import mysql.connector
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# First year that gets its own partition, older rows land in p_old
+FIRST_PARTITION_YEAR = 1990
+
+# Raw price columns, shared by the daily and 15m tables
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+# Indicator columns written by the TA jobs (Complete_daily_data_update.py, complete_ta.py, ...)
+INDICATOR_COLUMNS = [
+    'sma_8', 'sma_10', 'sma_21', 'sma_50', 'sma_55', 'sma_100', 'sma_200',
+    'ema_8', 'ema_10', 'ema_21', 'ema_50', 'ema_55', 'ema_100', 'ema_200',
+    'high_21', 'low_21', 'high_55', 'low_55', 'high_100', 'low_100',
+    'plus_di', 'minus_di', 'adx', 'cci', 'rsi', 'kama',
+    'dc_upper', 'dc_lower', 'vwap', 'atr', 'bb_middle', 'bb_upper', 'bb_lower', 'mfi'
+]
+
+# Hot table -> compressed archive table
+PARTITIONED_TABLES = {
+    'daily_ohlcv': 'daily_ohlcv_archive',
+    'daily_indicators': 'daily_indicators_archive',
+    'intraday_15m_ohlcv': 'intraday_15m_ohlcv_archive',
+    'intraday_15m_indicators': 'intraday_15m_indicators_archive',
+}
+
+
+def get_connection(**kwargs):
+    """Connect using the same MYSQL_* variables as docker-compose, with the stock_fetch_insert.py defaults."""
+    return mysql.connector.connect(
+        host=os.environ.get("MYSQL_HOST", "db"),
+        user=os.environ.get("MYSQL_USER", "root"),
+        password=os.environ.get("MYSQL_PASSWORD", "rootmysecretpassword"),
+        database=os.environ.get("MYSQL_DATABASE", "stock_report"),
+        **kwargs
+    )
+
+
+def year_partitions(through_year):
+    """Partition clause for RANGE COLUMNS(date), one partition per year plus p_old and pmax."""
+    parts = [f"PARTITION p_old VALUES LESS THAN ('{FIRST_PARTITION_YEAR}-01-01')"]
+    for year in range(FIRST_PARTITION_YEAR, through_year + 1):
+        parts.append(f"PARTITION p{year} VALUES LESS THAN ('{year + 1}-01-01')")
+    parts.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+    return "PARTITION BY RANGE COLUMNS(date) (\n    " + ",\n    ".join(parts) + "\n)"
+
+
+def ohlcv_table_sql(table, date_type, partitions):
+    return f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            stock_id INT NOT NULL,
+            date {date_type} NOT NULL,
+            open DECIMAL(14,4),
+            high DECIMAL(14,4),
+            low DECIMAL(14,4),
+            close DECIMAL(14,4),
+            volume BIGINT UNSIGNED,
+            PRIMARY KEY (stock_id, date),
+            KEY idx_date (date)
+        ) ENGINE=InnoDB
+        {partitions}
+    """
+
+
+def indicators_table_sql(table, date_type, partitions):
+    columns = ",\n            ".join(f"{col} FLOAT" for col in INDICATOR_COLUMNS)
+    # Screener indexes lead with date so "all stocks on day X" is a range scan,
+    # the trailing columns make the usual trend filters index-only.
+    return f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            stock_id INT NOT NULL,
+            date {date_type} NOT NULL,
+            {columns},
+            PRIMARY KEY (stock_id, date),
+            KEY idx_date (date),
+            KEY idx_trend_screen (date, adx, plus_di, minus_di, rsi),
+            KEY idx_ma_screen (date, sma_21, sma_50, sma_200, high_100)
+        ) ENGINE=InnoDB
+        {partitions}
+    """
+
+
+def union_view_sql(table, archive):
+    return f"""
+        CREATE OR REPLACE VIEW {table}_all AS
+        SELECT * FROM {archive}
+        UNION ALL
+        SELECT * FROM {table}
+    """
+
+
+def archive_table_sql(table, source):
+    return f"""
+        CREATE TABLE IF NOT EXISTS {table} LIKE {source}
+    """
+
+
+def compress_archive_sql(table):
+    # Archive tables are not partitioned, cold years are moved in as a whole
+    return [
+        f"ALTER TABLE {table} REMOVE PARTITIONING",
+        f"ALTER TABLE {table} ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8",
+    ]
+
+
+def build_migrations(through_year=None):
+    """Return the ordered list of (version, description, steps).
+
+    A step is either an SQL string or a callable taking the cursor.
+    """
+    if through_year is None:
+        through_year = datetime.now().year + 1
+    partitions = year_partitions(through_year)
+
+    return [
+        (1, "partitioned daily OHLCV and indicator tables", [
+            ohlcv_table_sql('daily_ohlcv', 'DATE', partitions),
+            indicators_table_sql('daily_indicators', 'DATE', partitions),
+        ]),
+        (2, "partitioned 15m OHLCV and indicator tables", [
+            ohlcv_table_sql('intraday_15m_ohlcv', 'DATETIME', partitions),
+            indicators_table_sql('intraday_15m_indicators', 'DATETIME', partitions),
+        ]),
+        (3, "compressed archive tier", [
+            stmt
+            for table, archive in PARTITIONED_TABLES.items()
+            for stmt in [archive_table_sql(archive, table)] + compress_archive_sql(archive)
+        ]),
+        (4, "backfill from legacy daily / 15m_data", [
+            backfill_legacy,
+        ]),
+        (5, "union views over the hot and archive tables", [
+            union_view_sql(table, archive) for table, archive in PARTITIONED_TABLES.items()
+        ]),
+    ]
+
+
+def ensure_migrations_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            description VARCHAR(255),
+            applied_at DATETIME
+        )
+    """)
+
+
+def applied_versions(cursor):
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def table_exists(cursor, table):
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.tables
+        WHERE table_schema = DATABASE() AND table_name = %s
+    """, (table,))
+    return cursor.fetchone()[0] > 0
+
+
+def table_columns(cursor, table):
+    cursor.execute("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s
+    """, (table,))
+    return {row[0].lower() for row in cursor.fetchall()}
+
+
+def backfill_legacy(cursor, refresh=False):
+    """Copy legacy `daily` / `15m_data` rows into the split tables, server side.
+
+    With refresh=True rows already in the split tables are overwritten, so indicators
+    the TA jobs keep writing to the legacy tables are carried over.
+    """
+    for legacy, ohlcv_table, indicators_table in [('daily', 'daily_ohlcv', 'daily_indicators'),
+                                                  ('15m_data', 'intraday_15m_ohlcv', 'intraday_15m_indicators')]:
+        if not table_exists(cursor, legacy):
+            logger.info(f"No legacy `{legacy}` table, nothing to backfill.")
+            continue
+
+        columns = table_columns(cursor, legacy)
+        price_cols = [col for col in OHLCV_COLUMNS if col in columns]
+        cursor.execute(copy_sql(legacy, ohlcv_table, price_cols, refresh))
+        logger.info(f"Backfilled {cursor.rowcount} rows from `{legacy}` into {ohlcv_table}.")
+
+        ind_cols = [col for col in INDICATOR_COLUMNS if col in columns]
+        if ind_cols:
+            # Rows with any indicator set, not only the ones that have the first column
+            any_indicator = " OR ".join(f"{col} IS NOT NULL" for col in ind_cols)
+            cursor.execute(copy_sql(legacy, indicators_table, ind_cols, refresh, f"({any_indicator})"))
+            logger.info(f"Backfilled {cursor.rowcount} rows from `{legacy}` into {indicators_table}.")
+
+
+def copy_sql(source, target, value_cols, refresh=False, condition=None):
+    """INSERT ... SELECT of (stock_id, date, value_cols), keeping or overwriting existing rows."""
+    cols_sql = ", ".join(['stock_id', 'date'] + value_cols)
+    where = "stock_id IS NOT NULL AND date IS NOT NULL"
+    if condition:
+        where += f" AND {condition}"
+    if not refresh:
+        return f"INSERT IGNORE INTO {target} ({cols_sql}) SELECT {cols_sql} FROM `{source}` WHERE {where}"
+    updates = ", ".join(f"{col} = VALUES({col})" for col in value_cols)
+    return (f"INSERT INTO {target} ({cols_sql}) SELECT {cols_sql} FROM `{source}` WHERE {where} "
+            f"ON DUPLICATE KEY UPDATE {updates}")
+
+
+def sync_legacy(conn):
+    """Refresh the split tables from `daily` / `15m_data` while the TA jobs still write there."""
+    cursor = conn.cursor()
+    backfill_legacy(cursor, refresh=True)
+    conn.commit()
+    cursor.close()
+
+
+def migrate(conn, through_year=None):
+    """Apply all pending migrations, returns the list of versions applied."""
+    cursor = conn.cursor()
+    ensure_migrations_table(cursor)
+    done = applied_versions(cursor)
+    applied = []
+
+    for version, description, steps in build_migrations(through_year):
+        if version in done:
+            continue
+        logger.info(f"Applying migration {version}: {description}")
+        for step in steps:
+            if callable(step):
+                step(cursor)
+            else:
+                cursor.execute(step)
+        cursor.execute(
+            "INSERT INTO schema_migrations (version, description, applied_at) VALUES (%s, %s, %s)",
+            (version, description, datetime.now())
+        )
+        conn.commit()
+        applied.append(version)
+
+    cursor.close()
+    if not applied:
+        logger.info("Schema is up to date.")
+    return applied
+
+
+def partition_names(cursor, table):
+    cursor.execute("""
+        SELECT partition_name FROM information_schema.partitions
+        WHERE table_schema = DATABASE() AND table_name = %s AND partition_name IS NOT NULL
+        ORDER BY partition_ordinal_position
+    """, (table,))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def extend_partitions(conn, through_year):
+    """Split pmax so every year up to through_year has its own partition."""
+    cursor = conn.cursor()
+    for table in PARTITIONED_TABLES:
+        existing = set(partition_names(cursor, table))
+        years = [y for y in range(FIRST_PARTITION_YEAR, through_year + 1) if f"p{y}" not in existing]
+        if not years:
+            continue
+        new_parts = ", ".join(f"PARTITION p{y} VALUES LESS THAN ('{y + 1}-01-01')" for y in years)
+        cursor.execute(f"""
+            ALTER TABLE {table} REORGANIZE PARTITION pmax INTO (
+                {new_parts}, PARTITION pmax VALUES LESS THAN (MAXVALUE)
+            )
+        """)
+        logger.info(f"Added partitions {years[0]}..{years[-1]} to {table}.")
+    conn.commit()
+    cursor.close()
+
+
+def archive_before(conn, before_year):
+    """Move every year partition older than before_year into the compressed archive tier.
+
+    The hot tables no longer hold those years afterwards, readers that need them go
+    through the `*_all` views.
+    """
+    cursor = conn.cursor()
+    for table, archive in PARTITIONED_TABLES.items():
+        old_parts = [p for p in partition_names(cursor, table)
+                     if p == 'p_old' or (p[1:].isdigit() and int(p[1:]) < before_year)]
+        for part in old_parts:
+            cursor.execute(f"INSERT IGNORE INTO {archive} SELECT * FROM {table} PARTITION ({part})")
+            moved = cursor.rowcount
+            cursor.execute(f"ALTER TABLE {table} TRUNCATE PARTITION {part}")
+            conn.commit()
+            if moved:
+                logger.info(f"Archived {moved} rows of {table} partition {part} into {archive}.")
+    cursor.close()
+
+
+def copy_per_symbol_tables(conn, drop=False):
+    """Copy the per-symbol `{stock_code}_DAILY` tables and `daily_stock_data` into daily_ohlcv.
+
+    Each table is copied with a single INSERT ... SELECT, rows already present in
+    daily_ohlcv win. With drop=True the legacy table is dropped once copied.
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT table_name FROM information_schema.tables
+        WHERE table_schema = DATABASE() AND table_name LIKE '%\\_DAILY'
+    """)
+    legacy_tables = [row[0] for row in cursor.fetchall()]
+    copied = 0
+
+    for table in legacy_tables:
+        columns = table_columns(cursor, table)
+        if not {'stock_id', 'date', 'close'} <= columns:
+            logger.warning(f"Skipping `{table}`, unexpected columns {sorted(columns)}")
+            continue
+        price_cols = [col for col in OHLCV_COLUMNS if col in columns]
+        cols_sql = ", ".join(['stock_id', 'date'] + price_cols)
+        cursor.execute(f"""
+            INSERT IGNORE INTO daily_ohlcv ({cols_sql})
+            SELECT {cols_sql} FROM `{table}`
+            WHERE stock_id IS NOT NULL AND date IS NOT NULL
+        """)
+        copied += cursor.rowcount
+        if drop:
+            cursor.execute(f"DROP TABLE `{table}`")
+        conn.commit()
+
+    if table_exists(cursor, 'daily_stock_data'):
+        # Rows there carry the ticker, use it when stock_id was never filled in
+        cursor.execute("""
+            INSERT IGNORE INTO daily_ohlcv (stock_id, date, open, high, low, close)
+            SELECT COALESCE(d.stock_id, s.id), d.date, d.open, d.high, d.low, d.close
+            FROM daily_stock_data d
+            LEFT JOIN stock s ON s.stock_code = d.ticker
+            WHERE COALESCE(d.stock_id, s.id) IS NOT NULL AND d.date IS NOT NULL
+        """)
+        copied += cursor.rowcount
+        legacy_tables.append('daily_stock_data')
+        if drop:
+            cursor.execute("DROP TABLE daily_stock_data")
+        conn.commit()
+
+    cursor.close()
+    logger.info(f"Copied {copied} rows from {len(legacy_tables)} legacy tables into daily_ohlcv.")
+    return copied
+
+
+def latest_dates(conn, table='daily_ohlcv'):
+    """Latest date per stock, a loose index scan on the clustered (stock_id, date) key."""
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT stock_id, MAX(date) FROM {table} GROUP BY stock_id")
+    result = dict(cursor.fetchall())
+    cursor.close()
+    return result
+
+
+def latest_market_date(conn, table='daily_ohlcv'):
+    """Latest date across all stocks, resolved from the idx_date index alone."""
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT MAX(date) FROM {table}")
+    result = cursor.fetchone()[0]
+    cursor.close()
+    return result
+
+
+def print_status(conn):
+    cursor = conn.cursor()
+    ensure_migrations_table(cursor)
+    done = applied_versions(cursor)
+    for version, description, _ in build_migrations():
+        state = 'applied' if version in done else 'pending'
+        print(f"{version:>3}  {state:<8} {description}")
+    for table in PARTITIONED_TABLES:
+        if table_exists(cursor, table):
+            print(f"{table}: {len(partition_names(cursor, table))} partitions")
+    cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage the stock_report schema')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.add_parser('migrate', help='Apply pending migrations')
+    subparsers.add_parser('status', help='Show applied migrations and partitions')
+    subparsers.add_parser('sync', help='Copy prices and indicators from the legacy daily / 15m_data tables')
+    extend_parser = subparsers.add_parser('extend', help='Add yearly partitions')
+    extend_parser.add_argument('--through', type=int, required=True, help='Last year that needs a partition')
+    archive_parser = subparsers.add_parser('archive', help='Move old years into the compressed archive tables')
+    archive_parser.add_argument('--before', type=int, required=True, help='Archive years strictly before this one')
+    args = parser.parse_args()
+
+    if args.command is None:
+        parser.print_help()
+        return
+
+    conn = get_connection()
+    try:
+        if args.command == 'migrate':
+            migrate(conn)
+        elif args.command == 'status':
+            print_status(conn)
+        elif args.command == 'sync':
+            sync_legacy(conn)
+        elif args.command == 'extend':
+            extend_partitions(conn, args.through)
+        elif args.command == 'archive':
+            archive_before(conn, args.before)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+Unified daily price ingest.
+
+csv_training.py / fetchInfo.py create one `{stock_code}_DAILY` table per symbol,
+stock_ticker.py writes `daily_stock_data` and the TA jobs read `daily`. This CLI
+writes every symbol into the single partitioned `daily_ohlcv` table (see db_schema.py):
+
+- symbols are downloaded from yfinance in batches (one request per batch, not per symbol)
+- only bars after the latest stored date of each stock are fetched
+- rows are bulk loaded with LOAD DATA LOCAL INFILE, falling back to batched
+  multi-row INSERTs when the server does not allow local infile
+
+Usage:
+    python ingest.py load --symbols-file "stocks copy.csv"
+    python ingest.py load --nse
+    python ingest.py load --symbols RELIANCE TCS --start 2020-01-01
+    python ingest.py legacy [--drop]
+"""
+
+import os
+import csv
+import argparse
+import logging
+import tempfile
+from io import StringIO
+from datetime import datetime, timedelta
+
+import pandas as pd
+import requests
+import yfinance as yf
+
+from db_schema import get_connection, migrate, latest_dates, copy_per_symbol_tables
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+NSE_EQUITY_URL = "https://archives.nseindia.com/content/equities/EQUITY_L.csv"
+
+# Symbols per yf.download call
+BATCH_SIZE = 50
+
+# Rows per INSERT when LOAD DATA is not available
+INSERT_CHUNK = 5000
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def read_symbols(args):
+    """Return NSE symbols with the .NS suffix, from a csv, the NSE list or the command line."""
+    if args.symbols:
+        symbols = args.symbols
+    elif args.nse:
+        response = requests.get(NSE_EQUITY_URL, headers={'User-Agent': 'Mozilla/5.0'})
+        symbols = pd.read_csv(StringIO(response.text))['SYMBOL'].tolist()
+    else:
+        symbols = pd.read_csv(args.symbols_file)['Ticker'].tolist()
+    return [sym if sym.endswith('.NS') else sym + ".NS" for sym in symbols]
+
+
+def ensure_stocks(conn, symbols):
+    """Insert missing rows into `stock` in one batch and return {stock_code: id}."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stock (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            stock_code VARCHAR(20) UNIQUE,
+            stock_name VARCHAR(255)
+        )
+    """)
+    cursor.executemany(
+        "INSERT IGNORE INTO stock (stock_code, stock_name) VALUES (%s, %s)",
+        [(sym, sym) for sym in symbols]
+    )
+    conn.commit()
+    cursor.execute("SELECT stock_code, id FROM stock")
+    stock_ids = {code: stock_id for code, stock_id in cursor.fetchall()}
+    cursor.close()
+    return stock_ids
+
+
+def download_batch(symbols, start, end):
+    """Download one batch of symbols and return a long frame (stock_code, date, OHLCV)."""
+    data = yf.download(
+        tickers=symbols,
+        interval="1d",
+        start=start,
+        end=end,
+        group_by='ticker',
+        threads=True,
+        progress=False
+    )
+    if data.empty:
+        return pd.DataFrame()
+
+    frames = []
+    for symbol in symbols:
+        if symbol not in data.columns.get_level_values(0):
+            continue
+        df = data[symbol][PRICE_COLUMNS].dropna()
+        if df.empty:
+            continue
+        df = df.rename_axis('Date').reset_index()
+        df['stock_code'] = symbol
+        frames.append(df)
+
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+def to_rows(frame, stock_ids, since):
+    """Attach stock ids and drop bars that are already stored."""
+    frame = frame.copy()
+    frame['stock_id'] = frame['stock_code'].map(stock_ids)
+    frame['date'] = pd.to_datetime(frame['Date']).dt.date
+    frame = frame[frame['stock_id'].notna()]
+    frame = frame[frame['date'] > frame['stock_code'].map(since).fillna(datetime.min.date())]
+    frame['stock_id'] = frame['stock_id'].astype(int)
+    frame['Volume'] = frame['Volume'].fillna(0).astype('int64')
+    return frame[['stock_id', 'date'] + PRICE_COLUMNS]
+
+
+def load_data_infile(conn, rows):
+    """Bulk load through a temporary csv, the fastest path into InnoDB."""
+    with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, newline='') as tmp:
+        rows.to_csv(tmp, index=False, header=False, quoting=csv.QUOTE_MINIMAL, lineterminator='\n')
+        tmp_path = tmp.name
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            LOAD DATA LOCAL INFILE '{tmp_path.replace(os.sep, '/')}'
+            IGNORE INTO TABLE daily_ohlcv
+            FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+            LINES TERMINATED BY '\\n'
+            (stock_id, date, open, high, low, close, volume)
+        """)
+        loaded = cursor.rowcount
+        conn.commit()
+        cursor.close()
+        return loaded
+    finally:
+        os.remove(tmp_path)
+
+
+def insert_batches(conn, rows):
+    """Fallback bulk path, mysql-connector turns executemany into multi-row INSERTs."""
+    cursor = conn.cursor()
+    records = [
+        (int(r[0]), r[1], float(r[2]), float(r[3]), float(r[4]), float(r[5]), int(r[6]))
+        for r in rows.itertuples(index=False, name=None)
+    ]
+    loaded = 0
+    for i in range(0, len(records), INSERT_CHUNK):
+        cursor.executemany("""
+            INSERT IGNORE INTO daily_ohlcv (stock_id, date, open, high, low, close, volume)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, records[i:i + INSERT_CHUNK])
+        loaded += cursor.rowcount
+        conn.commit()
+    cursor.close()
+    return loaded
+
+
+def run_load(args):
+    symbols = read_symbols(args)
+    logger.info(f"Ingesting {len(symbols)} symbols into daily_ohlcv")
+
+    conn = get_connection(allow_local_infile=True)
+    migrate(conn)
+    stock_ids = ensure_stocks(conn, symbols)
+
+    # Latest stored date per stock code, so reruns only fetch new bars
+    stored = latest_dates(conn)
+    code_by_id = {stock_id: code for code, stock_id in stock_ids.items()}
+    since = {code_by_id[stock_id]: date for stock_id, date in stored.items() if stock_id in code_by_id}
+
+    end = datetime.now().date() + timedelta(days=1)
+    use_infile = not args.no_infile
+    total = 0
+
+    for i in range(0, len(symbols), BATCH_SIZE):
+        batch = symbols[i:i + BATCH_SIZE]
+        if args.start:
+            start = args.start
+        else:
+            # One request per batch, start from the stalest member of the batch
+            last_dates = [since.get(sym) for sym in batch]
+            start = "1900-01-01" if None in last_dates else str(min(last_dates) + timedelta(days=1))
+        if start >= str(end):
+            continue
+
+        try:
+            frame = download_batch(batch, start, end)
+        except Exception as e:
+            logger.error(f"Error downloading batch starting {batch[0]}: {e}")
+            continue
+        if frame.empty:
+            logger.info(f"No new data for batch starting {batch[0]}")
+            continue
+
+        rows = to_rows(frame, stock_ids, since)
+        if rows.empty:
+            continue
+
+        if use_infile:
+            try:
+                loaded = load_data_infile(conn, rows)
+            except Exception as e:
+                logger.warning(f"LOAD DATA LOCAL INFILE failed ({e}), falling back to batched INSERTs")
+                use_infile = False
+                loaded = insert_batches(conn, rows)
+        else:
+            loaded = insert_batches(conn, rows)
+
+        total += loaded
+        logger.info(f"Batch {i // BATCH_SIZE + 1}: {loaded} rows for {rows['stock_id'].nunique()} symbols")
+
+    conn.close()
+    logger.info(f"Done, {total} rows loaded into daily_ohlcv.")
+
+
+def run_legacy(args):
+    conn = get_connection()
+    migrate(conn)
+    copy_per_symbol_tables(conn, drop=args.drop)
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load daily prices for a universe into daily_ohlcv')
+    subparsers = parser.add_subparsers(dest='command')
+
+    load_parser = subparsers.add_parser('load', help='Download and bulk load daily prices')
+    source = load_parser.add_mutually_exclusive_group()
+    source.add_argument('--symbols-file', default='stocks copy.csv', help='CSV with a Ticker column')
+    source.add_argument('--nse', action='store_true', help='Use the full NSE EQUITY_L.csv list')
+    source.add_argument('--symbols', nargs='+', help='Symbols to load, with or without .NS')
+    load_parser.add_argument('--start', help='Fetch from this date instead of the latest stored date')
+    load_parser.add_argument('--no-infile', action='store_true', help='Skip LOAD DATA LOCAL INFILE')
+
+    legacy_parser = subparsers.add_parser('legacy', help='Copy per-symbol *_DAILY tables and daily_stock_data into daily_ohlcv')
+    legacy_parser.add_argument('--drop', action='store_true', help='Drop each legacy table once copied')
+
+    args = parser.parse_args()
+    if args.command == 'load':
+        run_load(args)
+    elif args.command == 'legacy':
+        run_legacy(args)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Cached NSE universe metadata (name, market cap, sector, industry).
+
+NSE_list.py and stock_fetch_insert.py used to call yf.Ticker(symbol).info for
+every symbol on every run, one after another. This module keeps the fields in a
+local SQLite table with a fetch timestamp per field, and only refetches the fields
+that are missing or older than their TTL: market cap alone comes from the lighter
+`.fast_info`, `.info` is only called when a name, sector or industry is due. Those
+calls run on a thread pool behind a shared rate limiter, with retries and backoff.
+Every requested field is stamped even when Yahoo has no value for it (ETFs have no
+sector), and a symbol whose fetch failed is not retried until FAILURE_TTL passes.
+
+Usage:
+    from nse_metadata import load_metadata
+    meta = load_metadata(["RELIANCE.NS", "TCS.NS"])   # DataFrame indexed by symbol
+
+    python nse_metadata.py --nse          # refresh the whole EQUITY_L.csv universe
+"""
+
+import time
+import sqlite3
+import argparse
+import logging
+import threading
+from io import StringIO
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+import requests
+import yfinance as yf
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+NSE_EQUITY_URL = "https://archives.nseindia.com/content/equities/EQUITY_L.csv"
+
+DB_PATH = "nse_metadata.db"
+
+# Field -> (.info key, time to live in seconds)
+FIELDS = {
+    'name': ('longName', 180 * 86400),
+    'market_cap': ('marketCap', 1 * 86400),
+    'sector': ('sector', 30 * 86400),
+    'industry': ('industry', 30 * 86400),
+}
+
+# Fields that .fast_info can refresh without the full .info call
+FAST_INFO_FIELDS = {'market_cap'}
+
+# Seconds before a symbol whose fetch failed (delisted, renamed) is tried again
+FAILURE_TTL = 1 * 86400
+
+MAX_WORKERS = 8
+REQUESTS_PER_SECOND = 4
+MAX_RETRIES = 3
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across all threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.lock = threading.Lock()
+        self.next_time = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            sleep_for = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if sleep_for > 0:
+            time.sleep(sleep_for)
+
+
+class MetadataStore:
+    """SQLite table with one row per symbol and a fetched_at column per field."""
+
+    def __init__(self, path=DB_PATH):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        columns = ", ".join(f"{field}, {field}_fetched_at REAL" for field in FIELDS)
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS symbol_metadata (symbol TEXT PRIMARY KEY, {columns}, failed_at REAL)")
+        # Tables created before failures were recorded lack the column
+        existing = {row[1] for row in self.conn.execute("PRAGMA table_info(symbol_metadata)")}
+        if 'failed_at' not in existing:
+            self.conn.execute("ALTER TABLE symbol_metadata ADD COLUMN failed_at REAL")
+        self.conn.commit()
+
+    def stale_fields(self, symbols, now=None):
+        """Symbol -> fields that are missing or past their TTL, for symbols that have any.
+
+        Symbols whose last fetch failed less than FAILURE_TTL ago are left out.
+        """
+        now = now or time.time()
+        stored = self.fetched_at(symbols)
+        stale = {}
+        for symbol in symbols:
+            row = stored.get(symbol)
+            if row is not None and row['failed_at'] is not None and now - row['failed_at'] <= FAILURE_TTL:
+                continue
+            fields = {field for field, (_, ttl) in FIELDS.items()
+                      if row is None or row[field] is None or now - row[field] > ttl}
+            if fields:
+                stale[symbol] = fields
+        return stale
+
+    def fetched_at(self, symbols):
+        keys = list(FIELDS) + ['failed_at']
+        cols = ", ".join(f"{field}_fetched_at" for field in FIELDS) + ", failed_at"
+        result = {}
+        with self.lock:
+            for i in range(0, len(symbols), 500):
+                chunk = symbols[i:i + 500]
+                marks = ", ".join("?" for _ in chunk)
+                for row in self.conn.execute(f"SELECT symbol, {cols} FROM symbol_metadata WHERE symbol IN ({marks})", chunk):
+                    result[row[0]] = dict(zip(keys, row[1:]))
+        return result
+
+    def save(self, symbol, info, fields, now=None):
+        """Stamp the requested fields, storing the values found in info.
+
+        A field Yahoo has no value for keeps its stored value but is stamped all the same,
+        so it is not asked for again until its TTL passes.
+        """
+        now = now or time.time()
+        sets = ", ".join(f"{field} = COALESCE(?, {field}), {field}_fetched_at = ?" for field in fields)
+        params = [p for field in fields for p in (info.get(FIELDS[field][0]), now)]
+        with self.lock:
+            self.conn.execute("INSERT OR IGNORE INTO symbol_metadata (symbol) VALUES (?)", (symbol,))
+            self.conn.execute(f"UPDATE symbol_metadata SET {sets}, failed_at = NULL WHERE symbol = ?", params + [symbol])
+            self.conn.commit()
+
+    def mark_failed(self, symbol, now=None):
+        """Record a failed fetch, the symbol is skipped until FAILURE_TTL passes."""
+        now = now or time.time()
+        with self.lock:
+            self.conn.execute("INSERT OR IGNORE INTO symbol_metadata (symbol) VALUES (?)", (symbol,))
+            self.conn.execute("UPDATE symbol_metadata SET failed_at = ? WHERE symbol = ?", (now, symbol))
+            self.conn.commit()
+
+    def frame(self, symbols):
+        with self.lock:
+            df = pd.read_sql_query(f"SELECT symbol, {', '.join(FIELDS)} FROM symbol_metadata", self.conn)
+        return df.set_index('symbol').reindex(symbols)
+
+
+def fetch_info(symbol, fields, limiter):
+    """Fetch the given fields with rate limiting and exponential backoff.
+
+    Only .fast_info is used when it covers every field, otherwise the full .info.
+    """
+    for attempt in range(MAX_RETRIES):
+        limiter.wait()
+        try:
+            ticker = yf.Ticker(symbol)
+            if fields <= FAST_INFO_FIELDS:
+                fast_info = ticker.fast_info
+                return {FIELDS[field][0]: fast_info[FIELDS[field][0]] for field in fields}
+            return ticker.info
+        except Exception as e:
+            if attempt == MAX_RETRIES - 1:
+                raise
+            delay = 2 ** attempt
+            logger.warning(f"Retrying {symbol} in {delay}s after error: {e}")
+            time.sleep(delay)
+
+
+def refresh(store, symbols, max_workers=MAX_WORKERS, rate=REQUESTS_PER_SECOND):
+    """Fetch the stale fields of new or stale symbols only, returns the number refreshed."""
+    stale = store.stale_fields(symbols)
+    if not stale:
+        logger.info(f"Metadata for {len(symbols)} symbols is fresh.")
+        return 0
+
+    logger.info(f"Refreshing metadata for {len(stale)} of {len(symbols)} symbols")
+    limiter = RateLimiter(rate)
+    refreshed = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(fetch_info, symbol, fields, limiter): symbol for symbol, fields in stale.items()}
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                store.save(symbol, future.result() or {}, stale[symbol])
+                refreshed += 1
+            except Exception as e:
+                logger.error(f"Failed to fetch info for {symbol}: {e}")
+                store.mark_failed(symbol)
+    return refreshed
+
+
+def load_metadata(symbols, path=DB_PATH, max_workers=MAX_WORKERS, rate=REQUESTS_PER_SECOND):
+    """Refresh what is stale and return a DataFrame of name/market_cap/sector/industry indexed by symbol."""
+    store = MetadataStore(path)
+    refresh(store, symbols, max_workers=max_workers, rate=rate)
+    return store.frame(symbols)
+
+
+def nse_symbols():
+    response = requests.get(NSE_EQUITY_URL, headers={'User-Agent': 'Mozilla/5.0'})
+    df = pd.read_csv(StringIO(response.text))
+    return [sym + ".NS" for sym in df['SYMBOL'].tolist()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Refresh cached NSE symbol metadata')
+    parser.add_argument('--nse', action='store_true', help='Refresh the full EQUITY_L.csv universe')
+    parser.add_argument('--symbols', nargs='+', help='Symbols to refresh, with the .NS suffix')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS)
+    parser.add_argument('--rate', type=float, default=REQUESTS_PER_SECOND, help='Max .info calls per second')
+    args = parser.parse_args()
+
+    symbols = nse_symbols() if args.nse or not args.symbols else args.symbols
+    meta = load_metadata(symbols, max_workers=args.workers, rate=args.rate)
+    print(meta.head(20))
+
+
+if __name__ == "__main__":
+    main()
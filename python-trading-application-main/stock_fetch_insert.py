@@ -5,6 +5,8 @@ from datetime import datetime
 import requests
 from io import StringIO
 import time
+from db_schema import migrate
+from nse_metadata import load_metadata
 
 # Step 1: Download stock symbols from NSE
 nse_url = "https://archives.nseindia.com/content/equities/EQUITY_L.csv"
@@ -30,7 +32,7 @@ if connection.is_connected():
 
 cursor = connection.cursor()
 
-# Step 3: Ensure `stock` and `daily` tables exist
+# Step 3: Ensure `stock` and the price tables exist
 cursor.execute("""
     CREATE TABLE IF NOT EXISTS stock (
         id INT AUTO_INCREMENT PRIMARY KEY,
@@ -39,6 +41,7 @@ cursor.execute("""
     )
 """)
 
+# The TA jobs still read and update `daily`, keep filling it until they move to daily_ohlcv
 cursor.execute("""
     CREATE TABLE IF NOT EXISTS daily (
         id INT AUTO_INCREMENT PRIMARY KEY,
@@ -54,16 +57,16 @@ cursor.execute("""
     )
 """)
 
+# New price tables are managed by db_schema (partitioned daily_ohlcv + daily_indicators)
+migrate(connection)
+
+# Names come from the local metadata cache, only new or stale symbols call .info
+metadata = load_metadata(symbols)
+stock_names = metadata['name'].dropna().to_dict()
+
 # Step 4: Loop through all symbols
 for original_symbol in symbols:
-    stock = yf.Ticker(original_symbol)
-    try:
-        stock_info = stock.info
-    except Exception as e:
-        print(f"Failed to fetch info for {original_symbol}: {e}")
-        continue
-
-    stock_name = stock_info.get("longName") or original_symbol
+    stock_name = stock_names.get(original_symbol) or original_symbol
     stock_code = original_symbol
 
     print(f"Processing {original_symbol}: {stock_name}")
@@ -104,34 +107,28 @@ for original_symbol in symbols:
     data.columns = ['_'.join(col).strip() for col in data.columns.values]
     data.reset_index(inplace=True)
 
-    # Insert into daily table
-    for _, row in data.iterrows():
+    # Insert into daily and daily_ohlcv in one batch each, existing (stock_id, date) rows are kept
+    rows = [
+        (
+            stock_id,
+            row['Date'].date(),
+            float(row[f'Open_{stock_code}']),
+            float(row[f'High_{stock_code}']),
+            float(row[f'Low_{stock_code}']),
+            float(row[f'Close_{stock_code}']),
+            int(row[f'Volume_{stock_code}']),
+        )
+        for _, row in data.iterrows()
+    ]
+    for table in ['daily', 'daily_ohlcv']:
         try:
-            cursor.execute("""
-                           SELECT COUNT(*)
-                           FROM daily
-                           WHERE stock_id = %s
-                             AND date = %s
-                           """, (stock_id, row['Date'].date()))
-            result = cursor.fetchone()
-
-
-            if result[0] == 0:
-                cursor.execute("""
-                               INSERT INTO daily
+            cursor.executemany(f"""
+                               INSERT IGNORE INTO {table}
                                    (stock_id, date, open, high, low, close, volume)
                                VALUES (%s, %s, %s, %s, %s, %s, %s)
-                               """, (
-                                   stock_id,
-                                   row['Date'].date(),
-                                   row[f'Open_{stock_code}'],
-                                   row[f'High_{stock_code}'],
-                                   row[f'Low_{stock_code}'],
-                                   row[f'Close_{stock_code}'],
-                                   row[f'Volume_{stock_code}'],
-                               ))
+                               """, rows)
         except Exception as e:
-            print(f"Error inserting daily data for {stock_code} on {row['Date']}: {e}")
+            print(f"Error inserting {table} data for {stock_code}: {e}")
 
     connection.commit()
     print(f"Finished processing {stock_code}\n")
@@ -140,4 +137,4 @@ for original_symbol in symbols:
 # Cleanup
 cursor.close()
 connection.close()
-print("All stock data inserted into the 'daily' table.")
+print("All stock data inserted into the 'daily' and 'daily_ohlcv' tables.")